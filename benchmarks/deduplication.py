@@ -0,0 +1,104 @@
+"""
+Speedup of collapsing the duplicate sentences before ranking, on corpora padded with boilerplate.
+
+Generates synthetic corpora, repeats a few boilerplate sentences and near duplicates of the sentences throughout them,
+like scraped pages and transcripts, and summarises them without deduplication, with the exact and with the near
+duplicates collapsed. Reports the best time, the number of sentences actually ranked and the number of copies of the
+boilerplate in the summary of every mode.
+
+Usage, from the repository root:
+    PYTHONPATH=. python benchmarks/deduplication.py --sizes 1000,3000 --duplicate-ratio 0.5
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+from nutshell.model import Summarizer
+from nutshell.preprocessing.deduplicator import SentenceDeduplicator
+from nutshell.preprocessing.preprocessor import TextPreProcessor
+from nutshell.preprocessing.tokenizer import TOKENIZERS
+from pipeline import generate_corpus
+
+MODES = {
+    'none': None,
+    'exact': SentenceDeduplicator,
+    'near': lambda: SentenceDeduplicator(near_duplicates=True),
+}
+
+
+def pad_corpus(sentences, boilerplate, duplicate_ratio: float, near_ratio: float, seed: int) -> str:
+    """
+    Inserts a copy of a boilerplate sentence after a sentence with probability duplicate_ratio, and a near duplicate
+    of the sentence, i.e the sentence with an extra word, with probability near_ratio
+    """
+    rng = random.Random(seed)
+    padded = []
+    for sentence in sentences:
+        padded.append(sentence)
+        if rng.random() < duplicate_ratio:
+            padded.append(rng.choice(boilerplate))
+        if rng.random() < near_ratio:
+            padded.append(sentence.rstrip('.') + ' today.')
+    return ' '.join(padded)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,3000', help='Comma separated number of distinct sentences')
+    parser.add_argument('--duplicate-ratio', type=float, default=0.5, help='Boilerplate copies per sentence')
+    parser.add_argument('--near-ratio', type=float, default=0.1, help='Near duplicates per sentence')
+    parser.add_argument('--boilerplate', type=int, default=5, help='Number of distinct boilerplate sentences')
+    parser.add_argument('--sentence-length', type=int, default=20, help='Average number of words per sentence')
+    parser.add_argument('--vocabulary-size', type=int, default=5000, help='Number of distinct words')
+    parser.add_argument('--reduction-ratio', type=float, default=0.7)
+    parser.add_argument('--tokenizer', default='nltk', choices=sorted(TOKENIZERS), help='Tokenizer of the corpora')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs, the best one is reported')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='Path of the JSON results, printed to stdout if not given')
+    args = parser.parse_args(argv)
+
+    preprocessor = TextPreProcessor(tokenizer=args.tokenizer)
+    boilerplate = preprocessor.split_sentences(generate_corpus(args.boilerplate, args.sentence_length // 2,
+                                                               args.vocabulary_size, seed=args.seed + 1))
+    boilerplate_words = {' '.join(words) for words in preprocessor.preprocess(' '.join(boilerplate))[0].get_sentences()}
+    results = []
+    for size in map(int, args.sizes.split(',')):
+        sentences = preprocessor.split_sentences(generate_corpus(size, args.sentence_length, args.vocabulary_size,
+                                                                 seed=args.seed))
+        corpus = pad_corpus(sentences, boilerplate, args.duplicate_ratio, args.near_ratio, args.seed)
+        baseline = None
+        for mode, make_deduplicator in MODES.items():
+            summarizer = Summarizer(preprocessor=preprocessor,
+                                    deduplicator=None if make_deduplicator is None else make_deduplicator())
+            seconds = float('inf')
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                summary, stats = summarizer.summarise(corpus, reduction_ratio=args.reduction_ratio, with_stats=True)
+                seconds = min(seconds, time.perf_counter() - start)
+            baseline = seconds if baseline is None else baseline
+            ranked = stats.counters['sentences'] - stats.counters.get('duplicates', 0)
+            copies = sum(' '.join(words) in boilerplate_words for _, words in summary)
+            results.append({'sentences': stats.counters['sentences'], 'mode': mode, 'ranked_sentences': ranked,
+                            'seconds': seconds, 'speedup': baseline / seconds, 'summary_sentences': len(summary),
+                            'boilerplate_in_summary': copies})
+            print(f"n={stats.counters['sentences']:<7} {mode:>5} ranked={ranked:<7} {seconds:.4f}s "
+                  f"speedup={baseline / seconds:.2f}x boilerplate_in_summary={copies}", file=sys.stderr)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'args': vars(args),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
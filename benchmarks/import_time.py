@@ -0,0 +1,38 @@
+"""
+Import time regression check. Imports nutshell in a fresh interpreter, constructs the default models and verifies
+that none of the heavy dependencies got imported and that the import stays within the time budget.
+
+Usage: python benchmarks/import_time.py [--budget SECONDS]
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+HEAVY_MODULES = ('numpy', 'scipy', 'nltk', 'networkx', 'multiprocessing')
+
+PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+from nutshell.model import Summarizer, KeywordExtractor
+Summarizer(), KeywordExtractor()
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def measure(repeat=5):
+    runs = [json.loads(subprocess.check_output([sys.executable, '-c', PROBE])) for _ in range(repeat)]
+    return min(run['seconds'] for run in runs), sorted(set(m for run in runs for m in run['loaded']))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--budget', type=float, default=0.25, help='Maximum import time in seconds')
+    args = parser.parse_args()
+
+    seconds, loaded = measure()
+    print(f"Import time: {seconds * 1000:.1f} ms (budget {args.budget * 1000:.0f} ms)")
+    print(f"Heavy modules loaded at import: {loaded or 'none'}")
+    if loaded or seconds > args.budget:
+        sys.exit(1)
@@ -0,0 +1,261 @@
+"""
+Scaling benchmark of the summarization and keyword extraction pipelines.
+
+Generates synthetic corpora with a controlled number of sentences, sentence length and vocabulary size, times every
+stage of the pipelines, optionally measures their peak memory and writes the results as JSON, so that implementations
+can be compared and scaling regressions caught. With --workers, also times summarise_many and extract_keywords_many
+over a batch of corpora of every size against a serial loop, and reports their throughput in corpora per second.
+
+Usage, from the repository root:
+    PYTHONPATH=. python benchmarks/pipeline.py --sizes 100,1000,10000 --output results.json
+    PYTHONPATH=. python benchmarks/pipeline.py --sizes 100,1000 --workers 4 --batch 32
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from nutshell.algorithms.information_retrieval import ClassicalIR
+from nutshell.algorithms.ranking import TextRank
+from nutshell.algorithms.similarity import BM25Plus
+from nutshell.instrumentation import reset_peak_memory
+from nutshell.model import KeywordExtractor, Summarizer
+from nutshell.preprocessing.cleaner import NLTKCleaner
+from nutshell.preprocessing.preprocessor import TextPreProcessor
+from nutshell.preprocessing.tokenizer import TOKENIZERS
+
+SYLLABLES = ('ba', 'ko', 'ri', 'tu', 'me', 'sa', 'lo', 'ni', 'pe', 'da', 'gu', 'fi', 'ze', 'vo', 'ha', 'ju')
+
+
+def generate_vocabulary(size: int, rng: random.Random) -> List[str]:
+    vocabulary = set()
+    while len(vocabulary) < size:
+        vocabulary.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(vocabulary)
+
+
+def generate_corpus(number_of_sentences: int, sentence_length: int, vocabulary_size: int, seed: int = 0) -> str:
+    """
+    Generates a corpus of sentences made of pseudo words. Word frequencies follow Zipf's law and sentence lengths are
+    normally distributed around the given length, like in natural text.
+    """
+    rng = random.Random(seed)
+    vocabulary = generate_vocabulary(vocabulary_size, rng)
+    weights = [1 / rank for rank in range(1, vocabulary_size + 1)]
+    sentences = []
+    for _ in range(number_of_sentences):
+        length = max(3, round(rng.gauss(sentence_length, sentence_length / 4)))
+        words = rng.choices(vocabulary, weights=weights, k=length)
+        sentences.append(' '.join(words).capitalize() + '.')
+    return ' '.join(sentences)
+
+
+def run_stages(stages: List[tuple]) -> Dict[str, float]:
+    """Runs the (name, fn) stages in order, every stage receives the result of the previous one"""
+    timings, result = {}, None
+    for name, fn in stages:
+        start = time.perf_counter()
+        result = fn(result)
+        timings[name] = time.perf_counter() - start
+    timings['total'] = sum(timings.values())
+    return timings
+
+
+def summarizer_stages(corpus: str, reduction_ratio: float, similarity_algo: BM25Plus = None,
+                      tokenizer: str = None) -> List[tuple]:
+    preprocessor, ir, ranker = TextPreProcessor(tokenizer=tokenizer), ClassicalIR(), TextRank()
+    similarity_algo = BM25Plus() if similarity_algo is None else similarity_algo
+    state = {}
+
+    def preprocess(_):
+        state['original'], state['cleaned'] = preprocessor.preprocess(corpus)
+
+    def calculate_idf(_):
+        state['idf'] = ir.calculate_idf(state['cleaned'], ir.build_index(state['cleaned']))
+
+    def similarity_matrix(_):
+        state['matrix'] = similarity_algo.similarity_matrix(state['cleaned'], state['idf'])
+
+    def get_ranking_scores(_):
+        state['scores'] = ranker.get_ranking_scores(state['matrix'])
+
+    def get_top(_):
+        return ranker.get_top(state['scores'], state['original'], reduction_ratio=reduction_ratio)
+
+    return [('preprocess', preprocess), ('calculate_idf', calculate_idf), ('similarity_matrix', similarity_matrix),
+            ('get_ranking_scores', get_ranking_scores), ('get_top', get_top)]
+
+
+def windowed_summarizer_stages(corpus: str, reduction_ratio: float, window_size: int,
+                               tokenizer: str = None) -> List[tuple]:
+    model = Summarizer(preprocessor=TextPreProcessor(tokenizer=tokenizer))
+    return [('summarise', lambda _: model.summarise(corpus, reduction_ratio=reduction_ratio,
+                                                    window_size=window_size))]
+
+
+def keyword_stages(corpus: str, count: int, tokenizer: str = None) -> List[tuple]:
+    preprocessor = TextPreProcessor(tokenizer=tokenizer, cleaner=NLTKCleaner(skip_stemming=True))
+    ir = ClassicalIR()
+    state = {}
+
+    def preprocess(_):
+        _, state['tokens'] = preprocessor.preprocess(corpus)
+
+    def calculate_tf(_):
+        _, state['word_ids'], state['tf'] = ir.term_frequencies(state['tokens'])
+
+    def calculate_idf(_):
+        doc_freqs = np.bincount(state['word_ids'], minlength=len(state['tokens'].get_vocabulary()))
+        state['idf'] = ir.get_idf_by_id(state['tokens'], doc_freqs)
+
+    def cumulative_weight(_):
+        weights = ClassicalIR.cumulative_weight_by_id(state['word_ids'], state['tf'], state['idf'])
+        return ClassicalIR.top_weights(weights, count)
+
+    return [('preprocess', preprocess), ('calculate_tf', calculate_tf), ('calculate_idf', calculate_idf),
+            ('cumulative_weight', cumulative_weight)]
+
+
+def peak_memory(stages: List[tuple]) -> Dict[str, int]:
+    """Returns the peak memory in bytes allocated by every stage, measured with tracemalloc"""
+    peaks, result = {}, None
+    tracemalloc.start()
+    try:
+        for name, fn in stages:
+            reset_peak_memory()
+            baseline = tracemalloc.get_traced_memory()[0]
+            result = fn(result)
+            peaks[name] = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+    peaks['total'] = max(peaks.values())
+    return peaks
+
+
+def benchmark(pipeline: str, make_stages: Callable[[], List[tuple]], repeat: int, memory: bool) -> dict:
+    # The first run warms up the lazy imports, NLTK resources and caches, the best of the remaining runs is reported
+    runs = [run_stages(make_stages()) for _ in range(repeat + 1)][1:]
+    timings = {stage: min(run[stage] for run in runs) for stage in runs[0]}
+    result = {'pipeline': pipeline, 'seconds': timings}
+    if memory:
+        result['peak_memory_bytes'] = peak_memory(make_stages())
+    return result
+
+
+def batch_benchmark(pipeline: str, model, method: str, corpora: List[str], kwargs: dict, workers: int,
+                    repeat: int) -> dict:
+    """
+    Times a serial loop of model.method over the corpora against model.method_many with a pool of workers, whose start
+    up is included as it is paid by every call
+    """
+    fn, many = getattr(model, method), getattr(model, f"{method}_many")
+    # Warms up the lazy imports, NLTK resources and caches of the serial loop, the workers warm up on their own
+    expected = [fn(corpus, **kwargs) for corpus in corpora]
+    timings = {'serial': float('inf'), 'parallel': float('inf')}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        [fn(corpus, **kwargs) for corpus in corpora]
+        timings['serial'] = min(timings['serial'], time.perf_counter() - start)
+        start = time.perf_counter()
+        results = many(corpora, workers=workers, **kwargs)
+        timings['parallel'] = min(timings['parallel'], time.perf_counter() - start)
+        if results != expected:
+            raise Exception(f"{method}_many differs from the serial loop")
+    return {'pipeline': pipeline, 'seconds': timings, 'corpora': len(corpora), 'workers': workers,
+            'throughput': {mode: len(corpora) / seconds for mode, seconds in timings.items()},
+            'speedup': timings['serial'] / timings['parallel']}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='100,1000,10000',
+                        help='Comma separated number of sentences of the corpora, e.g 100,1000,10000,100000')
+    parser.add_argument('--sentence-length', type=int, default=20, help='Average number of words per sentence')
+    parser.add_argument('--vocabulary-size', type=int, default=5000, help='Number of distinct words')
+    parser.add_argument('--reduction-ratio', type=float, default=0.7)
+    parser.add_argument('--keywords', type=int, default=10, help='Number of keywords to extract')
+    parser.add_argument('--window-size', type=int, default=None,
+                        help='Also benchmark the windowed summarization with this window size')
+    parser.add_argument('--max-dense-size', type=int, default=20000,
+                        help='Skip the full summarization pipeline above this number of sentences, as the dense '
+                             'similarity matrix needs 8 * n^2 bytes')
+    parser.add_argument('--top-k', type=int, default=None,
+                        help='Also benchmark the summarization with the sparse similarity graph keeping the top k '
+                             'edges per sentence, at every size')
+    parser.add_argument('--max-doc-freq', type=float, default=None,
+                        help='Fraction of the sentences above which words are ignored by the sparse similarity graph')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Also benchmark summarise_many and extract_keywords_many with this number of workers '
+                             'against a serial loop')
+    parser.add_argument('--batch', type=int, default=16, help='Number of corpora of every size processed by --workers')
+    parser.add_argument('--tokenizer', default='nltk', choices=sorted(TOKENIZERS), help='Tokenizer of the corpora')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs, the best one is reported')
+    parser.add_argument('--memory', action='store_true', help='Also measure the peak memory of every stage')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='Path of the JSON results, printed to stdout if not given')
+    args = parser.parse_args(argv)
+
+    results = []
+    for size in map(int, args.sizes.split(',')):
+        corpus = generate_corpus(size, args.sentence_length, args.vocabulary_size, seed=args.seed)
+        params = {'sentences': size, 'sentence_length': args.sentence_length,
+                  'vocabulary_size': args.vocabulary_size}
+        runs = [benchmark('keywords', lambda: keyword_stages(corpus, args.keywords, args.tokenizer), args.repeat,
+                          args.memory)]
+        if size <= args.max_dense_size:
+            runs.append(benchmark('summarise', lambda: summarizer_stages(corpus, args.reduction_ratio,
+                                                                         tokenizer=args.tokenizer),
+                                  args.repeat, args.memory))
+        if args.top_k:
+            sparse_algo = BM25Plus(method='sparse', top_k=args.top_k, max_doc_freq=args.max_doc_freq)
+            runs.append(benchmark('summarise_sparse',
+                                  lambda: summarizer_stages(corpus, args.reduction_ratio, sparse_algo, args.tokenizer),
+                                  args.repeat, args.memory))
+        if args.window_size:
+            runs.append(benchmark(
+                'summarise_windowed',
+                lambda: windowed_summarizer_stages(corpus, args.reduction_ratio, args.window_size, args.tokenizer),
+                args.repeat, args.memory))
+        if args.workers:
+            corpora = [generate_corpus(size, args.sentence_length, args.vocabulary_size, seed=args.seed + idx)
+                       for idx in range(args.batch)]
+            preprocessor = TextPreProcessor(tokenizer=args.tokenizer)
+            runs.append(batch_benchmark(
+                'keywords_batch', KeywordExtractor(TextPreProcessor(tokenizer=args.tokenizer,
+                                                                    cleaner=NLTKCleaner(skip_stemming=True))),
+                'extract_keywords', corpora, dict(count=args.keywords), args.workers, args.repeat))
+            if size <= args.max_dense_size:
+                runs.append(batch_benchmark('summarise_batch', Summarizer(preprocessor=preprocessor), 'summarise',
+                                            corpora, dict(reduction_ratio=args.reduction_ratio), args.workers,
+                                            args.repeat))
+        for run in runs:
+            run.update(params)
+            results.append(run)
+            timings = ' '.join(f"{stage}={seconds:.4f}s" for stage, seconds in run['seconds'].items())
+            if 'throughput' in run:
+                timings += ''.join(f" {mode}_throughput={throughput:.1f}/s"
+                                   for mode, throughput in run['throughput'].items())
+                timings += f" speedup={run['speedup']:.2f}x"
+            print(f"{run['pipeline']:>20} n={size:<7} {timings}", file=sys.stderr)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'args': vars(args),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Latency and summary overlap of the cheap rankers against TextRank.
+
+Ranks the sentences of synthetic corpora, and of the given text files, with every (similarity, ranker) pair, times the
+similarity matrix and the ranking, and reports the overlap of the selected sentences with the ones selected by TextRank
+over BM25Plus, the default of Summarizer.
+
+Usage, from the repository root:
+    PYTHONPATH=. python benchmarks/rankers.py --sizes 100,1000,3000 tests/sample.txt
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from heapq import nlargest
+from math import ceil
+from typing import Dict, Set
+
+from nutshell.algorithms.information_retrieval import ClassicalIR
+from nutshell.algorithms.ranking import DegreeCentrality, LexRank, TextRank
+from nutshell.algorithms.similarity import BM25Plus, TfIdfCosine
+from nutshell.preprocessing.preprocessor import TextPreProcessor
+from nutshell.preprocessing.tokenizer import TOKENIZERS
+from pipeline import generate_corpus
+
+PIPELINES = {
+    'textrank_bm25': (BM25Plus, TextRank),
+    'degree_bm25': (BM25Plus, DegreeCentrality),
+    'lexrank_cosine': (TfIdfCosine, LexRank),
+    'lexrank_continuous_cosine': (TfIdfCosine, lambda: LexRank(continuous=True)),
+    'degree_cosine': (TfIdfCosine, DegreeCentrality),
+}
+REFERENCE = 'textrank_bm25'
+
+
+def selected(scores: Dict[int, float], n: int) -> Set[int]:
+    return {idx for idx, _ in nlargest(n, scores.items(), key=lambda item: item[1])}
+
+
+def run(tokens, idf, make_similarity, make_ranker, n: int, repeat: int) -> dict:
+    """Returns the best times of the similarity matrix and the ranking, and the selected sentences"""
+    similarity_time = ranking_time = float('inf')
+    for _ in range(repeat):
+        similarity_algo, ranker = make_similarity(), make_ranker()
+        start = time.perf_counter()
+        matrix = similarity_algo.similarity_matrix(tokens, idf)
+        middle = time.perf_counter()
+        scores = ranker.get_ranking_scores(matrix)
+        end = time.perf_counter()
+        similarity_time, ranking_time = min(similarity_time, middle - start), min(ranking_time, end - middle)
+    return {'similarity_seconds': similarity_time, 'ranking_seconds': ranking_time,
+            'total_seconds': similarity_time + ranking_time, 'stats': ranker.get_stats(),
+            'selected': selected(scores, n)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='*', help='Text files to compare on, in addition to the synthetic corpora')
+    parser.add_argument('--sizes', default='100,1000', help='Comma separated number of sentences of the corpora')
+    parser.add_argument('--sentence-length', type=int, default=20, help='Average number of words per sentence')
+    parser.add_argument('--vocabulary-size', type=int, default=5000, help='Number of distinct words')
+    parser.add_argument('--reduction-ratio', type=float, default=0.7)
+    parser.add_argument('--tokenizer', default='nltk', choices=sorted(TOKENIZERS), help='Tokenizer of the corpora')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs, the best one is reported')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='Path of the JSON results, printed to stdout if not given')
+    args = parser.parse_args(argv)
+
+    corpora = [(f"synthetic_{size}", generate_corpus(size, args.sentence_length, args.vocabulary_size,
+                                                    seed=args.seed)) for size in map(int, args.sizes.split(','))]
+    for path in args.files:
+        with open(path, encoding='utf-8') as f:
+            corpora.append((path, f.read()))
+
+    preprocessor, ir = TextPreProcessor(tokenizer=args.tokenizer), ClassicalIR()
+    results = []
+    for name, corpus in corpora:
+        _, tokens = preprocessor.preprocess(corpus)
+        idf = ir.calculate_idf(tokens, ir.build_index(tokens))
+        n = ceil(tokens.get_number_of_sentences() * (1 - args.reduction_ratio))
+        runs = {pipeline: run(tokens, idf, *makers, n, args.repeat) for pipeline, makers in PIPELINES.items()}
+        reference, reference_seconds = runs[REFERENCE]['selected'], runs[REFERENCE]['total_seconds']
+        for pipeline, result in runs.items():
+            overlap = len(result.pop('selected') & reference) / max(n, 1)
+            result.update(corpus=name, sentences=tokens.get_number_of_sentences(), pipeline=pipeline,
+                          overlap=overlap, speedup=reference_seconds / result['total_seconds'])
+            results.append(result)
+            print(f"{name:>20} {pipeline:>26} similarity={result['similarity_seconds']:.4f}s "
+                  f"ranking={result['ranking_seconds']:.4f}s speedup={result['speedup']:.2f}x "
+                  f"overlap={overlap:.3f}", file=sys.stderr)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'args': vars(args),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Speedup of the block parallel BM25Plus similarity matrix over the serial one.
+
+Computes the dense similarity matrix of synthetic corpora serially and with an increasing number of worker processes,
+checks that every parallel result is identical to the serial one and reports the best time and the speedup of every
+worker count, i.e the speedup curve of every corpus size. Exits with an error if a parallel result differs.
+
+Usage, from the repository root:
+    PYTHONPATH=. python benchmarks/similarity_parallel.py --sizes 2000,5000,10000 --workers 1,2,4,8
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+from nutshell.algorithms.information_retrieval import ClassicalIR
+from nutshell.algorithms.similarity import BM25Plus
+from nutshell.preprocessing.preprocessor import TextPreProcessor
+from nutshell.preprocessing.tokenizer import TOKENIZERS
+from pipeline import generate_corpus
+
+
+def best_time(algo: BM25Plus, tokens, idf, repeat: int):
+    """Returns the matrix of the last run and the best time of the runs"""
+    matrix, best = None, float('inf')
+    for _ in range(repeat):
+        matrix = None
+        start = time.perf_counter()
+        matrix = algo.similarity_matrix(tokens, idf)
+        best = min(best, time.perf_counter() - start)
+    return matrix, best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='2000,5000', help='Comma separated number of sentences of the corpora')
+    parser.add_argument('--workers', default=f"1,2,{os.cpu_count() or 1}",
+                        help='Comma separated number of worker processes, 1 being the serial computation')
+    parser.add_argument('--block-size', type=int, default=2 ** 22, help='Maximum number of scores per block of rows')
+    parser.add_argument('--sentence-length', type=int, default=20, help='Average number of words per sentence')
+    parser.add_argument('--vocabulary-size', type=int, default=5000, help='Number of distinct words')
+    parser.add_argument('--tokenizer', default='nltk', choices=sorted(TOKENIZERS), help='Tokenizer of the corpora')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs, the best one is reported')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='Path of the JSON results, printed to stdout if not given')
+    args = parser.parse_args(argv)
+
+    preprocessor, ir = TextPreProcessor(tokenizer=args.tokenizer), ClassicalIR()
+    worker_counts = sorted(set(map(int, args.workers.split(','))))
+    results, identical = [], True
+    for size in map(int, args.sizes.split(',')):
+        _, tokens = preprocessor.preprocess(generate_corpus(size, args.sentence_length, args.vocabulary_size,
+                                                           seed=args.seed))
+        idf = ir.calculate_idf(tokens, ir.build_index(tokens))
+        serial, serial_time = best_time(BM25Plus(), tokens, idf, args.repeat)
+        for workers in worker_counts:
+            if workers == 1:
+                seconds, same = serial_time, True
+            else:
+                algo = BM25Plus(block_size=args.block_size, workers=workers)
+                matrix, seconds = best_time(algo, tokens, idf, args.repeat)
+                same = matrix.tobytes() == serial.tobytes()
+                del matrix
+            identical &= same
+            results.append({'sentences': size, 'workers': workers, 'seconds': seconds,
+                            'speedup': serial_time / seconds, 'identical': same})
+            print(f"n={size:<7} workers={workers:<3} {seconds:.4f}s speedup={serial_time / seconds:.2f}x "
+                  f"identical={same}", file=sys.stderr)
+        del serial
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'args': vars(args),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    sys.exit(0 if identical else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Parity and speed of RegexTokenizer against NLTKTokenizer.
+
+Tokenizes representative text with both tokenizers and reports the fraction of the NLTK sentences reproduced exactly,
+the agreement of the word tokens, the time taken by each tokenizer and the differing sentences. Exits with an error if
+the token agreement is below --min-agreement, so it can be run as a check. Requires the NLTK punkt models.
+
+Usage, from the repository root:
+    PYTHONPATH=. python benchmarks/tokenizer_parity.py tests/sample.txt --show 5
+"""
+import argparse
+import sys
+import time
+from difflib import SequenceMatcher
+from typing import List
+
+from nutshell.preprocessing.tokenizer import NLTKTokenizer, RegexTokenizer
+
+# Cases known to be hard for sentence and word splitting
+EDGE_CASES = """
+Mr. Smith and Dr. Jones met at 10 a.m. on Jan. 5th. They discussed the U.S. economy, e.g. inflation and jobs.
+"I can't believe it," she said. "We won't stop now!" He didn't answer; he couldn't.
+The price rose from $1,000.50 to $2,300 (about 130%) by 12:30 p.m. Was it worth it? Nobody knows...
+J. R. R. Tolkien wrote books -- many of them. It's the students' choice, isn't it? Yes, it is.
+She said 'hello' and left. The company, Acme Inc., reported gains. Prices fell 3.5 percent in Q3.
+"""
+
+
+def agreement(expected: List, actual: List) -> float:
+    """Returns the fraction of the expected items matched in order by the actual items"""
+    if not expected:
+        return 1.0 if not actual else 0.0
+    matcher = SequenceMatcher(None, expected, actual, autojunk=False)
+    return sum(block.size for block in matcher.get_matching_blocks()) / len(expected)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='*', help='Text files to compare on, in addition to the built-in edge cases')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs, the best one is reported')
+    parser.add_argument('--show', type=int, default=0, help='Number of differing sentences printed')
+    parser.add_argument('--min-agreement', type=float, default=0.95,
+                        help='Minimum token agreement, below which the script exits with an error')
+    args = parser.parse_args(argv)
+
+    corpora = [('edge_cases', EDGE_CASES)]
+    for path in args.files:
+        with open(path, encoding='utf-8') as f:
+            corpora.append((path, f.read()))
+
+    nltk_tokenizer, regex_tokenizer = NLTKTokenizer(), RegexTokenizer()
+    # Loads the NLTK models before timing
+    nltk_tokenizer.tokenize(EDGE_CASES)
+
+    failed = False
+    for name, corpus in corpora:
+        expected, nltk_time = min((timed(nltk_tokenizer.tokenize, corpus) for _ in range(args.repeat)),
+                                  key=lambda run: run[1])
+        actual, regex_time = min((timed(regex_tokenizer.tokenize, corpus) for _ in range(args.repeat)),
+                                 key=lambda run: run[1])
+        expected_sentences = [tuple(sentence) for sentence in expected.get_sentences()]
+        actual_sentences = [tuple(sentence) for sentence in actual.get_sentences()]
+        sentence_agreement = agreement(expected_sentences, actual_sentences)
+        token_agreement = agreement([word for sentence in expected_sentences for word in sentence],
+                                    [word for sentence in actual_sentences for word in sentence])
+        failed |= token_agreement < args.min_agreement
+        print(f"{name}: sentences={len(expected_sentences)}/{len(actual_sentences)} "
+              f"sentence_agreement={sentence_agreement:.3f} token_agreement={token_agreement:.3f} "
+              f"nltk={nltk_time * 1000:.1f}ms regex={regex_time * 1000:.1f}ms "
+              f"speedup={nltk_time / max(regex_time, 1e-9):.1f}x")
+
+        expected_set, actual_set = set(expected_sentences), set(actual_sentences)
+        for sentence in [sentence for sentence in expected_sentences if sentence not in actual_set][:args.show]:
+            print(f"  nltk only:  {list(sentence)}")
+        for sentence in [sentence for sentence in actual_sentences if sentence not in expected_set][:args.show]:
+            print(f"  regex only: {list(sentence)}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,51 +1,382 @@
-from collections import defaultdict
+import mmap
+import struct
+from collections import defaultdict, Counter
+from functools import lru_cache
+from hashlib import blake2b
 from math import log
-from typing import Dict
+from typing import Dict, Iterable, List, Tuple
 
-from nutshell.preprocessing.tokenizer import Token
+from nutshell.preprocessing.preprocessor import TextPreProcessor
+from nutshell.preprocessing.tokenizer import Token, Vocabulary
+from nutshell.utils import lazy_import
+
+np = lazy_import('numpy')
+
+
+class InvertedIndex:
+    """
+    Inverted index of the tokens, i.e maps every word to the docs/sentences containing it along with the frequency of
+    the word in each of those docs. The index is built in a single pass over the word ids of the tokens.
+    """
+
+    def __init__(self, tokens: Token):
+        self.__vocabulary = tokens.get_vocabulary()
+        self.__postings: Dict[int, Dict[int, int]] = {}
+        self.__docs: List[Dict[int, int]] = []
+        token_ids, offsets = tokens.get_token_ids(), tokens.get_offsets()
+        for idx in range(tokens.get_number_of_sentences()):
+            word_count = Counter(token_ids[offsets[idx]:offsets[idx + 1]])
+            self.__docs.append(word_count)
+            for word_id, count in word_count.items():
+                self.__postings.setdefault(word_id, {})[idx] = count
+
+    def __repr__(self):
+        return f"InvertedIndex(docs={len(self.__docs)}, words={len(self.__postings)})"
+
+    def __contains__(self, word):
+        return self.__vocabulary.get_id(word) in self.__postings
+
+    def get_vocabulary(self) -> Vocabulary:
+        return self.__vocabulary
+
+    def get_word_ids(self) -> Iterable[int]:
+        """Returns the ids of the indexed words in the order of their first occurrence"""
+        return self.__postings.keys()
+
+    def get_words(self) -> Iterable[str]:
+        """Returns the indexed words in the order of their first occurrence"""
+        return map(self.__vocabulary.get_word, self.__postings)
+
+    def get_postings(self, word) -> Dict[int, int]:
+        """
+        Returns the posting list of the word
+        :return: Mapping of doc id to the frequency of the word in that doc
+        """
+        return self.get_postings_by_id(self.__vocabulary.get_id(word))
+
+    def get_postings_by_id(self, word_id) -> Dict[int, int]:
+        return self.__postings.get(word_id, {})
+
+    def get_doc_freq(self, word) -> int:
+        """Returns the number of the docs that contain the given word"""
+        return len(self.get_postings(word))
+
+    def get_doc(self, doc_id) -> Dict[int, int]:
+        """
+        Returns the ids of the words in the doc along with their frequency, in the order of their first occurrence in
+        the doc
+        """
+        if 0 <= doc_id <= len(self.__docs) - 1:
+            return self.__docs[doc_id]
+        raise Exception(f"Invalid doc Id. Valid doc ids are of range [0, {len(self.__docs) - 1}]")
+
+    def get_docs(self):
+        for doc in self.__docs:
+            yield doc
+
+    def get_number_of_docs(self) -> int:
+        return len(self.__docs)
+
+    def get_number_of_words(self) -> int:
+        return len(self.__postings)
+
+
+def word_hash(word: str) -> int:
+    """Returns the stable 64 bit hash of the word, used as the key of the word in an IDFModel"""
+    return int.from_bytes(blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class IDFModel:
+    """
+    Document frequencies of the words over a background corpus. The model is stored in a compact binary format, a
+    header followed by the sorted 64 bit hashes of the words and their document frequencies, which is memory mapped
+    when loaded so that worker processes share a single read-only copy through the page cache.
+
+    Words are identified by their hash only, two words colliding in 64 bits share their document frequency.
+    """
+    MAGIC = b'NUTSHIDF'
+    VERSION = 1
+    # Magic, version, number of docs and number of words
+    HEADER = struct.Struct('<8sQQQ')
+
+    def __init__(self, buffer, path: str = None, cache_size=2 ** 16):
+        """
+        :param buffer: Serialized model, as written by save
+        :param path: Path of the file the buffer is mapped from, if any
+        :param cache_size: Maximum number of document frequencies of single words cached by get_doc_freq
+        """
+        magic, version, number_of_docs, number_of_words = IDFModel.HEADER.unpack_from(buffer)
+        if magic != IDFModel.MAGIC or version != IDFModel.VERSION:
+            raise Exception(f"Invalid IDF model{'' if path is None else ' ' + path}, "
+                            f"expected version {IDFModel.VERSION} of the format")
+        self.__buffer = buffer
+        self.__path = path
+        self.__cache_size = cache_size
+        self.__number_of_docs = number_of_docs
+        offset = IDFModel.HEADER.size
+        self.__hashes = np.frombuffer(buffer, dtype='<u8', count=number_of_words, offset=offset)
+        offset += self.__hashes.nbytes
+        self.__doc_freqs = np.frombuffer(buffer, dtype='<u8', count=number_of_words, offset=offset)
+        # Models of equal sizes, or a file refitted in place, are told apart by the digest of their content
+        self.__digest = blake2b(buffer, digest_size=16).hexdigest()
+        self.get_doc_freq = lru_cache(maxsize=cache_size)(self.__get_doc_freq)
+
+    def __repr__(self):
+        # The repr keys the cached results of the models using the IDF model
+        path = '' if self.__path is None else f", path='{self.__path}'"
+        return f"IDFModel(docs={self.__number_of_docs}, words={len(self)}, digest={self.__digest}{path})"
+
+    def __reduce__(self):
+        # Copies sent to worker processes map the same file instead of carrying the whole model
+        if self.__path is not None:
+            return IDFModel.load, (self.__path, self.__cache_size)
+        return IDFModel, (bytes(self.__buffer), None, self.__cache_size)
+
+    def __len__(self):
+        return len(self.__hashes)
+
+    def __contains__(self, word):
+        return self.get_doc_freq(word) > 0
+
+    @classmethod
+    def fit(cls, corpora: Iterable[str], preprocessor: TextPreProcessor = None) -> 'IDFModel':
+        """
+        Fits the model over the corpora, which are streamed one at a time so they never have to fit in memory. Every
+        sentence is counted as a doc, like in ClassicalIR.calculate_idf.
+
+        :param corpora: Texts of the background corpus
+        :param preprocessor: Preprocessor of the texts, which has to clean the words the same way as the preprocessor of
+            the model using the IDF. Default - TextPreProcessor.
+        :return: Fitted model
+        """
+        preprocessor = TextPreProcessor() if preprocessor is None else preprocessor
+        return cls.fit_tokens(preprocessor.preprocess(corpus)[1] for corpus in corpora)
+
+    @classmethod
+    def fit_tokens(cls, corpora: Iterable[Token]) -> 'IDFModel':
+        """
+        Fits the model over the cleaned tokens of the corpora
+        :param corpora: Cleaned tokens of every text of the background corpus
+        :return: Fitted model
+        """
+        doc_freqs, number_of_docs = Counter(), 0
+        for tokens in corpora:
+            hashes = list(map(word_hash, tokens.get_vocabulary().get_words()))
+            token_ids, offsets = tokens.get_token_ids(), tokens.get_offsets()
+            for idx in range(tokens.get_number_of_sentences()):
+                doc_freqs.update(hashes[word_id] for word_id in set(token_ids[offsets[idx]:offsets[idx + 1]]))
+            number_of_docs += tokens.get_number_of_sentences()
+        return cls.from_doc_freqs(doc_freqs, number_of_docs)
+
+    @classmethod
+    def from_doc_freqs(cls, doc_freqs: Dict[int, int], number_of_docs: int) -> 'IDFModel':
+        """
+        Builds the model from the document frequencies
+        :param doc_freqs: Mapping of the hash of the word, see word_hash, to the number of docs containing the word
+        :param number_of_docs: Total number of docs
+        """
+        hashes = np.fromiter(doc_freqs.keys(), dtype='<u8', count=len(doc_freqs))
+        counts = np.fromiter(doc_freqs.values(), dtype='<u8', count=len(doc_freqs))
+        order = np.argsort(hashes, kind='stable')
+        header = IDFModel.HEADER.pack(IDFModel.MAGIC, IDFModel.VERSION, number_of_docs, len(hashes))
+        return cls(header + hashes[order].tobytes() + counts[order].tobytes())
+
+    @classmethod
+    def load(cls, path: str, cache_size=2 ** 16) -> 'IDFModel':
+        """Loads the model saved at the path by memory mapping it"""
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer, path=path, cache_size=cache_size)
+
+    def save(self, path: str):
+        with open(path, 'wb') as f:
+            f.write(self.__buffer)
+
+    def get_number_of_docs(self) -> int:
+        return self.__number_of_docs
+
+    def get_digest(self) -> str:
+        """Returns the hex digest of the serialized model"""
+        return self.__digest
+
+    def get_doc_freqs(self, words: Iterable[str]) -> 'np.ndarray':
+        """
+        Returns the number of docs containing each of the words, 0 for the words unseen in the background corpus.
+        All the words are looked up at once with a binary search over the sorted hashes.
+        """
+        keys = np.fromiter(map(word_hash, words), dtype='<u8')
+        if len(self.__hashes) == 0:
+            return np.zeros(len(keys), dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.__hashes, keys), len(self.__hashes) - 1)
+        return np.where(self.__hashes[positions] == keys, self.__doc_freqs[positions], 0).astype(np.int64)
+
+    def __get_doc_freq(self, word: str) -> int:
+        return int(self.get_doc_freqs([word])[0])
 
 
 class ClassicalIR:
 
+    def __init__(self, background: IDFModel = None, blend: float = 1.0):
+        """
+        :param background: Document frequencies fitted over a background corpus, used by get_idf instead of the
+            document frequencies of the current corpus. Default - no background model.
+        :param blend: Weight of the background IDF in get_idf, the local IDF of the current corpus has a weight of
+            (1 - blend). Words unseen in the background corpus always use the local IDF.
+        """
+        if not 0 <= blend <= 1:
+            raise Exception(f"Invalid blend {blend}, expected a weight in the range [0, 1]")
+        self.__background = background
+        self.__blend = blend
+
     def __repr__(self):
-        return f"ClassicalIR()"
+        if self.__background is None:
+            return f"ClassicalIR()"
+        return f"ClassicalIR(background={self.__background}, blend={self.__blend})"
+
+    def get_background(self) -> IDFModel:
+        return self.__background
+
+    def get_idf(self, tokens: Token, index: InvertedIndex = None) -> Dict[str, float]:
+        """
+        Returns the IDF used by the models, i.e the IDF of the background model blended with the local IDF of the
+        corpus if a background model is set, else the local IDF
+        :param tokens: Tokens for the corpus
+        :param index: Inverted index of the tokens. Built from the tokens if not given.
+        :return: IDF
+        """
+        if self.__background is None or self.__blend == 0:
+            return ClassicalIR.calculate_idf(tokens, index)
+        if index is None:
+            index = ClassicalIR.build_index(tokens)
+        words = index.get_vocabulary().get_words()
+        word_ids = list(index.get_word_ids())
+        number_of_docs = index.get_number_of_docs()
+        background_freqs = self.__background.get_doc_freqs(words[word_id] for word_id in word_ids).tolist()
+        return {words[word_id]: self.__blend_idf(number_of_docs, len(index.get_postings_by_id(word_id)),
+                                                 background_freq)
+                for word_id, background_freq in zip(word_ids, background_freqs)}
+
+    def get_idf_by_id(self, tokens: Token, doc_freqs: 'np.ndarray') -> 'np.ndarray':
+        """
+        Same as get_idf, but indexed by the word ids of the tokens
+        :param tokens: Tokens for the corpus
+        :param doc_freqs: Number of docs containing every word of the vocabulary of the tokens
+        :return: IDF of every word of the vocabulary, 0 for the words not found in the docs
+        """
+        number_of_docs = tokens.get_number_of_sentences()
+        doc_freqs = doc_freqs.tolist()
+        if self.__background is None or self.__blend == 0:
+            background_freqs = [0] * len(doc_freqs)
+        else:
+            background_freqs = self.__background.get_doc_freqs(tokens.get_vocabulary().get_words()).tolist()
+        return np.array([self.__blend_idf(number_of_docs, doc_freq, background_freq) if doc_freq else 0.0
+                         for doc_freq, background_freq in zip(doc_freqs, background_freqs)], dtype=float)
+
+    def __blend_idf(self, number_of_docs: int, doc_freq: int, background_freq: int) -> float:
+        # Words unseen in the background corpus use the local IDF only
+        blend = self.__blend if background_freq else 0
+        idf = 0
+        if blend > 0:
+            idf += blend * ClassicalIR.calculate_word_idf(self.__background.get_number_of_docs(), background_freq)
+        if blend < 1:
+            idf += (1 - blend) * ClassicalIR.calculate_word_idf(number_of_docs, doc_freq)
+        return idf
+
+    @staticmethod
+    def build_index(tokens: Token) -> InvertedIndex:
+        """
+        Builds the inverted index, which can be shared by tf, idf and other stages working on the same tokens
+        :param tokens: Tokens for the corpus
+        :return: Inverted index of the tokens
+        """
+        return InvertedIndex(tokens)
 
     @staticmethod
-    def calculate_tf(tokens: Token) -> Dict[str, Dict[str, float]]:
+    def calculate_tf(tokens: Token, index: InvertedIndex = None) -> Dict[str, Dict[str, float]]:
         """
         tf = (frequency of word in doc/number of tokens in that doc)
         :param tokens: Tokens for the corpus
+        :param index: Inverted index of the tokens. Built from the tokens if not given.
         :return: TF
         """
+        if index is None:
+            index = ClassicalIR.build_index(tokens)
+        words = index.get_vocabulary().get_words()
         tf = defaultdict(dict)
-        for idx, doc in enumerate(tokens.get_sentences()):
-            for word in doc:
-                tf[f'doc{idx}'][word] = doc.count(word) / len(doc)
+        for idx, word_count in enumerate(index.get_docs()):
+            doc_len = sum(word_count.values())
+            for word_id, count in word_count.items():
+                tf[f'doc{idx}'][words[word_id]] = count / doc_len
         return tf
 
     @staticmethod
-    def __calculate_doc_word_freq(word, documents, return_count=True) -> int:
+    def calculate_idf(tokens: Token, index: InvertedIndex = None) -> Dict[str, float]:
         """
-        Returns the number of the documents that contain the given word
+        idf = 1 + log(total number of docs/number of docs containing the word)
+        :param tokens: Tokens for the corpus
+        :param index: Inverted index of the tokens. Built from the tokens if not given.
+        :return: IDF
         """
-        docs_containing_word = list(filter(lambda x: word in x, documents))
-        return len(docs_containing_word) if return_count else docs_containing_word
+        if index is None:
+            index = ClassicalIR.build_index(tokens)
+        words = index.get_vocabulary().get_words()
+        number_of_docs = index.get_number_of_docs()
+        return {words[word_id]: ClassicalIR.calculate_word_idf(number_of_docs, len(index.get_postings_by_id(word_id)))
+                for word_id in index.get_word_ids()}
 
     @staticmethod
-    def calculate_idf(tokens: Token) -> Dict[str, float]:
+    def term_frequencies(tokens: Token) -> Tuple['np.ndarray', 'np.ndarray', 'np.ndarray']:
         """
-        idf = 1 + log(total number of docs/number of docs containing the word)
+        Counts the words of every doc in a single vectorized pass over the word ids of the tokens
+        tf = (frequency of word in doc/number of tokens in that doc)
         :param tokens: Tokens for the corpus
-        :return: IDF
+        :return: Doc ids, word ids and tf of every distinct (doc, word) pair, sorted by doc id and word id
         """
-        idf = {}
-        word_doc_freq = {}
-        for sen in tokens.get_sentences():
-            for word in sen:
-                if word_doc_freq.get(word) is None:
-                    word_doc_freq[word] = ClassicalIR.__calculate_doc_word_freq(word, tokens.get_sentences())
-                idf[word] = 1 + log(tokens.get_number_of_sentences() / word_doc_freq[word])
-        return idf
+        token_ids = np.frombuffer(tokens.get_token_ids(), dtype=np.intc)
+        doc_len = np.diff(np.frombuffer(tokens.get_offsets(), dtype=np.int64))
+        number_of_words = max(len(tokens.get_vocabulary()), 1)
+        docs = np.repeat(np.arange(len(doc_len), dtype=np.int64), doc_len)
+        pairs, counts = np.unique(docs * number_of_words + token_ids, return_counts=True)
+        doc_ids, word_ids = np.divmod(pairs, number_of_words)
+        return doc_ids, word_ids, counts / doc_len[doc_ids]
+
+    @staticmethod
+    def cumulative_weight_by_id(word_ids: 'np.ndarray', tf: 'np.ndarray', idf: 'np.ndarray') -> 'np.ndarray':
+        """
+        Same as cumulative_weight, but indexed by word id. The weights are summed up in the order of the docs, so they
+        are equal to the ones of cumulative_weight.
+        :param word_ids: Word id of every (doc, word) pair, sorted by doc id, see term_frequencies
+        :param tf: Term frequency of every (doc, word) pair
+        :param idf: IDF of every word id
+        :return: Cumulative weight of every word id
+        """
+        return np.bincount(word_ids, weights=tf * idf[word_ids], minlength=len(idf))
+
+    @staticmethod
+    def top_weights(weights: 'np.ndarray', count: int, word_ids: 'np.ndarray' = None) -> List[int]:
+        """
+        Selects the ids of the count highest weights without sorting all of them, ties broken by the lowest id like
+        the stable sort of cumulative_weight
+        :param weights: Weight of every id
+        :param count: Number of ids to be selected
+        :param word_ids: Ids among which the top ids are selected. Default - all the ids.
+        :return: Top ids, by descending weight, none if count is not positive
+        """
+        if count <= 0:
+            return []
+        word_ids = np.arange(len(weights)) if word_ids is None else word_ids
+        candidates = weights[word_ids]
+        if count < len(word_ids):
+            kth = np.partition(candidates, len(candidates) - count)[len(candidates) - count]
+            word_ids, candidates = word_ids[candidates >= kth], candidates[candidates >= kth]
+        return word_ids[np.lexsort((word_ids, -candidates))][:count].tolist()
+
+    @staticmethod
+    def calculate_word_idf(number_of_docs: int, doc_freq: int) -> float:
+        """
+        idf = 1 + log(total number of docs/number of docs containing the word)
+        """
+        return 1 + log(number_of_docs / doc_freq)
 
     @staticmethod
     def calculate_weight(tf: Dict[str, Dict[str, float]], idf: Dict[str, float]):
@@ -1,12 +1,82 @@
 from abc import abstractmethod, ABC
-from heapq import nlargest
 from math import ceil
-from typing import Dict, Any, List
-
-import networkx as nx
-import numpy as np
+from typing import Dict, Any, List, Tuple, Union
 
 from nutshell.preprocessing.tokenizer import Token
+from nutshell.utils import lazy_import
+
+np = lazy_import('numpy')
+sparse = lazy_import('scipy.sparse')
+
+
+def pagerank(matrix: 'Union[np.ndarray, sparse.spmatrix]', damping: float = 0.85, tol: float = 1.0e-6,
+             max_iter: int = 100, warm_start: 'np.ndarray' = None,
+             personalization: 'np.ndarray' = None) -> Tuple['np.ndarray', int]:
+    """
+    Computes pagerank of the weighted graph represented by the (dense or sparse) adjacency matrix using power
+    iteration. Nodes without any outgoing edge distribute their rank uniformly across all the nodes, or in proportion
+    to the personalization if given.
+    :param matrix: Weighted adjacency matrix, matrix[i][j] is the weight of the edge from node i to node j
+    :param damping: Probability of following an edge instead of jumping to a random node
+    :param tol: Error tolerance used to check convergence, the iteration stops once the l1 change of the ranks is
+        below number of nodes * tol
+    :param max_iter: Maximum number of iterations
+    :param warm_start: Initial ranks, for instance the ranks from a previous run on a similar graph
+    :param personalization: Non negative weight of every node, the random jumps land on the nodes in proportion to
+        their weight instead of uniformly, e.g the number of copies of a sentence collapsed into the node
+    :return: Ranks of the nodes and the number of iterations taken to converge
+    """
+    n = matrix.shape[0]
+    if n == 0:
+        return np.zeros(0), 0
+    if sparse.issparse(matrix):
+        matrix = sparse.csr_matrix(matrix, dtype=float)
+        out_weight = np.asarray(matrix.sum(axis=1)).ravel()
+    else:
+        matrix = np.asarray(matrix, dtype=float)
+        out_weight = matrix.sum(axis=1)
+
+    dangling = out_weight == 0
+    inverse_out_weight = np.divide(1.0, out_weight, out=np.zeros(n), where=~dangling)
+    if warm_start is None:
+        ranks = np.full(n, 1.0 / n)
+    else:
+        ranks = np.asarray(warm_start, dtype=float)
+        ranks = ranks / ranks.sum()
+    if personalization is None:
+        teleport, total_weight = 1.0, n
+    else:
+        teleport = np.asarray(personalization, dtype=float)
+        total_weight = teleport.sum()
+        if len(teleport) != n or (teleport < 0).any() or total_weight <= 0:
+            raise Exception(f"Invalid personalization, expected {n} non negative weights with a positive sum")
+
+    for iteration in range(1, max_iter + 1):
+        previous = ranks
+        jumps = previous[dangling].sum() * teleport / total_weight
+        ranks = damping * ((previous * inverse_out_weight) @ matrix + jumps) + (1 - damping) * teleport / total_weight
+        if np.abs(ranks - previous).sum() < n * tol:
+            return ranks, iteration
+    raise Exception(f"Pagerank failed to converge within {max_iter} iterations")
+
+
+def weight_targets(matrix: 'Union[np.ndarray, sparse.spmatrix]',
+                   weights: 'np.ndarray') -> 'Union[np.ndarray, sparse.spmatrix]':
+    """
+    Scales the edges to every node by the weight of the node. With the number of copies of the docs as weights, it is
+    the graph of the corpus where every doc is repeated weight times, lumped into a node per doc, the copies of a doc
+    having no edge between them. Pagerank of this graph with the weights as personalization gives every node the sum
+    of the ranks of its copies.
+    :param matrix: Weighted adjacency matrix, matrix[i][j] is the weight of the edge from node i to node j
+    :param weights: Positive weight of every node
+    :return: Weighted adjacency matrix
+    """
+    weights = np.asarray(weights, dtype=float)
+    if sparse.issparse(matrix):
+        matrix = sparse.csr_matrix(matrix, dtype=float, copy=True)
+        matrix.data *= weights[matrix.indices]
+        return matrix
+    return np.asarray(matrix, dtype=float) * weights
 
 
 class BaseRanker(ABC):
@@ -19,33 +89,217 @@ class BaseRanker(ABC):
     def _ranking_algorithm(self, *args, **kwargs) -> Dict[Any, float]:
         pass
 
-    def get_ranking_scores(self, similarity_matrix: np.ndarray) -> Dict[Any, float]:
+    def get_ranking_scores(self, similarity_matrix: 'np.ndarray', **kwargs) -> Dict[Any, float]:
         """
         Invokes the ranking algorithms and returns the rankings scores for each doc/sentence
         """
-        return self._ranking_algorithm(similarity_matrix)
+        return self._ranking_algorithm(similarity_matrix, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Returns the stats of the last ranking, e.g the number of iterations taken by iterative algorithms"""
+        return {}
 
     @staticmethod
     @abstractmethod
     def get_top(*args, **kwargs) -> List:
         pass
 
+    @staticmethod
+    def select_top(scores: Dict[Any, float], tokens: Token, n: int, preserve_order=False) -> List:
+        """
+        Returns the top n doc/sentences based on the scores
+        :param scores: Ranking scores, computed using the ranking algorithm
+        :param tokens: Docs/Sentences used for the model
+        :param n: Number of docs/sentences to be returned
+        :param preserve_order: If True, then sentence order is preserved
+        :return: Top n sentences
+        """
+        return Ranking(scores, tokens).select(count=n, preserve_order=preserve_order)
+
+
+class Ranking:
+    """
+    Ranking of the docs/sentences of a corpus, i.e their scores sorted once, from which summaries of any length are
+    selected without ranking the corpus again. Docs with equal scores are ranked by their position in the corpus, so
+    that exactly the requested number of docs is selected, in the ranked order or in the order of the corpus.
+    """
+
+    def __init__(self, scores: 'Union[Dict[int, float], List[float], np.ndarray]', tokens: Token,
+                 positions: 'np.ndarray' = None):
+        """
+        :param scores: Ranking score of every doc/sentence, by position
+        :param tokens: Docs/Sentences which were ranked
+        :param positions: Position in the corpus of every ranked doc, in increasing order, e.g of the representatives
+            of the duplicates collapsed by a SentenceDeduplicator. Default - the ranked docs are the whole corpus.
+        """
+        n = tokens.get_number_of_sentences()
+        if isinstance(scores, dict):
+            scores = [scores[idx] for idx in range(n)]
+        self.__scores = np.asarray(scores, dtype=float)
+        if len(self.__scores) != n:
+            raise Exception(f"Invalid scores, expected {n} scores but got {len(self.__scores)}")
+        self.__tokens = tokens
+        if positions is not None and len(positions) != n:
+            raise Exception(f"Invalid positions, expected {n} positions but got {len(positions)}")
+        self.__positions = positions
+        # Stable sort of the negated scores, so that ties are ranked by position
+        self.__order = np.argsort(-self.__scores, kind='stable')
+        # Number of characters and tokens of every doc, computed on the first selection by budget
+        self.__lengths: Tuple['np.ndarray', 'np.ndarray'] = None
+
+    def __repr__(self):
+        return f"Ranking(sentences={len(self)})"
+
+    def __len__(self):
+        return len(self.__scores)
+
+    def get_scores(self) -> 'np.ndarray':
+        """Returns the score of every ranked doc/sentence, in the order of the corpus"""
+        return self.__scores
+
+    def get_order(self) -> 'np.ndarray':
+        """
+        Returns the indices of the ranked docs/sentences, from the highest to the lowest score, which are their
+        positions unless the ranking has positions, see get_positions
+        """
+        return self.__order
+
+    def get_tokens(self) -> Token:
+        return self.__tokens
+
+    def get_positions(self) -> 'np.ndarray':
+        """Returns the position in the corpus of every ranked doc/sentence"""
+        return np.arange(len(self)) if self.__positions is None else self.__positions
+
+    def get_count(self, reduction_ratio: float = None, count: int = None) -> int:
+        """
+        Returns the number of docs/sentences selected, i.e the most allowed by the given limits
+        :param reduction_ratio: Reduction ratio expected for the output text. i.e if ratio=0.5 then half the number
+                of sentence are selected
+        :param count: Number of docs/sentences
+        """
+        k = len(self)
+        if reduction_ratio is not None:
+            k = min(k, ceil(len(self) * (1 - reduction_ratio)))
+        if count is not None:
+            k = min(k, max(count, 0))
+        return k
+
+    def __get_lengths(self) -> Tuple['np.ndarray', 'np.ndarray']:
+        if self.__lengths is None:
+            token_ids = np.frombuffer(self.__tokens.get_token_ids(), dtype=np.intc)
+            number_of_tokens = np.diff(np.frombuffer(self.__tokens.get_offsets(), dtype=np.int64))
+            words = self.__tokens.get_vocabulary().get_words()
+            word_lengths = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+            sentences = np.repeat(np.arange(len(self)), number_of_tokens)
+            # Words are joined by a space and sentences by a separator, see utils.construct_sentences_from_ranking,
+            # the separator is counted with every sentence
+            chars = np.bincount(sentences, weights=word_lengths[token_ids], minlength=len(self)).astype(np.int64)
+            chars += np.maximum(number_of_tokens - 1, 0) + 1
+            self.__lengths = chars, number_of_tokens
+        return self.__lengths
+
+    def __fit_budget(self, k: int, max_chars: int = None, max_tokens: int = None) -> 'np.ndarray':
+        """
+        Selects up to k docs in the ranked order, skipping the docs which would exceed the budget, until no other doc
+        fits in the budget
+        """
+        chars, number_of_tokens = self.__get_lengths()
+        # The separator of the first sentence is not part of the text
+        chars_left = float('inf') if max_chars is None else max_chars + 1
+        tokens_left = float('inf') if max_tokens is None else max_tokens
+        min_chars, min_tokens = (chars.min(), number_of_tokens.min()) if len(self) else (0, 0)
+        selected = []
+        for idx in self.__order.tolist():
+            if len(selected) == k or chars_left < min_chars or tokens_left < min_tokens:
+                break
+            if chars[idx] <= chars_left and number_of_tokens[idx] <= tokens_left:
+                selected.append(idx)
+                chars_left -= chars[idx]
+                tokens_left -= number_of_tokens[idx]
+        return np.array(selected, dtype=np.int64)
+
+    def __select(self, reduction_ratio: float, count: int, max_chars: int, max_tokens: int,
+                 preserve_order) -> 'np.ndarray':
+        if reduction_ratio is None and count is None and max_chars is None and max_tokens is None:
+            raise Exception("Expected at least one of reduction_ratio, count, max_chars or max_tokens")
+        k = self.get_count(reduction_ratio, count)
+        if max_chars is None and max_tokens is None:
+            selected = self.__order[:k]
+        else:
+            selected = self.__fit_budget(k, max_chars, max_tokens)
+        # The positions are increasing, so sorting the ranked docs sorts their positions as well
+        return np.sort(selected) if preserve_order else selected
+
+    def select_positions(self, reduction_ratio: float = None, count: int = None, max_chars: int = None,
+                         max_tokens: int = None, preserve_order=False) -> 'np.ndarray':
+        """
+        Returns the positions of the selected docs/sentences, in O(k) for k docs unless a budget is given. The docs are
+        selected in the ranked order, within all the given limits.
+        :param reduction_ratio: Reduction ratio expected for the output text. i.e if ratio=0.5 then half the number
+                of sentence are selected
+        :param count: Maximum number of docs/sentences
+        :param max_chars: Maximum number of characters of the text of the selected docs, the docs which would exceed
+            it are skipped
+        :param max_tokens: Maximum number of tokens of the selected docs, the docs which would exceed it are skipped
+        :param preserve_order: If True, the positions are in the order of the corpus, else in the ranked order
+        """
+        selected = self.__select(reduction_ratio, count, max_chars, max_tokens, preserve_order)
+        return selected if self.__positions is None else self.__positions[selected]
+
+    def select(self, reduction_ratio: float = None, count: int = None, max_chars: int = None, max_tokens: int = None,
+               preserve_order=False) -> List:
+        """
+        Returns the selected docs/sentences with their scores, see select_positions for the limits
+        :param preserve_order: If True, then sentence order is preserved, else the sentences are in the ranked order
+        :return: List of (score, sentence)
+        """
+        selected = self.__select(reduction_ratio, count, max_chars, max_tokens, preserve_order)
+        return [(self.__scores[idx].item(), self.__tokens.get_sentence(idx)) for idx in selected.tolist()]
+
 
 class TextRank(BaseRanker):
 
+    def __init__(self, damping: float = 0.85, tol: float = 1.0e-6, max_iter: int = 100):
+        """
+        TextRank ranks the docs/sentences by running pagerank on the similarity graph.
+
+        :param damping: Damping factor of pagerank.
+        :param tol: Error tolerance used to check the convergence of the power iteration.
+        :param max_iter: Maximum number of power iterations.
+        """
+        self.__damping = damping
+        self.__tol = tol
+        self.__max_iter = max_iter
+        self.__iterations = 0
+
     def __repr__(self):
-        return f"TextRank()"
+        return f"TextRank(damping={self.__damping}, tol={self.__tol}, max_iter={self.__max_iter})"
 
-    def _ranking_algorithm(self, similarity_matrix: np.ndarray):
+    def _ranking_algorithm(self, similarity_matrix: 'Union[np.ndarray, sparse.spmatrix]',
+                           warm_start: 'np.ndarray' = None, weights: 'np.ndarray' = None):
         """
         Calculates doc ranking using pagerank algorithm
+        :param similarity_matrix: Dense or sparse similarity matrix of the docs
+        :param warm_start: Initial ranks for the power iteration, e.g the scores from a previous run
+        :param weights: Number of copies of every doc, e.g of the duplicates collapsed by a SentenceDeduplicator. The
+            score of a doc is then the rank of one of its copies in the corpus where every doc is repeated, the copies
+            of a doc not voting for each other, see weight_targets. Default - every doc is a single copy.
         :return: Ranking scores for each doc/sentence
         """
-        graph = nx.MultiDiGraph(similarity_matrix)
-        return nx.pagerank_numpy(graph)
+        if weights is not None:
+            similarity_matrix = weight_targets(similarity_matrix, weights)
+        ranks, self.__iterations = pagerank(similarity_matrix, damping=self.__damping, tol=self.__tol,
+                                            max_iter=self.__max_iter, warm_start=warm_start, personalization=weights)
+        if weights is not None:
+            ranks = ranks / weights
+        return dict(enumerate(ranks.tolist()))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {'pagerank_iterations': self.__iterations}
 
     @staticmethod
-    def get_top(scores: dict, tokens: Token, reduction_ratio=0.70, preserve_order=False):
+    def get_top(scores: dict, tokens: Token, reduction_ratio=0.70, preserve_order=False, verbose=False):
         """
         Returns the top n doc/sentences based on the reduction_ration
         :param scores: Ranking scores, computed using the ranking algorithm
@@ -53,17 +307,140 @@ class TextRank(BaseRanker):
         :param reduction_ratio: Reduction ratio expected for the output text. i.e if ratio=0.5 then half the number
                 of sentence are returned
         :param preserve_order: If True, then sentence order is preserved
+        :param verbose: If True, prints the number of sentences before and after summarization
         :return: Top n sentences
         """
         p = tokens.get_number_of_sentences()
         n = ceil(p * (1 - reduction_ratio))
-        print(f"\n --- Stats ---\nNumber of sentences before summarization: {p}\n"
-              f"Number of sentences after summarization: {int(n)}")
+        if verbose:
+            print(f"\n --- Stats ---\nNumber of sentences before summarization: {p}\n"
+                  f"Number of sentences after summarization: {int(n)}")
+        return TextRank.select_top(scores, tokens, n, preserve_order=preserve_order)
+
+
+class LexRank(BaseRanker):
+
+    def __init__(self, threshold: float = 0.1, continuous: bool = False, damping: float = 0.85, tol: float = 1.0e-6,
+                 max_iter: int = 100):
+        """
+        LexRank ranks the docs/sentences by running pagerank on the similarity graph pruned to the edges with a
+        similarity of at least threshold. It is meant to be used with the TfIdfCosine similarity, whose scores lie in
+        [0, 1]. Pruning keeps only the strong edges, so that the power iteration converges in fewer iterations than
+        on the full similarity graph.
+
+        :param threshold: Minimum similarity of an edge of the graph.
+        :param continuous: If True, the edges keep their similarity as weight, else every edge has a weight of 1.
+        :param damping: Damping factor of pagerank.
+        :param tol: Error tolerance used to check the convergence of the power iteration.
+        :param max_iter: Maximum number of power iterations.
+        """
+        self.__threshold = threshold
+        self.__continuous = continuous
+        self.__damping = damping
+        self.__tol = tol
+        self.__max_iter = max_iter
+        self.__iterations = 0
+
+    def __repr__(self):
+        return (f"LexRank(threshold={self.__threshold}, continuous={self.__continuous}, damping={self.__damping}, "
+                f"tol={self.__tol}, max_iter={self.__max_iter})")
+
+    def _ranking_algorithm(self, similarity_matrix: 'Union[np.ndarray, sparse.spmatrix]',
+                           warm_start: 'np.ndarray' = None, weights: 'np.ndarray' = None):
+        """
+        Calculates doc ranking using pagerank on the thresholded similarity graph
+        :param similarity_matrix: Dense or sparse similarity matrix of the docs
+        :param warm_start: Initial ranks for the power iteration, e.g the scores from a previous run
+        :param weights: Number of copies of every doc, see TextRank
+        :return: Ranking scores for each doc/sentence
+        """
+        if sparse.issparse(similarity_matrix):
+            graph = sparse.csr_matrix(similarity_matrix, dtype=float, copy=True)
+            graph.data[graph.data < self.__threshold] = 0
+            graph.eliminate_zeros()
+            if not self.__continuous:
+                graph.data[:] = 1.0
+        else:
+            matrix = np.asarray(similarity_matrix, dtype=float)
+            edges = matrix >= self.__threshold
+            if self.__threshold <= 0:
+                edges &= matrix != 0
+            n = matrix.shape[0]
+            flat = np.flatnonzero(edges)
+            if n > 256 and len(flat) < n * n // 4:
+                # A sparse graph makes every power iteration proportional to the number of edges, small graphs are kept
+                # dense as the overhead of the sparse product dominates. It is built from the flat positions of the
+                # edges, which is much cheaper than converting the dense matrix.
+                indptr = np.zeros(n + 1, dtype=np.int64)
+                np.cumsum(np.count_nonzero(edges, axis=1), out=indptr[1:])
+                data = matrix.ravel()[flat] if self.__continuous else np.ones(len(flat))
+                graph = sparse.csr_matrix((data, flat % n, indptr), shape=matrix.shape)
+            else:
+                graph = np.where(edges, matrix, 0.0) if self.__continuous else edges.astype(float)
+        if weights is not None:
+            graph = weight_targets(graph, weights)
+        ranks, self.__iterations = pagerank(graph, damping=self.__damping, tol=self.__tol, max_iter=self.__max_iter,
+                                            warm_start=warm_start, personalization=weights)
+        if weights is not None:
+            ranks = ranks / weights
+        return dict(enumerate(ranks.tolist()))
 
-        if preserve_order:
-            # Return the sentences as it was in the original corpus without disturbing the order
-            threshold = nlargest(n, scores.items(), key=lambda x: x[1])[-1][1]
-            return [(scores[idx], sen) for idx, sen in enumerate(tokens.get_sentences()) if scores[idx] >= threshold]
+    def get_stats(self) -> Dict[str, Any]:
+        return {'pagerank_iterations': self.__iterations}
 
-        sentences = list(sorted(((scores[i], s) for i, s in enumerate(tokens.get_sentences())), reverse=True))
-        return sentences[:n]
+    @staticmethod
+    def get_top(scores: dict, tokens: Token, reduction_ratio=0.70, preserve_order=False):
+        """
+        Returns the top n doc/sentences based on the reduction_ration, see TextRank.get_top
+        """
+        n = ceil(tokens.get_number_of_sentences() * (1 - reduction_ratio))
+        return LexRank.select_top(scores, tokens, n, preserve_order=preserve_order)
+
+
+class DegreeCentrality(BaseRanker):
+
+    def __init__(self, threshold: float = None):
+        """
+        DegreeCentrality ranks the docs/sentences by their weighted in-degree in the similarity graph, i.e the sum of
+        their similarities with the other docs. It needs a single pass over the similarity matrix instead of an
+        iterative solve, which makes it the cheapest ranker. Like pagerank, which propagates the rank of doc i to doc j
+        along matrix[i][j], a doc is scored by the column of the matrix, which equals its row for symmetric
+        similarities like TfIdfCosine.
+
+        :param threshold: If given, only the similarities of at least threshold are summed up.
+        """
+        self.__threshold = threshold
+
+    def __repr__(self):
+        return f"DegreeCentrality(threshold={self.__threshold})"
+
+    def _ranking_algorithm(self, similarity_matrix: 'Union[np.ndarray, sparse.spmatrix]',
+                           warm_start: 'np.ndarray' = None, weights: 'np.ndarray' = None):
+        """
+        Calculates doc ranking using the weighted degree of the docs
+        :param similarity_matrix: Dense or sparse similarity matrix of the docs
+        :param warm_start: Ignored, the degrees are computed in a single pass
+        :param weights: Number of copies of every doc, the similarity of doc i to doc j counts once per copy of doc i,
+            e.g of the duplicates collapsed by a SentenceDeduplicator. Default - every doc is a single copy.
+        :return: Ranking scores for each doc/sentence
+        """
+        if sparse.issparse(similarity_matrix):
+            matrix = sparse.csr_matrix(similarity_matrix, dtype=float)
+            if self.__threshold is not None:
+                matrix = matrix.multiply(matrix >= self.__threshold)
+            degrees = np.asarray(matrix.sum(axis=0) if weights is None else
+                                 matrix.T @ np.asarray(weights, dtype=float)).ravel()
+        else:
+            matrix = np.asarray(similarity_matrix, dtype=float)
+            if self.__threshold is not None:
+                matrix = np.where(matrix >= self.__threshold, matrix, 0)
+            degrees = matrix.sum(axis=0) if weights is None else np.asarray(weights, dtype=float) @ matrix
+        return dict(enumerate(degrees.tolist()))
+
+    @staticmethod
+    def get_top(scores: dict, tokens: Token, reduction_ratio=0.70, preserve_order=False):
+        """
+        Returns the top n doc/sentences based on the reduction_ration, see TextRank.get_top
+        """
+        n = ceil(tokens.get_number_of_sentences() * (1 - reduction_ratio))
+        return DegreeCentrality.select_top(scores, tokens, n, preserve_order=preserve_order)
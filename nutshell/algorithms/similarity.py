@@ -1,9 +1,41 @@
+import weakref
 from abc import ABC, abstractmethod
-from typing import Dict
-
-import numpy as np
+from collections import Counter
+from math import sqrt
+from typing import Dict, Tuple, Union
 
 from nutshell.preprocessing.tokenizer import Token
+from nutshell.utils import lazy_import
+
+np = lazy_import('numpy')
+sparse = lazy_import('scipy.sparse')
+multiprocessing = lazy_import('multiprocessing')
+shared_memory = lazy_import('multiprocessing.shared_memory')
+
+
+def _has_shared_memory() -> bool:
+    """Returns whether multiprocessing.shared_memory, Python 3.8+, is available to the parallel similarity matrix"""
+    try:
+        shared_memory.load()
+    except ImportError:
+        return False
+    return True
+
+
+# Operands of the similarity matrix product, shared by the row blocks computed by a worker process
+_block_operands: tuple = None
+
+
+def _init_block_worker(weighted: 'sparse.csr_matrix', tf_transposed: 'sparse.csc_matrix', shm_name: str, n: int):
+    global _block_operands
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _block_operands = weighted, tf_transposed, shm, np.ndarray((n, n), dtype=np.float64, buffer=shm.buf)
+
+
+def _similarity_block(rows: Tuple[int, int]):
+    """Writes the rows [start, end) of the similarity matrix straight into the shared matrix"""
+    weighted, tf_transposed, _, matrix = _block_operands
+    BM25Plus._write_block(matrix, weighted, tf_transposed, *rows)
 
 
 class BaseSimilarityAlgo(ABC):
@@ -16,7 +48,7 @@ class BaseSimilarityAlgo(ABC):
         pass
 
     @abstractmethod
-    def similarity_matrix(self, *args) -> np.ndarray:
+    def similarity_matrix(self, *args) -> 'Union[np.ndarray, sparse.csr_matrix]':
         pass
 
 
@@ -24,17 +56,62 @@ class BM25Plus(BaseSimilarityAlgo):
     """
     BM25Plus is an algorithm to find similarity b/w 2 docs/sentences
     """
+    METHODS = ('matrix', 'loop', 'sparse')
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, method: str = 'matrix', top_k: int = None,
+                 threshold: float = None, max_doc_freq: float = None, block_size: int = 2 ** 22, workers: int = None):
+        """
+        :param k1: Term frequency saturation parameter.
+        :param b: Document length normalization parameter.
+        :param method: 'matrix' computes all the scores at once using sparse matrix products, 'loop' scores every
+            pair of docs one at a time and is kept as the reference implementation. 'sparse' returns the similarity
+            graph as a sparse matrix, only the pairs of docs sharing a word are scored and the weak edges can be
+            pruned, which keeps large corpora tractable in time and memory.
+        :param top_k: Sparse method only, every doc keeps only the edges to its top_k most similar docs.
+        :param threshold: Sparse method only, every doc keeps only the edges with a score of at least threshold.
+        :param max_doc_freq: Sparse method only, the words contained in more than this fraction of the docs are
+            ignored, like stopwords. Such words make almost every pair of docs a candidate while contributing little
+            to the scores, due to their low IDF.
+        :param block_size: Sparse method only, maximum number of candidate pairs scored at once, which bounds the memory
+            used before pruning. The docs are scored in blocks of consecutive docs, a doc having more candidates than
+            the block size is scored alone. The matrix method computed by several workers splits the matrix into blocks
+            of consecutive rows having at most block_size scores.
+        :param workers: Matrix method only, number of worker processes computing the blocks of rows of the similarity
+            matrix in parallel. The workers write the scores straight into a shared memory buffer, so that they are not
+            pickled back, and the result is identical to the serial one. The matrix is computed serially if shared
+            memory is not available, i.e before Python 3.8. Default - the matrix is computed serially.
+        """
+        if method not in BM25Plus.METHODS:
+            raise Exception(f"Invalid method '{method}'. Valid methods are {BM25Plus.METHODS}")
+        if method != 'sparse' and (top_k is not None or threshold is not None or max_doc_freq is not None):
+            raise Exception("top_k, threshold and max_doc_freq are only supported by the sparse method")
+        if top_k is not None and top_k < 1:
+            raise Exception(f"Invalid top_k {top_k}, expected at least 1 edge per doc")
+        if workers is not None and method != 'matrix':
+            raise Exception("workers is only supported by the matrix method")
+        if workers is not None and workers < 1:
+            raise Exception(f"Invalid workers {workers}, expected at least 1 worker")
 
-    def __init__(self, k1: float = 1.2, b: float = 0.75):
         self.__idf = None
         self.__avg_doc_len: float = 0
 
         # Algorithm specific parameters
         self.__k1 = k1
         self.__b = b
+        self.__method = method
+        self.__top_k = top_k
+        self.__threshold = threshold
+        self.__max_doc_freq = max_doc_freq
+        self.__block_size = block_size
+        self.__workers = workers
 
     def __repr__(self):
-        return f"BM25Plus(k1={self.__k1}, b={self.__b})"
+        if self.__method == 'sparse':
+            return (f"BM25Plus(k1={self.__k1}, b={self.__b}, method='{self.__method}', top_k={self.__top_k}, "
+                    f"threshold={self.__threshold}, max_doc_freq={self.__max_doc_freq})")
+        if self.__workers is not None:
+            return f"BM25Plus(k1={self.__k1}, b={self.__b}, method='{self.__method}', workers={self.__workers})"
+        return f"BM25Plus(k1={self.__k1}, b={self.__b}, method='{self.__method}')"
 
     def _calculate_similarity_score(self, doc1: list, doc2: list) -> float:
         """
@@ -50,13 +127,49 @@ class BM25Plus(BaseSimilarityAlgo):
                     1 - self.__b + self.__b * len(doc1) / self.__avg_doc_len))
         return score
 
-    def similarity_matrix(self, tokens: Token, idf: Dict[str, float]) -> np.ndarray:
+    @staticmethod
+    def _term_frequency_matrix(tokens: Token) -> 'sparse.csr_matrix':
         """
-        Calculates the similarity matrix for the docs
-        :return: similarity matrix
+        Builds the sparse doc x word frequency matrix straight from the word id buffers of the tokens, the column of
+        a word is its id in the vocabulary of the tokens
+        :return: Term frequency matrix
         """
-        self.__avg_doc_len = tokens.get_avg_token_per_sentence()
-        self.__idf = idf
+        token_ids = np.frombuffer(tokens.get_token_ids(), dtype=np.intc)
+        offsets = np.frombuffer(tokens.get_offsets(), dtype=np.int64)
+        tf = sparse.csr_matrix((np.ones(len(token_ids)), token_ids, offsets),
+                               shape=(tokens.get_number_of_sentences(), len(tokens.get_vocabulary())), copy=True)
+        tf.sum_duplicates()
+        return tf
+
+    def _weighted_term_matrix(self, tf: 'sparse.csr_matrix', idf: 'np.ndarray',
+                              avg_doc_len: float) -> 'sparse.csr_matrix':
+        """
+        Applies the BM25Plus saturation and length normalization to every non zero term frequency, so that the score
+        b/w doc i and doc j becomes the dot product of row i of the weighted matrix and row j of the tf matrix.
+        :param tf: Term frequency matrix
+        :param idf: IDF of every column of the tf matrix
+        :param avg_doc_len: Average number of tokens per doc
+        :return: Weighted term matrix
+        """
+        if tf.nnz == 0:
+            return tf.copy()
+        doc_len = np.repeat(np.asarray(tf.sum(axis=1)).ravel(), np.diff(tf.indptr))
+        weights = self.term_weights(tf.data, doc_len, idf[tf.indices], avg_doc_len)
+        return sparse.csr_matrix((weights, tf.indices, tf.indptr), shape=tf.shape)
+
+    def term_weights(self, freq, doc_len, idf, avg_doc_len: float):
+        """
+        Calculates the contribution of a single occurrence of a word in doc2 to the similarity score b/w doc1 and
+        doc2. Works element wise on numpy arrays as well.
+        :param freq: Frequency of the word in doc1
+        :param doc_len: Number of tokens in doc1
+        :param idf: IDF of the word
+        :param avg_doc_len: Average number of tokens per doc
+        :return: Weight of the word
+        """
+        return idf * freq * (self.__k1 + 1) / (freq + self.__k1 * (1 - self.__b + self.__b * doc_len / avg_doc_len))
+
+    def __similarity_matrix_loop(self, tokens: Token) -> 'np.ndarray':
         n = tokens.get_number_of_sentences()
         matrix = np.zeros((n, n))
         for i, doc1 in enumerate(tokens.get_sentences()):
@@ -64,3 +177,193 @@ class BM25Plus(BaseSimilarityAlgo):
                 if i != j:
                     matrix[i][j] = self._calculate_similarity_score(doc1, doc2)
         return matrix
+
+    def __weighted_and_term_matrix(self, tokens: Token):
+        tf = BM25Plus._term_frequency_matrix(tokens)
+        words = tokens.get_vocabulary().get_words()
+        idf = np.fromiter((self.__idf.get(word, 0.0) for word in words), dtype=float, count=len(words))
+        return self._weighted_term_matrix(tf, idf, self.__avg_doc_len), tf
+
+    def __similarity_matrix_product(self, tokens: Token) -> 'np.ndarray':
+        weighted, tf = self.__weighted_and_term_matrix(tokens)
+        blocks = BM25Plus._row_blocks(tf.shape[0], self.__block_size)
+        if self.__workers is not None and self.__workers > 1 and len(blocks) > 1 and _has_shared_memory():
+            return self.__similarity_matrix_parallel(weighted, tf, blocks)
+        matrix = (weighted @ tf.T).toarray()
+        np.fill_diagonal(matrix, 0)
+        return matrix
+
+    @staticmethod
+    def _row_blocks(n: int, block_size: int):
+        """
+        Splits the rows of the n x n similarity matrix into blocks of consecutive rows having at most block_size scores
+        :return: List of the (start, end) range of every block
+        """
+        rows = max(1, block_size // max(n, 1))
+        return [(start, min(start + rows, n)) for start in range(0, n, rows)]
+
+    @staticmethod
+    def _write_block(matrix: 'np.ndarray', weighted: 'sparse.csr_matrix', tf_transposed: 'sparse.csc_matrix',
+                     start: int, end: int):
+        """
+        Computes the rows [start, end) of the similarity matrix into matrix. The sparse product computes every row
+        independently of the others, so the scores are identical to the ones of the product of the whole matrices.
+        """
+        block = matrix[start:end]
+        block[:] = (weighted[start:end] @ tf_transposed).toarray()
+        block[np.arange(end - start), np.arange(start, end)] = 0
+
+    def __similarity_matrix_parallel(self, weighted: 'sparse.csr_matrix', tf: 'sparse.csr_matrix',
+                                     blocks: list) -> 'np.ndarray':
+        n = tf.shape[0]
+        shm = shared_memory.SharedMemory(create=True, size=n * n * np.dtype(np.float64).itemsize)
+        try:
+            initargs = (weighted, tf.T, shm.name, n)
+            with multiprocessing.Pool(min(self.__workers, len(blocks)), initializer=_init_block_worker,
+                                      initargs=initargs) as pool:
+                pool.map(_similarity_block, blocks, chunksize=1)
+        except BaseException:
+            shm.close()
+            raise
+        finally:
+            shm.unlink()
+        # The matrix is returned without a copy, the buffer stays mapped until the matrix and its views are released
+        matrix = np.ndarray((n, n), dtype=np.float64, buffer=shm.buf)
+        weakref.finalize(matrix, shm.close)
+        return matrix
+
+    @staticmethod
+    def _candidate_blocks(tf: 'sparse.csr_matrix', postings: 'sparse.csr_matrix', block_size: int):
+        """
+        Splits the docs into blocks of consecutive docs having at most block_size candidate pairs, bounded by the sum
+        of the doc frequencies of the words of every doc
+        :return: Iterator of the (start, end) range of every block
+        """
+        n = tf.shape[0]
+        doc_freq = np.diff(postings.indptr)
+        rows = np.repeat(np.arange(n), np.diff(tf.indptr))
+        candidates = np.cumsum(np.bincount(rows, weights=doc_freq[tf.indices], minlength=n))
+        start = 0
+        while start < n:
+            scored = candidates[start - 1] if start else 0
+            end = max(int(np.searchsorted(candidates, scored + block_size, side='right')), start + 1)
+            yield start, end
+            start = end
+
+    @staticmethod
+    def _top_k_edges(indptr: 'np.ndarray', scores: 'np.ndarray', k: int) -> 'np.ndarray':
+        """
+        Selects the k edges with the highest scores of every row, ties broken by the lowest doc id
+        :param indptr: Range of the edges of every row, the edges of a row are sorted by doc id
+        :param scores: Scores of the edges
+        :param k: Number of edges kept per row
+        :return: Mask of the edges kept
+        """
+        keep = np.ones(len(scores), dtype=bool)
+        for row in np.flatnonzero(np.diff(indptr) > k):
+            start, end = indptr[row], indptr[row + 1]
+            row_scores = scores[start:end]
+            kth = np.partition(row_scores, len(row_scores) - k)[len(row_scores) - k]
+            above = row_scores > kth
+            ties = np.flatnonzero(row_scores == kth)[:k - np.count_nonzero(above)]
+            above[ties] = True
+            keep[start:end] = above
+        return keep
+
+    def __similarity_graph(self, tokens: Token) -> 'sparse.csr_matrix':
+        weighted, tf = self.__weighted_and_term_matrix(tokens)
+        # Rows of the transposed tf matrix are the posting lists of the words, so the product of a block of docs with
+        # it only scores the candidate pairs sharing at least a word
+        postings = tf.T.tocsr()
+        n = tf.shape[0]
+        if self.__max_doc_freq is not None:
+            words = np.flatnonzero(np.diff(postings.indptr) <= self.__max_doc_freq * n)
+            weighted, tf, postings = weighted[:, words], tf[:, words], postings[words]
+        data, indices, counts = [], [], []
+        for start, end in BM25Plus._candidate_blocks(tf, postings, self.__block_size):
+            block = (weighted[start:end] @ postings).tocsr()
+            block.sort_indices()
+            rows = np.repeat(np.arange(start, end), np.diff(block.indptr))
+            keep = (block.indices != rows) & (block.data != 0)
+            if self.__threshold is not None:
+                keep &= block.data >= self.__threshold
+            rows, cols, scores = rows[keep], block.indices[keep], block.data[keep]
+            if self.__top_k is not None:
+                keep = BM25Plus._top_k_edges(np.searchsorted(rows, np.arange(start, end + 1)), scores, self.__top_k)
+                rows, cols, scores = rows[keep], cols[keep], scores[keep]
+            data.append(scores)
+            indices.append(cols)
+            counts.append(np.bincount(rows - start, minlength=end - start))
+
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        if n:
+            np.cumsum(np.concatenate(counts), out=indptr[1:])
+        return sparse.csr_matrix((np.concatenate(data) if data else np.zeros(0),
+                                  np.concatenate(indices) if indices else np.zeros(0, dtype=np.int32), indptr),
+                                 shape=(n, n))
+
+    def similarity_matrix(self, tokens: Token, idf: Dict[str, float]) -> 'Union[np.ndarray, sparse.csr_matrix]':
+        """
+        Calculates the similarity matrix for the docs
+        :param tokens: Tokens for the corpus
+        :param idf: Inverse document frequency
+        :return: similarity matrix, a sparse matrix for the sparse method
+        """
+        self.__avg_doc_len = tokens.get_avg_token_per_sentence()
+        self.__idf = idf
+        if self.__method == 'loop':
+            return self.__similarity_matrix_loop(tokens)
+        if self.__method == 'sparse':
+            return self.__similarity_graph(tokens)
+        return self.__similarity_matrix_product(tokens)
+
+
+class TfIdfCosine(BaseSimilarityAlgo):
+    """
+    TfIdfCosine scores the similarity b/w 2 docs/sentences by the cosine of their tf-idf vectors, in [0, 1]. It is the
+    similarity of LexRank, whose threshold is an absolute similarity.
+    """
+
+    def __init__(self):
+        self.__idf = None
+
+    def __repr__(self):
+        return "TfIdfCosine()"
+
+    def __vector(self, doc: list) -> Dict[str, float]:
+        return {word: freq * self.__idf.get(word, 0.0) for word, freq in Counter(doc).items()}
+
+    def _calculate_similarity_score(self, doc1: list, doc2: list) -> float:
+        """
+        Calculates the similarity score b/w given 2 docs
+        :param doc1: Document 1
+        :param doc2: Document 2
+        :return: similarity score
+        """
+        vector1, vector2 = self.__vector(doc1), self.__vector(doc2)
+        norm = sqrt(sum(w * w for w in vector1.values())) * sqrt(sum(w * w for w in vector2.values()))
+        if norm == 0:
+            return 0.0
+        return sum(w * vector2.get(word, 0.0) for word, w in vector1.items()) / norm
+
+    def similarity_matrix(self, tokens: Token, idf: Dict[str, float]) -> 'np.ndarray':
+        """
+        Calculates the similarity matrix for the docs, using the l2 normalized tf-idf matrix of the docs
+        :param tokens: Tokens for the corpus
+        :param idf: Inverse document frequency
+        :return: similarity matrix
+        """
+        self.__idf = idf
+        tf = BM25Plus._term_frequency_matrix(tokens)
+        words = tokens.get_vocabulary().get_words()
+        idf = np.fromiter((idf.get(word, 0.0) for word in words), dtype=float, count=len(words))
+        # The tf-idf weights are l2 normalized in place of the data of the tf matrix, so that the cosine similarity
+        # becomes the dot product of the rows
+        weights = tf.data * idf[tf.indices]
+        rows = np.repeat(np.arange(tf.shape[0]), np.diff(tf.indptr))
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=tf.shape[0]))[rows]
+        np.divide(weights, norms, out=weights, where=norms > 0)
+        weighted = sparse.csr_matrix((weights, tf.indices, tf.indptr), shape=tf.shape)
+        matrix = (weighted @ weighted.T).toarray()
+        np.fill_diagonal(matrix, 0)
+        return matrix
@@ -0,0 +1,168 @@
+"""
+Content addressed cache of the results of the models. Syndicated copies of an article are summarised once: the key of a
+result hashes the normalized corpus, the configuration of the model, i.e the repr of its components, and the parameters
+of the call. Results are kept in a bounded in-memory LRU and optionally in a SQLite file shared by the worker processes.
+"""
+import json
+import pickle
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from copy import deepcopy
+from hashlib import blake2b
+from os import getpid
+from typing import Any, Callable, Dict
+
+from nutshell.instrumentation import NULL_RECORDER, Recorder
+from nutshell.utils import lazy_import
+
+sqlite3 = lazy_import('sqlite3')
+
+WHITESPACE = re.compile(r'\s+')
+
+# Marks a missing entry, as None can be a valid result
+_MISSING = object()
+
+
+def normalize_corpus(corpus: str) -> str:
+    """
+    Normalizes the corpus for the cache key, i.e unicode NFC and collapsed whitespace, so that copies of a text that
+    differ only in their layout share their results
+    """
+    return WHITESPACE.sub(' ', unicodedata.normalize('NFC', corpus)).strip()
+
+
+def cache_key(corpus: str, config: str, params: Dict[str, Any]) -> str:
+    """
+    Returns the key of the result of a model call
+    :param corpus: Text processed by the call
+    :param config: Configuration of the model, e.g its repr
+    :param params: Parameters of the call, they must be JSON serializable
+    :return: Hex digest of the normalized corpus, the configuration and the parameters
+    """
+    digest = blake2b(digest_size=20)
+    for part in (normalize_corpus(corpus), config, json.dumps(params, sort_keys=True)):
+        data = part.encode('utf-8')
+        digest.update(len(data).to_bytes(8, 'little'))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Two tier cache of the results of the models. The memory tier is a LRU of at most max_size results. The optional disk
+    tier is a SQLite file, which persists the results across runs and is shared by every process opening the same path,
+    e.g the workers of summarise_many. It is thread safe, copies of a model share the cache of the model, and pickled
+    copies, e.g sent to worker processes, start with an empty memory tier and share the disk tier.
+    """
+
+    def __init__(self, max_size: int = 1024, path: str = None, timeout: float = 30.0):
+        """
+        :param max_size: Maximum number of results held in memory, the least recently used ones are evicted first
+        :param path: Path of the SQLite file of the disk tier, created if missing. Default - memory tier only.
+        :param timeout: Seconds a process waits for the lock of the SQLite file held by another process
+        """
+        if max_size < 0:
+            raise Exception(f"Invalid max_size {max_size}, expected a non negative number of results")
+        self.__max_size = max_size
+        self.__path = path
+        self.__timeout = timeout
+        self.__entries: OrderedDict = OrderedDict()
+        self.__lock = threading.Lock()
+        # SQLite connections can't be shared by threads nor inherited by forked processes
+        self.__local = threading.local()
+        self.__stats = dict.fromkeys(('hits', 'disk_hits', 'misses', 'evictions'), 0)
+        if path is not None:
+            self.__connection()
+
+    def __repr__(self):
+        if self.__path is not None:
+            return f"ResultCache(max_size={self.__max_size}, path='{self.__path}')"
+        return f"ResultCache(max_size={self.__max_size})"
+
+    def __reduce__(self):
+        return ResultCache, (self.__max_size, self.__path, self.__timeout)
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Returns the metrics of the cache: hits of the memory tier, hits of the disk tier, misses, evictions from the
+        memory tier and number of results held in memory
+        """
+        with self.__lock:
+            return dict(self.__stats, size=len(self.__entries))
+
+    def __connection(self) -> 'sqlite3.Connection':
+        local = self.__local
+        if getattr(local, 'pid', None) != getpid():
+            local.connection = sqlite3.connect(self.__path, timeout=self.__timeout, isolation_level=None)
+            local.connection.execute('PRAGMA journal_mode=WAL')
+            local.connection.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB NOT NULL)')
+            local.pid = getpid()
+        return local.connection
+
+    def __remember(self, key: str, value):
+        self.__entries[key] = value
+        self.__entries.move_to_end(key)
+        while len(self.__entries) > self.__max_size:
+            self.__entries.popitem(last=False)
+            self.__stats['evictions'] += 1
+
+    def get(self, key: str, default=None):
+        """Returns the result of the key, looked up in memory then on disk, or default if it is not cached"""
+        with self.__lock:
+            value = self.__entries.get(key, _MISSING)
+            if value is not _MISSING:
+                self.__entries.move_to_end(key)
+                self.__stats['hits'] += 1
+                # Results, e.g the sentences of the summaries, are deep copied so that callers can't alter the cached
+                # ones
+                return deepcopy(value)
+        if self.__path is not None:
+            row = self.__connection().execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                value = pickle.loads(row[0])
+                with self.__lock:
+                    self.__stats['disk_hits'] += 1
+                    self.__remember(key, value)
+                return deepcopy(value)
+        with self.__lock:
+            self.__stats['misses'] += 1
+        return default
+
+    def put(self, key: str, value):
+        """Caches a copy of the result of the key in both tiers"""
+        with self.__lock:
+            self.__remember(key, deepcopy(value))
+        if self.__path is not None:
+            self.__connection().execute('INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)',
+                                        (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)))
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], recorder: Recorder = NULL_RECORDER):
+        """
+        Returns the cached result of the key, or computes and caches it
+        :param key: Key of the result, see cache_key
+        :param compute: Computes the result
+        :param recorder: Recorder of the pipeline call, the lookup is recorded as the cache_lookup stage and the
+            cache_hit counter
+        """
+        with recorder.stage('cache_lookup'):
+            value = self.get(key, _MISSING)
+        recorder.count('cache_hit', int(value is not _MISSING))
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """Removes every result from both tiers, the metrics are kept"""
+        with self.__lock:
+            self.__entries.clear()
+        if self.__path is not None:
+            self.__connection().execute('DELETE FROM results')
@@ -0,0 +1,284 @@
+"""
+Command line summarizer for bulk jobs. Reads the documents from files, directories, globs or JSON lines on stdin,
+summarises them and/or extracts their keywords on a pool of worker processes and streams the results as JSON lines.
+
+    nutshell articles/ 'feeds/**/*.jsonl.gz' --workers 8 --task both --output results.jsonl --checkpoint done.txt
+    cat documents.jsonl | nutshell --keywords 10 > keywords.jsonl
+
+Text files are one document each, or one document per paragraph with --paragraphs. JSON lines files and stdin hold one
+document per line, e.g {"id": "a1", "text": "..."}. Every result line carries the id of its document, the path of its
+file, or the path and the line number of its line if it has no id.
+
+With --checkpoint, the ids of the completed documents are appended to the checkpoint file, and the documents already
+in it are skipped when the job is run again, the results being appended to the output file. A document completed right
+before an interruption may be output twice, never lost.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from array import array
+from typing import Dict, Iterable, Iterator, Set, TextIO, Tuple
+
+from nutshell import parallel
+from nutshell.cache import ResultCache
+from nutshell.model import Analyzer, KeywordExtractor, Summarizer
+from nutshell.preprocessing.cleaner import NLTKCleaner
+from nutshell.preprocessing.deduplicator import SentenceDeduplicator
+from nutshell.preprocessing.preprocessor import TextPreProcessor
+from nutshell.preprocessing.tokenizer import TOKENIZERS
+from nutshell.utils import construct_sentences_from_ranking, iter_lines, iter_paragraphs, lazy_import
+
+np = lazy_import('numpy')
+
+TASKS = ('summarise', 'keywords', 'both')
+DEDUPLICATION = ('exact', 'near')
+JSONL_SUFFIXES = ('.jsonl', '.ndjson')
+# Files picked up from directories, explicit files and globs are read whatever their extension
+DIRECTORY_SUFFIXES = ('.txt', '.text') + JSONL_SUFFIXES
+
+
+def _strip_gz(path: str) -> str:
+    return path[:-3] if path.endswith('.gz') else path
+
+
+def expand_inputs(inputs: Iterable[str], exclude: Iterable[str] = ()) -> Iterator[str]:
+    """
+    Expands the files, directories and glob patterns into file paths, '-' standing for stdin
+    :param inputs: Files, directories or glob patterns
+    :param exclude: Paths never yielded, e.g the output and checkpoint files of the job
+    """
+    excluded = {os.path.realpath(path) for path in exclude if path is not None}
+    for item in inputs:
+        if item == '-':
+            yield item
+        elif os.path.isfile(item):
+            if os.path.realpath(item) not in excluded:
+                yield item
+        elif os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs.sort()
+                for name in sorted(files):
+                    path = os.path.join(root, name)
+                    if _strip_gz(name).endswith(DIRECTORY_SUFFIXES) and os.path.realpath(path) not in excluded:
+                        yield path
+        else:
+            paths = sorted(glob.glob(item, recursive=True))
+            if not paths:
+                raise Exception(f"No such file, directory or pattern '{item}'")
+            yield from (path for path in paths if os.path.isfile(path) and os.path.realpath(path) not in excluded)
+
+
+def _iter_jsonl_records(lines: Iterable[str], source: str, field: str, id_field: str) -> Iterator[Tuple[str, object]]:
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            payload = json.loads(line)
+            text = payload[field]
+        except (ValueError, KeyError, TypeError) as e:
+            # Invalid lines are reported in the results instead of aborting the job
+            text = Exception(f"Invalid document: {e!r}")
+            payload = {}
+        doc_id = payload.get(id_field) if isinstance(payload, dict) else None
+        if isinstance(doc_id, (list, dict)):
+            doc_id = json.dumps(doc_id, sort_keys=True)
+        yield (f"{source}:{number}" if doc_id is None else doc_id), text
+
+
+def iter_records(paths: Iterable[str], field='text', id_field='id', paragraphs=False) -> Iterator[Tuple[str, object]]:
+    """
+    Iterates the (id, text) of the documents of the files lazily
+    :param paths: File paths, '-' standing for JSON lines on stdin
+    :param field: Field of the JSON documents holding the text
+    :param id_field: Field of the JSON documents holding their id
+    :param paragraphs: If True, every paragraph of the text files is a document, else every file
+    """
+    for path in paths:
+        if path == '-':
+            yield from _iter_jsonl_records((line.rstrip('\r\n') for line in sys.stdin), 'stdin', field, id_field)
+        elif _strip_gz(path).endswith(JSONL_SUFFIXES):
+            yield from _iter_jsonl_records(iter_lines(path), path, field, id_field)
+        elif paragraphs:
+            for number, paragraph in enumerate(iter_paragraphs(path), start=1):
+                yield f"{path}#{number}", paragraph
+        else:
+            yield path, '\n'.join(iter_lines(path))
+
+
+class _Job:
+    """Processes a document in a worker, i.e runs the model, renders its result and times it"""
+
+    def __init__(self, model, task: str, kwargs: dict):
+        self.__model = model
+        self.__task = task
+        self.__kwargs = kwargs
+
+    def __repr__(self):
+        return f"_Job(model={self.__model}, task='{self.__task}')"
+
+    def warmup(self):
+        self.__model.warmup()
+
+    def run(self, record: Tuple[str, object]) -> Tuple[str, dict, float]:
+        """
+        :return: Id of the document, its result and the seconds taken
+        """
+        doc_id, text = record
+        start = time.perf_counter()
+        try:
+            if isinstance(text, Exception):
+                raise text
+            if not isinstance(text, str):
+                raise Exception(f"Expected the text of the document to be a string, got {type(text).__name__}")
+            if self.__task == 'summarise':
+                result = {'summary': construct_sentences_from_ranking(self.__model.summarise(text, **self.__kwargs))}
+            elif self.__task == 'keywords':
+                result = {'keywords': list(self.__model.extract_keywords(text, **self.__kwargs))}
+            else:
+                analysis = self.__model.analyse(text, **self.__kwargs)
+                result = {'summary': construct_sentences_from_ranking(analysis['summary']),
+                          'keywords': list(analysis['keywords'])}
+        except Exception as e:
+            result = {'error': str(e) or repr(e)}
+        return doc_id, result, time.perf_counter() - start
+
+
+def build_job(args) -> _Job:
+    """Returns the job of the parsed command line arguments"""
+    tokenizer = TOKENIZERS[args.tokenizer]()
+    cache = None if args.cache is None else ResultCache(path=args.cache)
+    deduplicator = None
+    if args.deduplicate is not None:
+        deduplicator = SentenceDeduplicator(near_duplicates=args.deduplicate == 'near')
+    summarizer = Summarizer(preprocessor=TextPreProcessor(tokenizer=tokenizer), cache=cache, deduplicator=deduplicator)
+    keyword_extractor = KeywordExtractor(
+        preprocessor=TextPreProcessor(tokenizer=tokenizer, cleaner=NLTKCleaner(skip_stemming=True)), cache=cache)
+    summary_kwargs = {'reduction_ratio': args.reduction_ratio, 'preserve_order': args.preserve_order}
+    if args.task == 'summarise':
+        return _Job(summarizer, args.task, summary_kwargs)
+    if args.task == 'keywords':
+        return _Job(keyword_extractor, args.task, {'count': args.keywords})
+    return _Job(Analyzer(summarizer=summarizer, keyword_extractor=keyword_extractor, tokenizer=tokenizer),
+                args.task, dict(summary_kwargs, count=args.keywords))
+
+
+def load_checkpoint(path: str) -> Set[str]:
+    """Returns the ids of the documents completed by the previous runs"""
+    if path is None or not os.path.exists(path):
+        return set()
+    with open(path, encoding='utf-8') as f:
+        # The last line may be partial if the previous run was killed while writing it
+        return {json.loads(line) for line in f if line.endswith('\n')}
+
+
+def open_checkpoint(path: str) -> TextIO:
+    """Opens the checkpoint file for appending the ids of the completed documents"""
+    with open(path, 'ab+') as f:
+        f.seek(0)
+        # Drops the partial last line of a killed run, which the ids appended next would be written after
+        f.truncate(f.read().rfind(b'\n') + 1)
+    return open(path, 'a', encoding='utf-8')
+
+
+def report(stats: Dict, latencies: array, seconds: float) -> str:
+    """Returns the throughput and latency report of the job"""
+    lines = [f"documents: {stats['documents']} completed, {stats['failed']} failed, {stats['skipped']} skipped",
+             f"elapsed: {seconds:.2f}s, throughput: {stats['documents'] / max(seconds, 1e-9):.2f} docs/s, "
+             f"{stats['chars'] / max(seconds, 1e-9):.0f} chars/s"]
+    if latencies:
+        p50, p90, p99 = np.percentile(np.frombuffer(latencies, dtype=np.float64), [50, 90, 99]).tolist()
+        lines.append(f"latency: p50 {p50 * 1000:.1f}ms, p90 {p90 * 1000:.1f}ms, p99 {p99 * 1000:.1f}ms, "
+                     f"max {max(latencies) * 1000:.1f}ms")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='nutshell', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='*', default=['-'],
+                        help="Files, directories or glob patterns of the documents, '-' for JSON lines on stdin. "
+                             "Default - stdin.")
+    parser.add_argument('--task', choices=TASKS, default='summarise')
+    parser.add_argument('--reduction-ratio', type=float, default=0.70)
+    parser.add_argument('--preserve-order', action='store_true', help='Keep the summary sentences in text order')
+    parser.add_argument('--deduplicate', choices=DEDUPLICATION, default=None,
+                        help='Rank the exact or the near duplicate sentences of a document once, e.g boilerplate')
+    parser.add_argument('--keywords', type=int, default=5, help='Number of keywords per document')
+    parser.add_argument('--tokenizer', choices=sorted(TOKENIZERS), default='nltk')
+    parser.add_argument('--paragraphs', action='store_true', help='Summarise every paragraph of the text files')
+    parser.add_argument('--field', default='text', help='Field of the JSON documents holding the text')
+    parser.add_argument('--id-field', default='id', help='Field of the JSON documents holding their id')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of worker processes, 1 runs in process. Default - number of cpus.')
+    parser.add_argument('--chunksize', type=int, default=1, help='Number of documents sent to a worker at once')
+    parser.add_argument('--unordered', action='store_true',
+                        help='Write the results in the order of completion instead of the input order')
+    parser.add_argument('--output', default=None, help='Path of the JSON lines results. Default - stdout.')
+    parser.add_argument('--checkpoint', default=None, help='Path of the checkpoint file of the completed documents')
+    parser.add_argument('--cache', default=None,
+                        help='Path of a SQLite cache of the results, shared by the workers and across runs')
+    parser.add_argument('--quiet', action='store_true', help='Do not print the report')
+    args = parser.parse_args(argv)
+
+    try:
+        paths = list(expand_inputs(args.inputs, exclude=(args.output, args.checkpoint)))
+    except Exception as e:
+        parser.error(str(e))
+    job = build_job(args)
+    done = load_checkpoint(args.checkpoint)
+    stats = dict.fromkeys(('documents', 'failed', 'skipped', 'chars'), 0)
+
+    def pending(records):
+        for doc_id, text in records:
+            if doc_id in done:
+                stats['skipped'] += 1
+                continue
+            stats['chars'] += len(text) if isinstance(text, str) else 0
+            yield doc_id, text
+
+    records = pending(iter_records(paths, args.field, args.id_field, args.paragraphs))
+    if args.workers == 1:
+        job.warmup()
+        results = ((idx, job.run(record)) for idx, record in enumerate(records))
+    else:
+        results = parallel.imap(job, 'run', records, {}, workers=args.workers, chunksize=args.chunksize,
+                                ordered=not args.unordered)
+
+    # Results are appended when resuming from a checkpoint
+    output = sys.stdout if args.output is None else open(args.output, 'a' if done else 'w', encoding='utf-8')
+    checkpoint = None if args.checkpoint is None else open_checkpoint(args.checkpoint)
+    latencies = array('d')
+    interrupted = False
+    start = time.perf_counter()
+    try:
+        for _, (doc_id, result, seconds) in results:
+            output.write(json.dumps(dict(id=doc_id, **result), ensure_ascii=False) + '\n')
+            output.flush()
+            latencies.append(seconds)
+            if 'error' in result:
+                stats['failed'] += 1
+                continue
+            stats['documents'] += 1
+            if checkpoint is not None:
+                # Checkpointed only once the result is written, failed documents are retried by the next run
+                checkpoint.write(json.dumps(doc_id) + '\n')
+                checkpoint.flush()
+    except KeyboardInterrupt:
+        interrupted = True
+        print("Interrupted, run the same command to resume from the checkpoint" if checkpoint is not None
+              else "Interrupted", file=sys.stderr)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if checkpoint is not None:
+            checkpoint.close()
+    if not args.quiet:
+        print(report(stats, latencies, time.perf_counter() - start), file=sys.stderr)
+    sys.exit(130 if interrupted else 1 if stats['failed'] else 0)
+
+
+if __name__ == '__main__':
+    main()
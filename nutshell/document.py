@@ -0,0 +1,84 @@
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from nutshell.algorithms.information_retrieval import ClassicalIR, InvertedIndex
+from nutshell.preprocessing.cleaner import BaseCleaner, NLTKCleaner, describe, get_shared_stemmer
+from nutshell.preprocessing.tokenizer import BaseTokenizer, NLTKTokenizer, Token
+from nutshell.utils import lazy_import
+
+np = lazy_import('numpy')
+
+
+class Document:
+    """
+    Preprocessed document shared by the analyses of a corpus, e.g summarization and keyword extraction. The corpus is
+    tokenized and cleaned once, the stemmed variant of the cleaned tokens is derived from the unstemmed one, and the
+    tokens and IR statistics are computed lazily and cached, so that every analysis reuses the work of the others.
+    """
+
+    def __init__(self, corpus: str, tokenizer: BaseTokenizer = None, cleaner: BaseCleaner = None, stemmer=None):
+        """
+        :param corpus: Text to be analysed
+        :param tokenizer: Tokenizer object which preforms text tokenization. By default NLTKTokenizer is used.
+        :param cleaner: Cleaner of the unstemmed variant of the tokens. By default NLTKCleaner(skip_stemming=True) is
+            used.
+        :param stemmer: Stemmer deriving the stemmed variant from the unstemmed one. By default the CachedStemmer
+            shared across the process is used.
+        """
+        self.__corpus = corpus
+        self.__tokenizer = NLTKTokenizer() if tokenizer is None else tokenizer
+        self.__cleaner = NLTKCleaner(skip_stemming=True) if cleaner is None else cleaner
+        self.__stemmer = stemmer
+        self.__cache: Dict[Hashable, Any] = {}
+
+    def __repr__(self):
+        return f"Document(characters={len(self.__corpus)}, cached={list(self.__cache)})"
+
+    def get_corpus(self) -> str:
+        return self.__corpus
+
+    def get_config(self) -> str:
+        """Returns the configuration of the preprocessing of the document, e.g for the keys of the cached results"""
+        stemmer = None if self.__stemmer is None else describe(self.__stemmer)
+        return f"Document(tokenizer={self.__tokenizer}, cleaner={self.__cleaner}, stemmer={stemmer})"
+
+    def cached(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Returns the result of an analysis of the document, computed only on the first call. Downstream analyses use it
+        to share their intermediate results.
+        :param key: Key of the result, unique across the analyses
+        :param compute: Computes the result
+        """
+        if key not in self.__cache:
+            self.__cache[key] = compute()
+        return self.__cache[key]
+
+    def get_tokens(self) -> Token:
+        """Returns the original tokens of the sentences"""
+        return self.cached('tokens', lambda: self.__tokenizer.tokenize(self.__corpus))
+
+    def get_cleaned_tokens(self, stemmed=False) -> Token:
+        """Returns the cleaned tokens, stemmed or not"""
+        if not stemmed:
+            return self.cached(('cleaned', False), lambda: self.__cleaner.clean(self.get_tokens()))
+
+        def stem():
+            stemmer = get_shared_stemmer() if self.__stemmer is None else self.__stemmer
+            return BaseCleaner.apply_transforms(self.get_cleaned_tokens(stemmed=False), [stemmer.stem])
+
+        return self.cached(('cleaned', True), stem)
+
+    def get_index(self, stemmed=False) -> InvertedIndex:
+        """Returns the inverted index of the cleaned tokens"""
+        return self.cached(('index', stemmed), lambda: ClassicalIR.build_index(self.get_cleaned_tokens(stemmed)))
+
+    def get_term_frequencies(self, stemmed=False) -> Tuple['np.ndarray', 'np.ndarray', 'np.ndarray']:
+        """
+        Returns the term frequencies of the cleaned tokens, see ClassicalIR.term_frequencies
+        :return: Doc ids, word ids and tf of every distinct (doc, word) pair
+        """
+        return self.cached(('tf', stemmed), lambda: ClassicalIR.term_frequencies(self.get_cleaned_tokens(stemmed)))
+
+    def get_doc_freqs(self, stemmed=False) -> 'np.ndarray':
+        """Returns the number of docs containing every word of the vocabulary of the cleaned tokens"""
+        return self.cached(('doc_freqs', stemmed), lambda: np.bincount(
+            self.get_term_frequencies(stemmed)[1], minlength=len(self.get_cleaned_tokens(stemmed).get_vocabulary())))
@@ -0,0 +1,203 @@
+"""
+Instrumentation of the pipelines, i.e time spent per stage, counters like the number of sentences or the size of the
+vocabulary and optionally the peak memory per stage. The stats of a call are returned as a PipelineStats object and
+streamed to observers.
+
+Instrumentation is off by default and costs a no-op call per stage then.
+"""
+import logging
+import time
+import tracemalloc
+from typing import Any, Dict, Iterable
+
+from nutshell.utils import lazy_import
+
+np = lazy_import('numpy')
+
+logger = logging.getLogger(__name__)
+
+
+def reset_peak_memory():
+    """
+    Resets the peak of the memory traced by tracemalloc to the current memory. tracemalloc.reset_peak is Python 3.9+,
+    before which the traces are cleared, which resets both the current and the peak memory to 0.
+    """
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    else:
+        tracemalloc.clear_traces()
+
+
+class PipelineStats:
+    """Stats of a single pipeline call"""
+
+    def __init__(self, pipeline: str):
+        self.pipeline = pipeline
+        # Seconds spent per stage, summed over the runs of the stage, e.g once per window
+        self.timings: Dict[str, float] = {}
+        # Peak memory in bytes allocated per stage, when memory sampling is enabled
+        self.memory: Dict[str, int] = {}
+        self.counters: Dict[str, Any] = {}
+
+    def __repr__(self):
+        return f"PipelineStats(pipeline='{self.pipeline}', timings={self.timings}, counters={self.counters}, " \
+               f"memory={self.memory})"
+
+    def total_time(self) -> float:
+        return sum(self.timings.values())
+
+    def to_dict(self) -> dict:
+        return {'pipeline': self.pipeline, 'timings': dict(self.timings), 'counters': dict(self.counters),
+                'memory': dict(self.memory)}
+
+
+class BaseObserver:
+    """
+    Interface for the observers of the pipeline events, override the methods of the events of interest
+    """
+
+    def on_stage_end(self, pipeline: str, stage: str, seconds: float):
+        pass
+
+    def on_counter(self, pipeline: str, name: str, value):
+        pass
+
+    def on_finish(self, stats: PipelineStats):
+        pass
+
+
+class LoggingObserver(BaseObserver):
+    """Logs the stats of every pipeline call"""
+
+    def __init__(self, level=logging.INFO):
+        self.__level = level
+
+    def __repr__(self):
+        return f"LoggingObserver(level={self.__level})"
+
+    def on_finish(self, stats: PipelineStats):
+        logger.log(self.__level, "%s: %.4fs %s %s", stats.pipeline, stats.total_time(), stats.timings,
+                   stats.counters)
+
+
+class _Stage:
+    __slots__ = ('__recorder', '__name', '__start', '__baseline')
+
+    def __init__(self, recorder: 'Recorder', name: str):
+        self.__recorder = recorder
+        self.__name = name
+
+    def __enter__(self):
+        if self.__recorder.sample_memory:
+            reset_peak_memory()
+            self.__baseline = tracemalloc.get_traced_memory()[0]
+        self.__start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.__start
+        peak = tracemalloc.get_traced_memory()[1] - self.__baseline if self.__recorder.sample_memory else None
+        self.__recorder.end_stage(self.__name, seconds, peak)
+
+
+class Recorder:
+    """Records the stats of a single pipeline call and notifies the observers"""
+    enabled = True
+
+    def __init__(self, pipeline: str, observers: Iterable[BaseObserver] = (), sample_memory=False):
+        self.stats = PipelineStats(pipeline)
+        self.sample_memory = sample_memory
+        self.__observers = tuple(observers)
+        self.__started_tracing = False
+        if sample_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.__started_tracing = True
+
+    def stage(self, name: str):
+        """Returns the context manager timing the stage"""
+        return _Stage(self, name)
+
+    def end_stage(self, name: str, seconds: float, peak: int = None):
+        timings = self.stats.timings
+        timings[name] = timings.get(name, 0.0) + seconds
+        if peak is not None:
+            self.stats.memory[name] = max(self.stats.memory.get(name, 0), peak)
+        for observer in self.__observers:
+            observer.on_stage_end(self.stats.pipeline, name, seconds)
+
+    def count(self, name: str, value, accumulate=False):
+        """Records the counter, summing it up with its previous value if accumulate is True"""
+        counters = self.stats.counters
+        counters[name] = counters.get(name, 0) + value if accumulate else value
+        for observer in self.__observers:
+            observer.on_counter(self.stats.pipeline, name, value)
+
+    def finish(self) -> PipelineStats:
+        if self.__started_tracing:
+            tracemalloc.stop()
+            self.__started_tracing = False
+        for observer in self.__observers:
+            observer.on_finish(self.stats)
+        return self.stats
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class NullRecorder:
+    """Recorder used when the instrumentation is disabled, all its methods are no-ops"""
+    enabled = False
+    stats = None
+    __stage = _NullStage()
+
+    def stage(self, name: str):
+        return NullRecorder.__stage
+
+    def end_stage(self, name: str, seconds: float, peak: int = None):
+        pass
+
+    def count(self, name: str, value, accumulate=False):
+        pass
+
+    def finish(self):
+        return None
+
+
+NULL_RECORDER = NullRecorder()
+
+
+class Instrumentation:
+    """
+    Instrumentation settings of a model, i.e the observers notified of the pipeline events and whether the peak memory
+    of every stage is sampled (using tracemalloc, which slows down the pipeline noticeably)
+    """
+
+    def __init__(self, observers: Iterable[BaseObserver] = (), sample_memory=False):
+        self.__observers = tuple(observers)
+        self.__sample_memory = sample_memory
+
+    def __repr__(self):
+        return f"Instrumentation(observers={list(self.__observers)}, sample_memory={self.__sample_memory})"
+
+    def start(self, pipeline: str) -> Recorder:
+        """Returns the recorder of a new pipeline call"""
+        return Recorder(pipeline, self.__observers, self.__sample_memory)
+
+
+def start_recorder(instrumentation: Instrumentation, pipeline: str, with_stats: bool):
+    """Returns the recorder of a pipeline call, which is a no-op if no stats are needed"""
+    if instrumentation is not None:
+        return instrumentation.start(pipeline)
+    return Recorder(pipeline) if with_stats else NULL_RECORDER
+
+
+def count_nonzero(matrix) -> int:
+    """Returns the number of non zero entries of the dense or sparse matrix"""
+    nnz = getattr(matrix, 'nnz', None)
+    return int(np.count_nonzero(matrix)) if nnz is None else nnz
@@ -1,16 +1,60 @@
-from nutshell.algorithms.information_retrieval import ClassicalIR
-from nutshell.algorithms.ranking import BaseRanker, TextRank
+from array import array
+from collections import Counter
+from heapq import nlargest
+from itertools import islice
+from math import ceil
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from nutshell import parallel
+from nutshell.algorithms.information_retrieval import ClassicalIR, InvertedIndex
+from nutshell.algorithms.ranking import BaseRanker, Ranking, TextRank
 from nutshell.algorithms.similarity import BaseSimilarityAlgo, BM25Plus
-from nutshell.preprocessing.cleaner import NLTKCleaner
-from nutshell.preprocessing.preprocessor import TextPreProcessor
+from nutshell.cache import ResultCache, cache_key
+from nutshell.instrumentation import Instrumentation, NULL_RECORDER, Recorder, count_nonzero, start_recorder
+from nutshell.document import Document
+from nutshell.preprocessing.cleaner import BaseCleaner, NLTKCleaner
+from nutshell.preprocessing.deduplicator import SentenceDeduplicator, SentenceGroups
+from nutshell.preprocessing.preprocessor import TextPreProcessor, WARMUP_CORPUS
+from nutshell.preprocessing.tokenizer import BaseTokenizer, Token, Vocabulary, get_tokenizer
+from nutshell.utils import lazy_import
+
+np = lazy_import('numpy')
+
+
+def _cached(cache: Optional[ResultCache], instrumentation: Optional[Instrumentation], pipeline: str, with_stats: bool,
+            corpus: str, config: str, params: Dict[str, Any], compute: Callable[[Recorder], Any]):
+    """
+    Runs an analysis of a model, recording its stats, and returns its cached result if the same analysis was
+    already run
+    :param cache: Cache of the results of the model, None to always compute them
+    :param instrumentation: Instrumentation of the model
+    :param pipeline: Name of the pipeline in the stats
+    :param with_stats: If True, the stats of the pipeline are returned along with the result
+    :param corpus: Text analysed
+    :param config: Configuration of the model, i.e its repr
+    :param params: Parameters of the analysis, along with the name of the method
+    :param compute: Computes the result with the given recorder
+    :return: Result, or (result, PipelineStats) if with_stats is True
+    """
+    recorder = start_recorder(instrumentation, pipeline, with_stats)
+    if cache is None:
+        result = compute(recorder)
+    else:
+        result = cache.get_or_compute(cache_key(corpus, config, params), lambda: compute(recorder), recorder)
+    stats = recorder.finish()
+    return (result, stats) if with_stats else result
 
 
 class Summarizer:
     def __init__(
-            self, preprocessor: TextPreProcessor = TextPreProcessor(),
-            similarity_algo: BaseSimilarityAlgo = BM25Plus(),
-            ranker: BaseRanker = TextRank(),
-            ir: ClassicalIR = ClassicalIR()
+            self, preprocessor: TextPreProcessor = None,
+            similarity_algo: BaseSimilarityAlgo = None,
+            ranker: BaseRanker = None,
+            ir: ClassicalIR = None,
+            instrumentation: Instrumentation = None,
+            cache: ResultCache = None,
+            deduplicator: SentenceDeduplicator = None
     ):
         """
         Summarizer helps to summarise a corpus with the given reduction ratio.
@@ -19,67 +63,629 @@ class Summarizer:
         :param similarity_algo: Algorithm to be used for finding similarity between docs. Default - BM25Plus.
         :param ranker: Ranking algorithm to be used to rank the docs. Default - TextRank.
         :param ir: Information retrieval algorithm to be used to extract tf, idf and other necessary measures.
-            Default - ClassicalIR.
+            Default - ClassicalIR. A ClassicalIR with a background IDFModel avoids deriving the IDF from the corpus
+            alone, which is statistically weak for short corpora.
+        :param instrumentation: Observers notified with the timings and counters of every pipeline stage. Default -
+            no instrumentation.
+        :param cache: Cache of the summaries, keyed by the normalized corpus, the components of the summarizer and the
+            parameters of summarise or summarise_document, so that copies of a corpus are summarised once. Default -
+            no cache.
+        :param deduplicator: If given, the duplicate sentences are collapsed after preprocessing, i.e only the first
+            sentence of every group of duplicates is ranked and can be part of the summary. The size of the groups is
+            passed to the ranker as the weights of the sentences, which TextRank, LexRank and DegreeCentrality accept,
+            so that every copy still counts but the copies of a sentence don't vote for each other. The IDF is computed
+            before collapsing, so every copy counts in the doc frequencies, and the reduction ratio applies to the
+            distinct sentences. The windowed summarization collapses the duplicates within the ranked windows only.
+            Default - no deduplication.
         """
-        self.__preprocessor = preprocessor
-        self.__similarity_algo = similarity_algo
-        self.__ranker = ranker
-        self.__ir = ir
+        self.__preprocessor = TextPreProcessor() if preprocessor is None else preprocessor
+        self.__similarity_algo = BM25Plus() if similarity_algo is None else similarity_algo
+        self.__ranker = TextRank() if ranker is None else ranker
+        self.__ir = ClassicalIR() if ir is None else ir
+        self.__instrumentation = instrumentation
+        self.__cache = cache
+        self.__deduplicator = deduplicator
 
     def __repr__(self):
+        deduplicator = '' if self.__deduplicator is None else f",\n           deduplicator={self.__deduplicator}"
         return f"""Summarizer(preprocessor={self.__preprocessor},
            similarity_algo={self.__similarity_algo},
            ranker={self.__ranker},
-           ir={self.__ir}
+           ir={self.__ir}{deduplicator}
         )"""
 
-    def summarise(self, corpus, reduction_ratio=0.70, preserve_order=False):
+    def summarise(self, corpus, reduction_ratio=0.70, preserve_order=False, window_size=None, with_stats=False):
         """
         Returns the summarised the text based on given reduction ratio
         :param corpus: Text to be summarized
         :param reduction_ratio: Reduction ratio expected for the output text. i.e if ratio=0.5 then half the number
                 of sentence are returned
         :param preserve_order: If True, then sentence order is preserved
-        :return: Summarised text
+        :param window_size: If given, the sentences are ranked in windows of at most window_size sentences and only
+                the top candidates of the windows are ranked together, so the similarity matrix is bounded by the
+                window size instead of the number of sentences
+        :param with_stats: If True, the stats of the pipeline are returned along with the summarised text
+        :return: Summarised text, or (summarised text, PipelineStats) if with_stats is True
         """
+        params = dict(method='summarise', reduction_ratio=reduction_ratio, preserve_order=preserve_order,
+                      window_size=window_size)
+        return _cached(self.__cache, self.__instrumentation, 'summarise', with_stats, corpus, repr(self), params,
+                       lambda recorder: self.__summarise(corpus, reduction_ratio, preserve_order, window_size,
+                                                         recorder))
+
+    def __summarise(self, corpus, reduction_ratio, preserve_order, window_size, recorder: Recorder):
+        if window_size:
+            return self.__summarise_windowed(self.__preprocessor.split_sentences(corpus), reduction_ratio,
+                                             preserve_order, window_size, recorder)
         # Model Pipeline
 
         # Preprocessing
-        original_token, cleaned_tokens = self.__preprocessor.preprocess(corpus)
+        with recorder.stage('preprocess'):
+            original_token, cleaned_tokens = self.__preprocessor.preprocess(corpus)
+        return self.__summarise_tokens(original_token, cleaned_tokens, None, reduction_ratio, preserve_order,
+                                       recorder)
 
-        # Information retrieval
-        _idf = self.__ir.calculate_idf(cleaned_tokens)
+    def summarise_sentences(self, sentences: Iterable[str], reduction_ratio=0.70, preserve_order=False,
+                            window_size=1000, with_stats=False):
+        """
+        Summarises a stream of sentences, e.g from utils.iter_sentences, using the windowed summarization. The
+        sentences are consumed lazily, a window at a time, so the whole text never has to be held in memory. Only the
+        candidate sentences of the summary are kept.
+        :param sentences: Sentences split from the corpus, can be a lazy iterable
+        :param reduction_ratio: Reduction ratio expected for the output text
+        :param preserve_order: If True, then sentence order is preserved
+        :param window_size: Maximum number of sentences ranked together
+        :param with_stats: If True, the stats of the pipeline are returned along with the summarised text
+        :return: Summarised text, or (summarised text, PipelineStats) if with_stats is True
+        """
+        recorder = start_recorder(self.__instrumentation, 'summarise', with_stats)
+        summarized_content = self.__summarise_windowed(sentences, reduction_ratio, preserve_order, window_size,
+                                                       recorder)
+        stats = recorder.finish()
+        return (summarized_content, stats) if with_stats else summarized_content
+
+    def summarise_document(self, document: Document, reduction_ratio=0.70, preserve_order=False, with_stats=False):
+        """
+        Same as summarise, but reuses the stemmed tokens and the inverted index of the document, which are shared with
+        the other analyses of the document. The preprocessor of the summarizer is not used.
+        :param document: Preprocessed document
+        """
+        # The document is preprocessed by its own tokenizer and cleaner, which are part of the key
+        params = dict(method='summarise_document', reduction_ratio=reduction_ratio, preserve_order=preserve_order)
+        return _cached(self.__cache, self.__instrumentation, 'summarise', with_stats, document.get_corpus(),
+                       repr(self) + document.get_config(), params,
+                       lambda recorder: self.__summarise_document(document, reduction_ratio, preserve_order, recorder))
+
+    def __summarise_document(self, document: Document, reduction_ratio, preserve_order, recorder: Recorder):
+        with recorder.stage('preprocess'):
+            original_token, cleaned_tokens = document.get_tokens(), document.get_cleaned_tokens(stemmed=True)
+        with recorder.stage('calculate_idf'):
+            index = document.get_index(stemmed=True)
+        return self.__summarise_tokens(original_token, cleaned_tokens, index, reduction_ratio, preserve_order,
+                                       recorder)
+
+    def rank(self, corpus, with_stats=False):
+        """
+        Ranks the sentences of the corpus once, the summaries of any length are then selected from the ranking without
+        preprocessing and ranking the corpus again, e.g rank(corpus).select(reduction_ratio=0.7) is the same summary
+        as summarise(corpus, reduction_ratio=0.7)
+        :param corpus: Text to be ranked
+        :param with_stats: If True, the stats of the pipeline are returned along with the ranking
+        :return: Ranking of the sentences, or (Ranking, PipelineStats) if with_stats is True
+        """
+        recorder = start_recorder(self.__instrumentation, 'rank', with_stats)
+        with recorder.stage('preprocess'):
+            original_token, cleaned_tokens = self.__preprocessor.preprocess(corpus)
+        ranking = self.__ranking(original_token, cleaned_tokens, None, recorder)
+        stats = recorder.finish()
+        return (ranking, stats) if with_stats else ranking
+
+    def rank_document(self, document: Document, with_stats=False):
+        """
+        Same as rank, but reuses the stemmed tokens and the inverted index of the document, see summarise_document
+        :param document: Preprocessed document
+        """
+        recorder = start_recorder(self.__instrumentation, 'rank', with_stats)
+        with recorder.stage('preprocess'):
+            original_token, cleaned_tokens = document.get_tokens(), document.get_cleaned_tokens(stemmed=True)
+        with recorder.stage('calculate_idf'):
+            index = document.get_index(stemmed=True)
+        ranking = self.__ranking(original_token, cleaned_tokens, index, recorder)
+        stats = recorder.finish()
+        return (ranking, stats) if with_stats else ranking
+
+    def __ranking(self, original_token: Token, cleaned_tokens: Token, index: InvertedIndex,
+                  recorder: Recorder) -> Ranking:
+        recorder.count('sentences', original_token.get_number_of_sentences())
+        scores, groups = self.__rank(cleaned_tokens, recorder, index)
+        with recorder.stage('sort_scores'):
+            if groups is None:
+                return Ranking(scores, original_token)
+            return Ranking(scores, groups.collapse(original_token), positions=groups.get_representatives())
+
+    def __summarise_tokens(self, original_token: Token, cleaned_tokens: Token, index: InvertedIndex, reduction_ratio,
+                           preserve_order, recorder: Recorder):
+        recorder.count('sentences', original_token.get_number_of_sentences())
 
         # Similarity and Ranking
-        similarity_matrix = self.__similarity_algo.similarity_matrix(cleaned_tokens, _idf)
-        scores = self.__ranker.get_ranking_scores(similarity_matrix)
+        scores, groups = self.__rank(cleaned_tokens, recorder, index)
+
+        with recorder.stage('get_top'):
+            if groups is not None:
+                original_token = groups.collapse(original_token)
+            return self.__ranker.get_top(scores, original_token, reduction_ratio=reduction_ratio,
+                                         preserve_order=preserve_order)
+
+    def __rank(self, cleaned_tokens: Token, recorder: Recorder,
+               index: InvertedIndex = None) -> Tuple[Dict[int, float], SentenceGroups]:
+        """
+        Ranks the sentences, or the groups of duplicate sentences if the summarizer has a deduplicator
+        :return: Ranking scores, and the groups if duplicates were collapsed, else None
+        """
+        # Information retrieval
+        with recorder.stage('calculate_idf'):
+            if index is None:
+                index = self.__ir.build_index(cleaned_tokens)
+            _idf = self.__ir.get_idf(cleaned_tokens, index)
+
+        ranked_tokens, groups, kwargs = cleaned_tokens, None, {}
+        if self.__deduplicator is not None:
+            with recorder.stage('deduplicate'):
+                groups = self.__deduplicator.deduplicate(cleaned_tokens)
+                if groups.has_duplicates():
+                    ranked_tokens = groups.collapse(cleaned_tokens)
+                    kwargs['weights'] = groups.get_multiplicity()
+                else:
+                    groups = None
+            recorder.count('duplicates', cleaned_tokens.get_number_of_sentences() -
+                           ranked_tokens.get_number_of_sentences(), accumulate=True)
 
-        summarized_content = self.__ranker.get_top(scores, original_token, reduction_ratio=reduction_ratio,
-                                                   preserve_order=preserve_order)
-        return summarized_content
+        with recorder.stage('similarity_matrix'):
+            similarity_matrix = self.__similarity_algo.similarity_matrix(ranked_tokens, _idf)
+        with recorder.stage('get_ranking_scores'):
+            scores = self.__ranker.get_ranking_scores(similarity_matrix, **kwargs)
+
+        if recorder.enabled:
+            # Counters are summed up across the windows of the windowed summarization
+            recorder.count('tokens', cleaned_tokens.get_number_of_tokens(raw=False), accumulate=True)
+            recorder.count('vocabulary_size', index.get_number_of_words(), accumulate=True)
+            recorder.count('matrix_nnz', count_nonzero(similarity_matrix), accumulate=True)
+            for name, value in self.__ranker.get_stats().items():
+                recorder.count(name, value, accumulate=True)
+        return scores, groups
+
+    def __rank_candidates(self, candidates: List[Tuple], recorder: Recorder, normalize=True) -> List[Tuple]:
+        """
+        Ranks the candidates together. Candidates are tuples of (position of the sentence in the corpus, tokens,
+        cleaned tokens, score)
+        :param normalize: If True, the scores are scaled to an average of 1 so that the scores of the candidates
+                ranked in different windows are comparable
+        """
+        scores, groups = self.__rank(Token([cleaned for _, _, cleaned, _ in candidates]), recorder)
+        if groups is not None:
+            # Only the first candidate of every group of duplicates is kept
+            candidates = [candidates[idx] for idx in groups.get_representatives().tolist()]
+        scale = len(candidates) if normalize else 1
+        return [(position, original, cleaned, scores[idx] * scale)
+                for idx, (position, original, cleaned, _) in enumerate(candidates)]
+
+    def __reduce_window(self, candidates: List[Tuple], fraction: float, recorder: Recorder) -> List[Tuple]:
+        """Ranks the window of candidates and returns its top candidates, in the order of the corpus"""
+        top = nlargest(ceil(len(candidates) * fraction), self.__rank_candidates(candidates, recorder),
+                       key=itemgetter(3))
+        return sorted(top, key=itemgetter(0))
+
+    def __reduce_candidates(self, candidates: List[Tuple], n: int, window_size: int, recorder: Recorder) -> List[Tuple]:
+        """
+        Reduces the candidates window by window until they fit in a single window or no further reduction is needed,
+        i.e n candidates are left and the summary itself is larger than a window
+        """
+        while len(candidates) > max(n, window_size):
+            fraction = max(n / len(candidates), 0.5)
+            reduced = [candidate for start in range(0, len(candidates), window_size)
+                       for candidate in self.__reduce_window(candidates[start:start + window_size], fraction, recorder)]
+            if len(reduced) == len(candidates):
+                break
+            candidates = reduced
+        return candidates
+
+    def __summarise_windowed(self, sentences: Iterable[str], reduction_ratio, preserve_order, window_size,
+                             recorder: Recorder):
+        sentences = iter(sentences)
+        windows = iter(lambda: list(islice(sentences, window_size)), [])
+
+        # Every window keeps at least half of its sentences as candidates for the global ranking. The last window
+        # read is kept pending, so that a corpus fitting in a single window is ranked as a whole.
+        fraction = max(1 - reduction_ratio, 0.5)
+        candidates, pending, number_of_sentences = [], [], 0
+        for window in windows:
+            if pending:
+                candidates.extend(self.__reduce_window(pending, fraction, recorder))
+                # Reduce the candidates as the sentences stream in, so that they stay proportional to the size of the
+                # summary so far instead of the number of sentences
+                bound = max(ceil(number_of_sentences * (1 - reduction_ratio)), window_size)
+                if len(candidates) >= 2 * bound:
+                    candidates = self.__reduce_candidates(candidates, bound, window_size, recorder)
+            with recorder.stage('preprocess'):
+                original, cleaned = self.__preprocessor.preprocess_sentences(window)
+            pending = [(number_of_sentences + idx, original_sentence, cleaned_sentence, 0.0)
+                       for idx, (original_sentence, cleaned_sentence) in
+                       enumerate(zip(original.get_sentences(), cleaned.get_sentences()))]
+            number_of_sentences += len(window)
+        recorder.count('sentences', number_of_sentences)
+        if not pending:
+            return []
+        candidates.extend(self.__reduce_window(pending, fraction, recorder) if candidates else pending)
+
+        n = ceil(number_of_sentences * (1 - reduction_ratio))
+        candidates = self.__reduce_candidates(candidates, n, window_size, recorder)
+        if len(candidates) <= window_size:
+            candidates = self.__rank_candidates(candidates, recorder, normalize=False)
+        with recorder.stage('get_top'):
+            scores = {idx: score for idx, (_, _, _, score) in enumerate(candidates)}
+            tokens = Token([original for _, original, _, _ in candidates])
+            return self.__ranker.select_top(scores, tokens, n, preserve_order=preserve_order)
+
+    def summarise_many(self, corpora: Iterable[str], reduction_ratio=0.70, preserve_order=False, workers=None,
+                       chunksize=None) -> List:
+        """
+        Summarises the corpora in parallel using a pool of worker processes
+        :param corpora: Texts to be summarized
+        :param reduction_ratio: Reduction ratio expected for the output text
+        :param preserve_order: If True, then sentence order is preserved
+        :param workers: Number of worker processes. Default - number of cpus.
+        :param chunksize: Number of corpora sent to a worker at once. Default - about 4 chunks per worker.
+        :return: Summarised text of every corpus, in the input order
+        """
+        return [summary for _, summary in parallel.imap(
+            self, 'summarise', corpora, dict(reduction_ratio=reduction_ratio, preserve_order=preserve_order),
+            workers=workers, chunksize=chunksize)]
+
+    def summarise_unordered(self, corpora: Iterable[str], reduction_ratio=0.70, preserve_order=False, workers=None,
+                            chunksize=None) -> Iterator[Tuple[int, List]]:
+        """
+        Same as summarise_many, but streams the summaries as soon as they are ready
+        :return: Iterator of (position of the corpus in the input, summarised text)
+        """
+        return parallel.imap(self, 'summarise', corpora,
+                             dict(reduction_ratio=reduction_ratio, preserve_order=preserve_order),
+                             workers=workers, chunksize=chunksize, ordered=False)
+
+    def warmup(self):
+        """
+        Loads the resources used by the pipeline upfront, i.e the heavy dependencies, NLTK models, stopwords and
+        stemmer, so that the first summarise call does not pay for it
+        """
+        _, cleaned_tokens = self.__preprocessor.preprocess(WARMUP_CORPUS)
+        self.__rank(cleaned_tokens, NULL_RECORDER)
 
 
 class KeywordExtractor:
     def __init__(
             self,
-            preprocessor: TextPreProcessor = TextPreProcessor(cleaner=NLTKCleaner(skip_stemming=True)),
-            ir: ClassicalIR = ClassicalIR()
+            preprocessor: TextPreProcessor = None,
+            ir: ClassicalIR = None,
+            instrumentation: Instrumentation = None,
+            cache: ResultCache = None
     ):
         """
 
-        :param preprocessor: Text preprocessor algorithm. Default - TextPreProcessor.
+        :param preprocessor: Text preprocessor algorithm. Default - TextPreProcessor without stemming.
         :param ir: Information retrieval algorithm to be used to extract tf, idf and other necessary measures.
             Default - ClassicalIR.
+        :param instrumentation: Observers notified with the timings and counters of every pipeline stage. Default -
+            no instrumentation.
+        :param cache: Cache of the keywords, keyed by the normalized corpus, the components of the keyword extractor and
+            the parameters of extract_keywords or extract_keywords_document. Default - no cache.
         """
+        if preprocessor is None:
+            preprocessor = TextPreProcessor(cleaner=NLTKCleaner(skip_stemming=True))
         self.__preprocessor = preprocessor
-        self.__ir = ir
+        self.__ir = ClassicalIR() if ir is None else ir
+        self.__instrumentation = instrumentation
+        self.__cache = cache
 
     def __repr__(self):
         return f"KeywordExtractor(preprocessor={self.__preprocessor}, ir={self.__ir})"
 
-    def extract_keywords(self, corpus, count=5, raw=False):
-        original_token, tokens = self.__preprocessor.preprocess(corpus)
-        tf = self.__ir.calculate_tf(tokens)
-        idf = self.__ir.calculate_idf(tokens)
-        keywords = ClassicalIR.cumulative_weight(tf, idf, order=not raw)
-        return dict(zip(keywords.keys(), keywords.values())) if raw else list(zip(*keywords))[0][:count]
+    def extract_keywords_many(self, corpora: Iterable[str], count=5, raw=False, workers=None,
+                              chunksize=None) -> List:
+        """
+        Extracts the keywords of the corpora in parallel using a pool of worker processes
+        :param corpora: Texts to extract the keywords from
+        :param count: Number of keywords per corpus
+        :param raw: If True, the weight of every word is returned
+        :param workers: Number of worker processes. Default - number of cpus.
+        :param chunksize: Number of corpora sent to a worker at once. Default - about 4 chunks per worker.
+        :return: Keywords of every corpus, in the input order
+        """
+        return [keywords for _, keywords in parallel.imap(
+            self, 'extract_keywords', corpora, dict(count=count, raw=raw), workers=workers, chunksize=chunksize)]
+
+    def extract_keywords_unordered(self, corpora: Iterable[str], count=5, raw=False, workers=None,
+                                   chunksize=None) -> Iterator[Tuple[int, Any]]:
+        """
+        Same as extract_keywords_many, but streams the keywords as soon as they are ready
+        :return: Iterator of (position of the corpus in the input, keywords)
+        """
+        return parallel.imap(self, 'extract_keywords', corpora, dict(count=count, raw=raw), workers=workers,
+                             chunksize=chunksize, ordered=False)
+
+    def warmup(self):
+        """
+        Loads the resources used by the pipeline upfront, i.e the heavy dependencies, NLTK models and stopwords, so
+        that the first extract_keywords call does not pay for it
+        """
+        self.__extract_keywords(WARMUP_CORPUS, 5, False, NULL_RECORDER)
+
+    def extract_keywords(self, corpus, count=5, raw=False, with_stats=False):
+        """
+        Returns the keywords of the corpus, i.e the words with the highest cumulative tf-idf weight
+        :param corpus: Text to extract the keywords from
+        :param count: Number of keywords
+        :param raw: If True, the weight of every word is returned
+        :param with_stats: If True, the stats of the pipeline are returned along with the keywords
+        :return: Keywords, or (keywords, PipelineStats) if with_stats is True
+        """
+        return _cached(self.__cache, self.__instrumentation, 'extract_keywords', with_stats, corpus, repr(self),
+                       dict(method='extract_keywords', count=count, raw=raw),
+                       lambda recorder: self.__extract_keywords(corpus, count, raw, recorder))
+
+    def __extract_keywords(self, corpus, count, raw, recorder: Recorder):
+        with recorder.stage('preprocess'):
+            _, tokens = self.__preprocessor.preprocess(corpus)
+        # Term statistics are aggregated in arrays indexed by word id, which is linear in the number of tokens
+        with recorder.stage('calculate_tf'):
+            _, word_ids, tf = ClassicalIR.term_frequencies(tokens)
+            doc_freqs = np.bincount(word_ids, minlength=len(tokens.get_vocabulary()))
+        return self.__keywords(tokens, word_ids, tf, doc_freqs, count, raw, recorder)
+
+    def extract_keywords_document(self, document: Document, count=5, raw=False, with_stats=False):
+        """
+        Same as extract_keywords, but reuses the unstemmed tokens and the term frequencies of the document, which are
+        shared with the other analyses of the document. The preprocessor of the keyword extractor is not used.
+        :param document: Preprocessed document
+        """
+        # The document is preprocessed by its own tokenizer and cleaner, which are part of the key
+        return _cached(self.__cache, self.__instrumentation, 'extract_keywords', with_stats, document.get_corpus(),
+                       repr(self) + document.get_config(),
+                       dict(method='extract_keywords_document', count=count, raw=raw),
+                       lambda recorder: self.__extract_keywords_document(document, count, raw, recorder))
+
+    def __extract_keywords_document(self, document: Document, count, raw, recorder: Recorder):
+        with recorder.stage('preprocess'):
+            tokens = document.get_cleaned_tokens(stemmed=False)
+        with recorder.stage('calculate_tf'):
+            _, word_ids, tf = document.get_term_frequencies(stemmed=False)
+            doc_freqs = document.get_doc_freqs(stemmed=False)
+        return self.__keywords(tokens, word_ids, tf, doc_freqs, count, raw, recorder)
+
+    def __keywords(self, tokens: Token, word_ids: 'np.ndarray', tf: 'np.ndarray', doc_freqs: 'np.ndarray', count,
+                   raw, recorder: Recorder):
+        with recorder.stage('calculate_idf'):
+            idf = self.__ir.get_idf_by_id(tokens, doc_freqs)
+        with recorder.stage('cumulative_weight'):
+            weights = ClassicalIR.cumulative_weight_by_id(word_ids, tf, idf)
+            # Words are ordered by their first occurrence, like their ids
+            present = np.flatnonzero(doc_freqs)
+            words = tokens.get_vocabulary().get_words()
+            if raw:
+                keywords = dict(zip(map(words.__getitem__, present.tolist()), weights[present].tolist()))
+            else:
+                keywords = tuple(map(words.__getitem__, ClassicalIR.top_weights(weights, count, present)))
+
+        if recorder.enabled:
+            recorder.count('sentences', tokens.get_number_of_sentences())
+            recorder.count('tokens', tokens.get_number_of_tokens(raw=False))
+            recorder.count('vocabulary_size', len(present))
+        return keywords
+
+
+class Analyzer:
+    def __init__(
+            self, summarizer: Summarizer = None,
+            keyword_extractor: KeywordExtractor = None,
+            tokenizer: Union[BaseTokenizer, str] = None,
+            cleaner: BaseCleaner = None,
+            stemmer=None
+    ):
+        """
+        Analyzer summarises and extracts the keywords of a corpus in one pass. The corpus is preprocessed once into a
+        Document, which shares the tokens, the cleaning and the IR statistics across the analyses.
+
+        :param summarizer: Summarizer of the documents, its preprocessor is not used. Default - Summarizer.
+        :param keyword_extractor: Keyword extractor of the documents, its preprocessor is not used. Default -
+            KeywordExtractor.
+        :param tokenizer: Tokenizer of the documents, or the name of a tokenizer, 'nltk' or 'regex' for the faster
+            RegexTokenizer. Default - NLTKTokenizer.
+        :param cleaner: Cleaner of the unstemmed variant of the tokens. Default - NLTKCleaner without stemming.
+        :param stemmer: Stemmer deriving the stemmed variant of the tokens. Default - the shared CachedStemmer.
+        """
+        self.__summarizer = Summarizer() if summarizer is None else summarizer
+        self.__keyword_extractor = KeywordExtractor() if keyword_extractor is None else keyword_extractor
+        self.__tokenizer = get_tokenizer(tokenizer)
+        self.__cleaner = cleaner
+        self.__stemmer = stemmer
+
+    def __repr__(self):
+        return f"""Analyzer(summarizer={self.__summarizer},
+           keyword_extractor={self.__keyword_extractor},
+           tokenizer={self.__tokenizer},
+           cleaner={self.__cleaner}
+        )"""
+
+    def preprocess(self, corpus) -> Document:
+        """Returns the preprocessed document of the corpus, shared by the analyses"""
+        return Document(corpus, tokenizer=self.__tokenizer, cleaner=self.__cleaner, stemmer=self.__stemmer)
+
+    def analyse(self, corpus, reduction_ratio=0.70, preserve_order=False, count=5, raw=False) -> Dict[str, Any]:
+        """
+        Returns the summary and the keywords of the corpus
+        :param corpus: Text or preprocessed Document to be analysed
+        :param reduction_ratio: Reduction ratio expected for the summary
+        :param preserve_order: If True, then sentence order is preserved in the summary
+        :param count: Number of keywords
+        :param raw: If True, the weight of every word is returned instead of the keywords
+        :return: Dict with the summary and the keywords
+        """
+        document = corpus if isinstance(corpus, Document) else self.preprocess(corpus)
+        return {
+            'summary': self.__summarizer.summarise_document(document, reduction_ratio=reduction_ratio,
+                                                            preserve_order=preserve_order),
+            'keywords': self.__keyword_extractor.extract_keywords_document(document, count=count, raw=raw)
+        }
+
+    def warmup(self):
+        """Loads the resources used by the analyses upfront, bypassing the caches of the models"""
+        self.preprocess(WARMUP_CORPUS).get_cleaned_tokens(stemmed=True)
+        self.__summarizer.warmup()
+        self.__keyword_extractor.warmup()
+
+
+class IncrementalSummarizer:
+    def __init__(
+            self, preprocessor: TextPreProcessor = None,
+            similarity_algo: BM25Plus = None,
+            ranker: TextRank = None,
+            refresh_ratio: float = 2.0
+    ):
+        """
+        IncrementalSummarizer summarises append-only documents like live transcripts, which grow a few sentences at
+        a time. Appending text preprocesses only the new text, updates the document frequencies and computes only
+        the similarity rows and columns of the new sentences, and the ranking is warm started from the previous scores.
+
+        Similarity scores are computed with the IDF and average sentence length at the time the sentences are added,
+        the whole similarity matrix is recomputed with the current statistics once the number of sentences grows by
+        refresh_ratio since the last refresh, which keeps the amortized cost of an append proportional to its size.
+
+        :param preprocessor: Text preprocessor algorithm. Default - TextPreProcessor.
+        :param similarity_algo: BM25Plus similarity. Default - BM25Plus.
+        :param ranker: Ranking algorithm supporting warm start. Default - TextRank.
+        :param refresh_ratio: Growth factor of the number of sentences triggering a full refresh of the similarity
+            matrix.
+        """
+        self.__preprocessor = TextPreProcessor() if preprocessor is None else preprocessor
+        self.__similarity_algo = BM25Plus() if similarity_algo is None else similarity_algo
+        self.__ranker = TextRank() if ranker is None else ranker
+        self.__refresh_ratio = refresh_ratio
+
+        # Original tokens of the sentences, returned in the summary
+        self.__original_vocabulary = Vocabulary()
+        self.__original_ids, self.__original_offsets = array('i'), array('q', [0])
+
+        # Cleaned tokens of the sentences along with their posting lists (doc ids and frequencies per word id)
+        self.__vocabulary = Vocabulary()
+        self.__token_ids, self.__offsets = array('i'), array('q', [0])
+        self.__postings: Dict[int, Tuple[array, array]] = {}
+
+        self.__matrix = None
+        self.__refreshed_at = 0
+        self.__scores = None
+        self.__ranked = True
+
+    def __repr__(self):
+        return f"""IncrementalSummarizer(preprocessor={self.__preprocessor},
+           similarity_algo={self.__similarity_algo},
+           ranker={self.__ranker},
+           refresh_ratio={self.__refresh_ratio}
+        )"""
+
+    def get_number_of_sentences(self) -> int:
+        return len(self.__offsets) - 1
+
+    def append(self, text) -> int:
+        """
+        Appends the text to the document
+        :param text: Text to be appended, it is expected to start at a sentence boundary
+        :return: Number of sentences appended
+        """
+        original, cleaned = self.__preprocessor.preprocess(text)
+        first = self.get_number_of_sentences()
+        for sentence in original.get_sentences():
+            self.__original_ids.extend(self.__original_vocabulary.encode(sentence))
+            self.__original_offsets.append(len(self.__original_ids))
+
+        new_docs = []
+        for doc_id, sentence in enumerate(cleaned.get_sentences(), start=first):
+            word_ids = self.__vocabulary.encode(sentence)
+            self.__token_ids.extend(word_ids)
+            self.__offsets.append(len(self.__token_ids))
+            word_count = Counter(word_ids)
+            for word_id, count in word_count.items():
+                docs, freqs = self.__postings.setdefault(word_id, (array('q'), array('d')))
+                docs.append(doc_id)
+                freqs.append(count)
+            new_docs.append(word_count)
+
+        if new_docs:
+            self.__ranked = False
+            self.__reserve(self.get_number_of_sentences())
+            if self.get_number_of_sentences() >= self.__refreshed_at * self.__refresh_ratio:
+                self.refresh()
+            else:
+                self.__update_similarity(first, new_docs)
+        return len(new_docs)
+
+    def refresh(self):
+        """Recomputes the whole similarity matrix with the current IDF and average sentence length"""
+        n = self.get_number_of_sentences()
+        tokens = Token.from_ids(self.__token_ids, self.__offsets, self.__vocabulary)
+        self.__matrix[:n, :n] = self.__similarity_algo.similarity_matrix(tokens, ClassicalIR.calculate_idf(tokens))
+        self.__refreshed_at = n
+        self.__ranked = False
+
+    def summary(self, reduction_ratio=0.70, preserve_order=False):
+        """
+        Returns the summary of the document appended so far
+        :param reduction_ratio: Reduction ratio expected for the output text. i.e if ratio=0.5 then half the number
+                of sentence are returned
+        :param preserve_order: If True, then sentence order is preserved
+        :return: Summarised text
+        """
+        n = self.get_number_of_sentences()
+        if n == 0:
+            return []
+        if not self.__ranked:
+            warm_start = None
+            if self.__scores is not None:
+                # Previous scores for the existing sentences and an average score for the new ones
+                warm_start = np.full(n, 1.0 / n)
+                warm_start[:len(self.__scores)] = self.__scores
+            scores = self.__ranker.get_ranking_scores(self.__matrix[:n, :n], warm_start=warm_start)
+            self.__scores = np.fromiter(scores.values(), dtype=float, count=n)
+            self.__ranked = True
+        original = Token.from_ids(self.__original_ids, self.__original_offsets, self.__original_vocabulary)
+        return self.__ranker.get_top(dict(enumerate(self.__scores.tolist())), original,
+                                     reduction_ratio=reduction_ratio, preserve_order=preserve_order)
+
+    def __reserve(self, n):
+        """Grows the similarity matrix buffer geometrically, so that appends are amortized"""
+        if self.__matrix is None or self.__matrix.shape[0] < n:
+            capacity = max(n, 2 * (0 if self.__matrix is None else self.__matrix.shape[0]), 64)
+            matrix = np.zeros((capacity, capacity))
+            if self.__matrix is not None:
+                size = self.__matrix.shape[0]
+                matrix[:size, :size] = self.__matrix
+            self.__matrix = matrix
+
+    def __update_similarity(self, first: int, new_docs: List[Dict[int, int]]):
+        """
+        Computes the similarity rows and columns of the new docs. Only the docs sharing a word with a new doc
+        are touched, using the posting lists of the words of the new docs.
+        """
+        n = self.get_number_of_sentences()
+        offsets = np.frombuffer(self.__offsets, dtype=np.int64)
+        doc_len = np.diff(offsets).astype(float)
+        avg_doc_len = offsets[-1] / n
+        weights = self.__similarity_algo.term_weights
+        for doc_id, word_count in enumerate(new_docs, start=first):
+            for word_id, count in word_count.items():
+                docs, freqs = self.__postings[word_id]
+                docs, freqs = np.frombuffer(docs, dtype=np.int64), np.frombuffer(freqs, dtype=float)
+                idf = ClassicalIR.calculate_word_idf(n, len(docs))
+                # Row of the new doc, i.e the new doc scored against every doc containing the word
+                self.__matrix[doc_id, docs] += weights(count, doc_len[doc_id], idf, avg_doc_len) * freqs
+                # Column of the new doc for the existing docs, the new docs are covered by their rows
+                old = docs[:np.searchsorted(docs, first)]
+                self.__matrix[old, doc_id] += weights(freqs[:len(old)], doc_len[old], idf, avg_doc_len) * count
+            self.__matrix[doc_id, doc_id] = 0
@@ -0,0 +1,82 @@
+"""
+Runs a model over many corpora using a pool of worker processes. Every worker receives the model once, when it
+starts, and warms it up so that the resources of the pipeline are loaded once per worker instead of once per corpus.
+"""
+from collections import deque
+from functools import partial
+from itertools import islice
+from os import cpu_count
+from queue import Queue
+from typing import Any, Callable, Iterable, Iterator, List, Tuple
+
+from nutshell.utils import lazy_import
+
+multiprocessing = lazy_import('multiprocessing')
+
+# Bound model method invoked by the tasks of the worker process
+_worker_fn: Callable = None
+
+
+def _init_worker(model, method: str, kwargs: dict):
+    global _worker_fn
+    model.warmup()
+    _worker_fn = partial(getattr(model, method), **kwargs)
+
+
+def _run_chunk(chunk: List[Tuple[int, Any]]) -> List[Tuple[int, Any]]:
+    return [(idx, _worker_fn(corpus)) for idx, corpus in chunk]
+
+
+def _default_chunksize(corpora: Iterable, workers: int) -> int:
+    # Same heuristic as Pool.map, i.e about 4 chunks per worker, falls back to 1 for iterators of unknown length
+    if not hasattr(corpora, '__len__'):
+        return 1
+    chunksize, extra = divmod(len(corpora), workers * 4)
+    return max(1, chunksize + bool(extra))
+
+
+def imap(model, method: str, corpora: Iterable, kwargs: dict, workers: int = None, chunksize: int = None,
+         ordered: bool = True, max_pending: int = None) -> Iterator[Tuple[int, Any]]:
+    """
+    Invokes model.method(corpus, **kwargs) for every corpus using a pool of worker processes
+    :param model: Model used by the workers, it must be picklable and provide a warmup method
+    :param method: Name of the model method to be invoked
+    :param corpora: Corpora to be processed, can be a lazy iterable
+    :param kwargs: Keyword arguments passed to the method
+    :param workers: Number of worker processes. Default - number of cpus.
+    :param chunksize: Number of corpora sent to a worker at once. Default - about 4 chunks per worker.
+    :param ordered: If True, the results are yielded in the input order, else as soon as they are ready
+    :param max_pending: Maximum number of corpora read ahead of the results, which bounds the memory used by lazy
+        iterables of corpora like utils.iter_documents. Default - 16 chunks per worker.
+    :return: Iterator of (position of the corpus in the input, result)
+    """
+    workers = workers or cpu_count() or 1
+    chunksize = chunksize or _default_chunksize(corpora, workers)
+    max_pending = max_pending or workers * chunksize * 16
+    tasks = enumerate(corpora)
+    chunks = iter(lambda: list(islice(tasks, chunksize)), [])
+    # Chunks in flight, a new chunk is submitted as soon as one completes so that the workers never wait for the
+    # slowest corpus of a batch
+    window = max(1, max_pending // chunksize)
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(model, method, kwargs)) as pool:
+        if ordered:
+            pending = deque(pool.apply_async(_run_chunk, (chunk,)) for chunk in islice(chunks, window))
+            while pending:
+                results = pending.popleft().get()
+                pending.extend(pool.apply_async(_run_chunk, (chunk,)) for chunk in islice(chunks, 1))
+                yield from results
+        else:
+            # Results, or the error of a chunk, in the order of completion
+            completed, in_flight = Queue(), 0
+            for chunk in islice(chunks, window):
+                pool.apply_async(_run_chunk, (chunk,), callback=completed.put, error_callback=completed.put)
+                in_flight += 1
+            while in_flight:
+                results = completed.get()
+                in_flight -= 1
+                if isinstance(results, BaseException):
+                    raise results
+                for chunk in islice(chunks, 1):
+                    pool.apply_async(_run_chunk, (chunk,), callback=completed.put, error_callback=completed.put)
+                    in_flight += 1
+                yield from results
@@ -1,9 +1,117 @@
 from abc import ABC, abstractmethod
+from array import array
+from functools import lru_cache
+from types import BuiltinFunctionType, FunctionType, MethodType
+from typing import Any, Callable, FrozenSet, List, Optional, Pattern
 
-from nltk.corpus import stopwords
-from nltk.stem import PorterStemmer
+from nutshell.preprocessing.tokenizer import Token, Vocabulary
+from nutshell.utils import lazy_import
 
-from nutshell.preprocessing.tokenizer import Token
+nltk_corpus = lazy_import('nltk.corpus')
+nltk_stem = lazy_import('nltk.stem')
+
+PUNCTUATION = frozenset('!"#$%&\'()*+,-./:;<=>?@[\\]^_`{|}~')
+
+# A transform maps a word to its cleaned form, or to None if the word has to be removed
+Transform = Callable[[str], Optional[str]]
+
+
+def describe(component: Any) -> str:
+    """
+    Describes the configuration of a stemmer or a transform, stable across processes, e.g for the reprs of the
+    cleaners which key the cached results. The components of nutshell are described by their repr and functions by
+    their qualified name. Any other object, e.g a NLTK stemmer whose repr leaves out its parameters, is described by
+    its qualified class name and its configuration, i.e its scalar attributes and patterns, e.g the mode of a
+    PorterStemmer, its nested stemmer, e.g the language specific stemmer of a SnowballStemmer, and whether it ignores
+    the stopwords. Tables such as rules and caches are left out.
+    """
+    if hasattr(component, '__wrapped__'):
+        return describe(component.__wrapped__)
+    if isinstance(component, MethodType):
+        return f"{describe(component.__self__)}.{component.__name__}"
+    if isinstance(component, (FunctionType, BuiltinFunctionType)):
+        return f"{component.__module__}.{component.__qualname__}"
+    cls = type(component)
+    if cls.__module__.startswith('nutshell.'):
+        return repr(component)
+    config = []
+    for name, value in sorted(getattr(component, '__dict__', {}).items()):
+        if value is None or isinstance(value, (str, int, float, bool)):
+            config.append(f"{name.lstrip('_')}={value!r}")
+        elif isinstance(value, Pattern):
+            config.append(f"{name.lstrip('_')}={value.pattern!r}")
+    nested = getattr(component, 'stemmer', None)
+    if callable(getattr(nested, 'stem', None)):
+        config.append(f"stemmer={describe(nested)}")
+    elif isinstance(getattr(component, 'stopwords', None), (set, frozenset)):
+        config.append(f"ignore_stopwords={bool(component.stopwords)}")
+    return f"{cls.__module__}.{cls.__qualname__}({', '.join(config)})"
+
+
+@lru_cache(maxsize=None)
+def get_stop_words(language='english') -> FrozenSet[str]:
+    """Returns the stopwords of the language, the NLTK corpus is read only once per language"""
+    return frozenset(nltk_corpus.stopwords.words(language))
+
+
+class CachedStemmer:
+    """
+    Stemmer with a bounded LRU cache in front of it. Natural text repeats a small vocabulary heavily, so most of the
+    words are stemmed only once.
+    """
+
+    def __init__(self, stemmer=None, maxsize=2 ** 16):
+        """
+        :param stemmer: Algorithm to be used for stemming. By default the stemming algorithm used is PorterStemmer.
+        :param maxsize: Maximum number of stems cached
+        """
+        self.__stemmer = nltk_stem.PorterStemmer() if stemmer is None else stemmer
+        self.__maxsize = maxsize
+        self.stem = lru_cache(maxsize=maxsize)(self.__stemmer.stem)
+
+    def __repr__(self):
+        return f"CachedStemmer(stemmer={describe(self.__stemmer)}, maxsize={self.__maxsize})"
+
+    def __reduce__(self):
+        # The cache itself is not picklable, the copy starts with an empty cache
+        return CachedStemmer, (self.__stemmer, self.__maxsize)
+
+    def cache_info(self):
+        """Returns the hits, misses, maxsize and current size of the cache"""
+        return self.stem.cache_info()
+
+    def cache_clear(self):
+        self.stem.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def get_shared_stemmer() -> CachedStemmer:
+    """
+    Returns the cached stemmer shared by all the cleaners of the process, which use the default stemmer. Warming it up
+    before forking worker processes shares the cached stems with the workers.
+    """
+    return CachedStemmer()
+
+
+def lowercase(word: str) -> str:
+    return word.lower()
+
+
+def filter_punctuation(word: str) -> Optional[str]:
+    return None if word in PUNCTUATION else word
+
+
+class StopWordFilter:
+    """Transform removing the stopwords of the language"""
+
+    def __init__(self, language='english'):
+        self.__language = language
+
+    def __repr__(self):
+        return f"StopWordFilter(language='{self.__language}')"
+
+    def __call__(self, word: str) -> Optional[str]:
+        return None if word in get_stop_words(self.__language) else word
 
 
 class BaseCleaner(ABC):
@@ -35,18 +143,87 @@ class BaseCleaner(ABC):
     def clean(*arg) -> Token:
         pass
 
+    @staticmethod
+    def apply_transforms(tokens: Token, transforms: List[Transform]) -> Token:
+        """
+        Cleans the tokens in a single pass by applying the transforms in order to every word, without building the
+        intermediate tokens of every step. The transforms are expected to be pure, so every distinct word of the
+        vocabulary is transformed only once.
+
+        :param tokens: Tokens to be cleaned
+        :param transforms: Ordered transforms, a transform returning None removes the word
+        :return: Cleaned tokens
+        """
+        cleaned_words = []
+        for word in tokens.get_vocabulary().get_words():
+            for transform in transforms:
+                word = transform(word)
+                if word is None:
+                    break
+            cleaned_words.append(word)
+
+        # Ids of the cleaned words are assigned in the order of their first occurrence, as done by Token
+        vocabulary = Vocabulary()
+        cleaned_ids = [None] * len(cleaned_words)
+        token_ids, offsets = tokens.get_token_ids(), tokens.get_offsets()
+        result_ids, result_offsets = array('i'), array('q', [0])
+        for idx in range(tokens.get_number_of_sentences()):
+            for word_id in token_ids[offsets[idx]:offsets[idx + 1]]:
+                cleaned_id = cleaned_ids[word_id]
+                if cleaned_id is None:
+                    word = cleaned_words[word_id]
+                    cleaned_id = cleaned_ids[word_id] = -1 if word is None else vocabulary.add(word)
+                if cleaned_id >= 0:
+                    result_ids.append(cleaned_id)
+            result_offsets.append(len(result_ids))
+        return Token.from_ids(result_ids, result_offsets, vocabulary)
+
 
 class NLTKCleaner(BaseCleaner):
 
-    def __init__(self, skip_stemming=False):
+    def __init__(self, skip_stemming=False, stemmer=None, fused=True, transforms: List[Transform] = None):
+        """
+        :param skip_stemming: If True, the words are not stemmed.
+        :param stemmer: Stemmer used to stem the words. By default the CachedStemmer shared across the process is used.
+        :param fused: If True, the tokens are cleaned in a single pass applying all the transforms to every word.
+            Else every cleaning step builds its own tokens.
+        :param transforms: Ordered transforms used by the fused mode. By default lowercase, punctuation removal,
+            stopword removal and stemming.
+        """
         self.__skip_stemming = skip_stemming
+        self.__stemmer = stemmer
+        self.__fused = fused
+        self.__transforms = transforms
+        self.__repr = None
 
     def __repr__(self):
-        return f"""NLTKCleaner(skip_stemming={self.__skip_stemming})"""
+        if self.__repr is None:
+            self.__repr = self.__describe()
+        return self.__repr
+
+    def __describe(self) -> str:
+        # The repr keys the cached results, so it describes every setting which changes the cleaned tokens
+        config = f"skip_stemming={self.__skip_stemming}"
+        if self.__transforms is not None:
+            config += f", transforms=[{', '.join(map(describe, self.__transforms))}]"
+        elif self.__stemmer is not None and not self.__skip_stemming:
+            config += f", stemmer={describe(self.__stemmer)}"
+        if not self.__fused:
+            config += ", fused=False"
+        return f"""NLTKCleaner({config})"""
+
+    def get_transforms(self) -> List[Transform]:
+        """Returns the ordered transforms applied by the fused mode"""
+        if self.__transforms is not None:
+            return self.__transforms
+        transforms = [lowercase, filter_punctuation, StopWordFilter()]
+        if not self.__skip_stemming:
+            transforms.append((get_shared_stemmer() if self.__stemmer is None else self.__stemmer).stem)
+        return transforms
 
     @staticmethod
     def remove_stop_words(tokens: Token, language='english') -> Token:
-        stop_words = set(stopwords.words(language))
+        stop_words = get_stop_words(language)
         return Token(
             list(map(lambda token: [word for word in token if word not in stop_words], tokens.get_sentences())))
 
@@ -56,25 +233,28 @@ class NLTKCleaner(BaseCleaner):
 
     @staticmethod
     def remove_punctuation(tokens: Token) -> Token:
-        punctuation = tuple('!"#$%&\'()*+,-./:;<=>?@[\\]^_`{|}~')
         return Token(
-            list(map(lambda token: [word for word in token if word not in punctuation], tokens.get_sentences())))
+            list(map(lambda token: [word for word in token if word not in PUNCTUATION], tokens.get_sentences())))
 
     @staticmethod
-    def stem_words(tokens: Token, stemmer=PorterStemmer()) -> Token:
+    def stem_words(tokens: Token, stemmer=None) -> Token:
         """
         Performs stemming, i.e retaining root word and discard the lexicons.
 
         :param tokens: Tokens to be stemmed
-        :param stemmer: Algorithm to be used for stemming. By default the stemming algorithm used is PorterStemmer.
+        :param stemmer: Algorithm to be used for stemming. By default the PorterStemmer cached and shared across the
+            process is used.
         """
+        stemmer = get_shared_stemmer() if stemmer is None else stemmer
         return Token(list(map(lambda token: [stemmer.stem(word) for word in token], tokens.get_sentences())))
 
     def clean(self, tokens: Token) -> Token:
         """Cleans the tokens and returns cleaned tokens, which now can be used for further processing"""
+        if self.__fused:
+            return NLTKCleaner.apply_transforms(tokens, self.get_transforms())
         result = NLTKCleaner.to_lowercase(tokens)
         result = NLTKCleaner.remove_punctuation(result)
         result = NLTKCleaner.remove_stop_words(result)
         if not self.__skip_stemming:
-            result = NLTKCleaner.stem_words(result)
+            result = NLTKCleaner.stem_words(result, self.__stemmer)
         return result
@@ -0,0 +1,226 @@
+from array import array
+from typing import Tuple
+
+from nutshell.preprocessing.tokenizer import Token
+from nutshell.utils import lazy_import
+
+np = lazy_import('numpy')
+sparse = lazy_import('scipy.sparse')
+csgraph = lazy_import('scipy.sparse.csgraph')
+
+# Odd multiplier of the polynomial hash of the shingles, odd so that it is invertible modulo 2 ** 64
+_SHINGLE_BASE = 0x100000001b3
+
+
+def _mix(values: 'np.ndarray') -> 'np.ndarray':
+    """Finalizer of splitmix64, scrambles the bits of the 64 bit hashes, the products wrap around modulo 2 ** 64"""
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xbf58476d1ce4e5b9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94d049bb133111eb)
+    return values ^ (values >> np.uint64(31))
+
+
+def _as_token(token_ids: 'np.ndarray', offsets: 'np.ndarray', tokens: Token) -> Token:
+    result_ids, result_offsets = array('i'), array('q')
+    result_ids.frombytes(token_ids.astype(np.intc).tobytes())
+    result_offsets.frombytes(offsets.astype(np.int64).tobytes())
+    return Token.from_ids(result_ids, result_offsets, tokens.get_vocabulary())
+
+
+class SentenceGroups:
+    """
+    Groups of duplicate sentences of a corpus, numbered in the order of their first sentence. The first sentence of a
+    group is its representative, the one kept when the groups are collapsed.
+    """
+
+    def __init__(self, groups: 'np.ndarray', representatives: 'np.ndarray'):
+        """
+        :param groups: Group of every sentence
+        :param representatives: Position of the first sentence of every group, in increasing order
+        """
+        self.__groups = groups
+        self.__representatives = representatives
+        self.__multiplicity = np.bincount(groups, minlength=len(representatives))
+
+    def __repr__(self):
+        return f"SentenceGroups(sentences={len(self.__groups)}, groups={len(self)})"
+
+    def __len__(self):
+        return len(self.__representatives)
+
+    def get_groups(self) -> 'np.ndarray':
+        """Returns the group of every sentence"""
+        return self.__groups
+
+    def get_representatives(self) -> 'np.ndarray':
+        """Returns the position of the representative of every group, in increasing order"""
+        return self.__representatives
+
+    def get_multiplicity(self) -> 'np.ndarray':
+        """Returns the number of sentences of every group"""
+        return self.__multiplicity
+
+    def has_duplicates(self) -> bool:
+        return len(self) < len(self.__groups)
+
+    def collapse(self, tokens: Token) -> Token:
+        """
+        Returns the tokens of the representatives only, e.g of the original or of the cleaned sentences
+        :param tokens: Tokens of the sentences which were grouped
+        """
+        if tokens.get_number_of_sentences() != len(self.__groups):
+            raise Exception(f"Invalid tokens, expected {len(self.__groups)} sentences but got "
+                            f"{tokens.get_number_of_sentences()}")
+        token_ids = np.frombuffer(tokens.get_token_ids(), dtype=np.intc)
+        offsets = np.frombuffer(tokens.get_offsets(), dtype=np.int64)
+        starts = offsets[self.__representatives]
+        lengths = offsets[self.__representatives + 1] - starts
+        collapsed_offsets = np.zeros(len(self) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=collapsed_offsets[1:])
+        positions = np.repeat(starts - collapsed_offsets[:-1], lengths) + np.arange(collapsed_offsets[-1])
+        return _as_token(token_ids[positions], collapsed_offsets, tokens)
+
+
+class SentenceDeduplicator:
+
+    def __init__(self, near_duplicates: bool = False, threshold: float = 0.8, shingle_size: int = 3,
+                 num_perm: int = 64, band_size: int = 4, seed: int = 0):
+        """
+        SentenceDeduplicator groups the sentences whose cleaned tokens are identical, and optionally the near
+        duplicates, i.e the sentences whose sets of shingles (runs of shingle_size consecutive cleaned tokens) have an
+        estimated Jaccard similarity of at least threshold. Near duplicates are found with MinHash signatures and
+        locality sensitive hashing, in linear time: the signatures are split into bands of band_size hashes, the
+        sentences sharing a band are candidates and a candidate is grouped with the first sentence of the band if
+        their signatures agree on at least threshold of the hashes. Sentences without any cleaned token, e.g made of
+        stopwords only, are never grouped.
+
+        Boilerplate repeated across a scraped page or a transcript is then ranked once, as a single node weighted by
+        the number of its copies, instead of adding a row and a column of the similarity matrix per copy.
+
+        :param near_duplicates: If True, the near duplicates are grouped as well, else only the exact duplicates.
+        :param threshold: Minimum estimated Jaccard similarity of the shingles of near duplicates.
+        :param shingle_size: Number of cleaned tokens per shingle, shorter sentences are a single shingle.
+        :param num_perm: Number of hashes of the MinHash signatures, a multiple of band_size.
+        :param band_size: Number of hashes per band of locality sensitive hashing. Larger bands produce fewer
+            candidates, i.e fewer false positives to check but more missed near duplicates.
+        :param seed: Seed of the hash functions.
+        """
+        if not 0 < threshold <= 1:
+            raise Exception(f"Invalid threshold {threshold}, expected a similarity in (0, 1]")
+        if shingle_size < 1 or band_size < 1 or num_perm < band_size or num_perm % band_size:
+            raise Exception(f"Invalid shingle_size {shingle_size}, num_perm {num_perm} or band_size {band_size}, "
+                            f"expected positive numbers and num_perm a multiple of band_size")
+        self.__near_duplicates = near_duplicates
+        self.__threshold = threshold
+        self.__shingle_size = shingle_size
+        self.__num_perm = num_perm
+        self.__band_size = band_size
+        self.__seed = seed
+
+    def __repr__(self):
+        if not self.__near_duplicates:
+            return f"SentenceDeduplicator()"
+        return (f"SentenceDeduplicator(near_duplicates=True, threshold={self.__threshold}, "
+                f"shingle_size={self.__shingle_size}, num_perm={self.__num_perm}, band_size={self.__band_size}, "
+                f"seed={self.__seed})")
+
+    def deduplicate(self, tokens: Token) -> SentenceGroups:
+        """
+        Groups the duplicate sentences
+        :param tokens: Cleaned tokens of the sentences
+        :return: Groups of the sentences
+        """
+        n = tokens.get_number_of_sentences()
+        token_ids = np.frombuffer(tokens.get_token_ids(), dtype=np.intc)
+        offsets = np.frombuffer(tokens.get_offsets(), dtype=np.int64)
+        pairs = [self.exact_duplicates(tokens)]
+        if self.__near_duplicates:
+            pairs.append(self.near_duplicates(token_ids, offsets))
+        sources, targets = np.concatenate([pair[0] for pair in pairs]), np.concatenate([pair[1] for pair in pairs])
+        if not len(sources):
+            return SentenceGroups(np.arange(n), np.arange(n))
+
+        graph = sparse.csr_matrix((np.ones(len(sources)), (sources, targets)), shape=(n, n))
+        _, labels = csgraph.connected_components(graph, directed=False)
+        # Components are renumbered in the order of their first sentence
+        first = np.full(labels.max() + 1, n)
+        np.minimum.at(first, labels, np.arange(n))
+        order = np.argsort(first)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        return SentenceGroups(rank[labels], first[order])
+
+    @staticmethod
+    def exact_duplicates(tokens: Token) -> Tuple['np.ndarray', 'np.ndarray']:
+        """
+        Returns the pairs of (sentence, first sentence with the same cleaned tokens)
+        :param tokens: Cleaned tokens of the sentences
+        """
+        token_ids, offsets = tokens.get_token_ids(), tokens.get_offsets()
+        first, sources, targets = {}, [], []
+        for idx in range(tokens.get_number_of_sentences()):
+            start, end = offsets[idx], offsets[idx + 1]
+            if start == end:
+                continue
+            target = first.setdefault(token_ids[start:end].tobytes(), idx)
+            if target != idx:
+                sources.append(idx)
+                targets.append(target)
+        return np.array(sources, dtype=np.int64), np.array(targets, dtype=np.int64)
+
+    def signatures(self, token_ids: 'np.ndarray', offsets: 'np.ndarray') -> 'np.ndarray':
+        """
+        Computes the MinHash signatures of the sentences with at least one token
+        :param token_ids: Flat buffer of the cleaned word ids
+        :param offsets: Offset of every sentence in the word ids, followed by the total number of tokens
+        :return: Signature of every sentence (n * num_perm), the rows of the empty sentences are undefined
+        """
+        k = self.__shingle_size
+        lengths = np.diff(offsets)
+        shingles_per_sentence = np.where(lengths > 0, np.maximum(lengths - k + 1, 1), 0)
+        sentences = np.repeat(np.arange(len(lengths)), shingles_per_sentence)
+        shingle_offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(shingles_per_sentence, out=shingle_offsets[1:])
+        starts = offsets[sentences] + np.arange(len(sentences)) - shingle_offsets[sentences]
+        ends = offsets[sentences + 1]
+
+        # Polynomial hash of the shingles, a shingle of a sentence shorter than k stops at the end of the sentence
+        hashes = np.zeros(len(starts), dtype=np.uint64)
+        words = token_ids.astype(np.uint64) + np.uint64(1)
+        base = np.uint64(_SHINGLE_BASE)
+        for idx in range(k):
+            positions = starts + idx
+            inside = positions < ends
+            hashes = hashes * base + np.where(inside, words[np.minimum(positions, max(len(words) - 1, 0))], 0)
+        hashes = _mix(hashes)
+
+        seeds = np.random.default_rng(self.__seed).integers(0, 2 ** 64, size=self.__num_perm, dtype=np.uint64)
+        non_empty = np.flatnonzero(shingles_per_sentence)
+        signatures = np.zeros((len(lengths), self.__num_perm), dtype=np.uint64)
+        if len(non_empty):
+            for idx, seed in enumerate(seeds):
+                signatures[non_empty, idx] = np.minimum.reduceat(_mix(hashes ^ seed), shingle_offsets[non_empty])
+        return signatures
+
+    def near_duplicates(self, token_ids: 'np.ndarray', offsets: 'np.ndarray') -> Tuple['np.ndarray', 'np.ndarray']:
+        """
+        Returns the pairs of (sentence, first sentence of a band it shares) of the near duplicates
+        :param token_ids: Flat buffer of the cleaned word ids
+        :param offsets: Offset of every sentence in the word ids, followed by the total number of tokens
+        """
+        non_empty = np.flatnonzero(np.diff(offsets))
+        signatures = self.signatures(token_ids, offsets)[non_empty]
+        sources, targets = [], []
+        for start in range(0, self.__num_perm, self.__band_size):
+            band = np.zeros(len(non_empty), dtype=np.uint64)
+            for column in signatures[:, start:start + self.__band_size].T:
+                band = _mix(band * np.uint64(_SHINGLE_BASE) ^ column)
+            _, first, inverse = np.unique(band, return_index=True, return_inverse=True)
+            candidates = np.flatnonzero(first[inverse] != np.arange(len(non_empty)))
+            firsts = first[inverse[candidates]]
+            agreement = (signatures[candidates] == signatures[firsts]).mean(axis=1)
+            similar = agreement >= self.__threshold
+            sources.append(non_empty[candidates[similar]])
+            targets.append(non_empty[firsts[similar]])
+        return np.concatenate(sources), np.concatenate(targets)
@@ -1,20 +1,26 @@
-from typing import Tuple
+from typing import Iterable, List, Tuple, Union
 
 from nutshell.preprocessing.cleaner import BaseCleaner, NLTKCleaner
-from nutshell.preprocessing.tokenizer import BaseTokenizer, Token, NLTKTokenizer
+from nutshell.preprocessing.tokenizer import BaseTokenizer, Token, NLTKTokenizer, get_tokenizer
+
+
+# Short corpus preprocessed by warmup to load the resources of the tokenizer and the cleaner
+WARMUP_CORPUS = "Warming up the text preprocessor. It loads the models, stopwords and stemmer upfront."
 
 
 class TextPreProcessor:
 
-    def __init__(self, tokenizer: BaseTokenizer = NLTKTokenizer(), cleaner: BaseCleaner = NLTKCleaner()):
+    def __init__(self, tokenizer: Union[BaseTokenizer, str] = None, cleaner: BaseCleaner = None):
         """
         TextPreprocessor class is responsible performing tokenization and apply transforms using the cleaner.
 
-        :param tokenizer: Tokenizer object which preforms text tokenization. By default NLTKTokenizer is used.
+        :param tokenizer: Tokenizer object which preforms text tokenization, or the name of a tokenizer, 'nltk' or
+            'regex' for the faster RegexTokenizer. By default NLTKTokenizer is used.
         :param cleaner:  Cleaner object which performs cleaning methods on the tokens. By default NLTKCleaner() is used.
         """
-        self.__cleaner = cleaner
-        self.__tokenizer = tokenizer
+        tokenizer = get_tokenizer(tokenizer)
+        self.__cleaner = NLTKCleaner() if cleaner is None else cleaner
+        self.__tokenizer = NLTKTokenizer() if tokenizer is None else tokenizer
 
     def __repr__(self):
         return f"""TextPreProcessor(cleaner={self.__cleaner}, tokenizer={self.__tokenizer})"""
@@ -26,3 +32,20 @@ class TextPreProcessor:
         """
         original_tokens = self.__tokenizer.tokenize(corpus)
         return original_tokens, self.__cleaner.clean(original_tokens)
+
+    def split_sentences(self, corpus) -> List[str]:
+        """Splits the corpus into sentences, without tokenizing the sentences into words"""
+        return self.__tokenizer.tokenize_into_sentences(corpus)
+
+    def preprocess_sentences(self, sentences: Iterable[str]) -> Tuple[Token, Token]:
+        """
+        Preprocesses the sentences, which are already split from the corpus, by tokenizing them into words and
+        cleaning them
+        :return: Tokens and cleaned tokens
+        """
+        original_tokens = Token(list(map(self.__tokenizer.tokenize_into_words, sentences)))
+        return original_tokens, self.__cleaner.clean(original_tokens)
+
+    def warmup(self):
+        """Loads the resources used by the tokenizer and the cleaner, e.g NLTK models and stopwords"""
+        self.preprocess(WARMUP_CORPUS)
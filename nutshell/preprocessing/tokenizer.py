@@ -1,21 +1,120 @@
+import re
 from abc import ABC, abstractmethod
-from typing import List, Union, Iterable
+from array import array
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple, Union
 
-import nltk
+from nutshell.utils import lazy_import
+
+nltk = lazy_import('nltk')
+
+
+class Vocabulary:
+    """
+    Interns the words, i.e assigns an integer id to every distinct word in the order of their first occurrence
+    """
+    __slots__ = ('__word_ids', '__words')
+
+    def __init__(self, words: Iterable[str] = ()):
+        self.__word_ids: Dict[str, int] = {}
+        self.__words: List[str] = []
+        for word in words:
+            self.add(word)
+
+    def __repr__(self):
+        return f"Vocabulary(size={len(self.__words)})"
+
+    def __len__(self):
+        return len(self.__words)
+
+    def __contains__(self, word):
+        return word in self.__word_ids
+
+    def add(self, word: str) -> int:
+        """Returns the id of the word, adding the word to the vocabulary if it is new"""
+        word_id = self.__word_ids.get(word)
+        if word_id is None:
+            word_id = self.__word_ids[word] = len(self.__words)
+            self.__words.append(word)
+        return word_id
+
+    def encode(self, words: Iterable[str]) -> List[int]:
+        """Returns the ids of the words, adding the new words to the vocabulary"""
+        word_ids, vocabulary = self.__word_ids, self.__words
+        ids = []
+        for word in words:
+            word_id = word_ids.get(word)
+            if word_id is None:
+                word_id = word_ids[word] = len(vocabulary)
+                vocabulary.append(word)
+            ids.append(word_id)
+        return ids
+
+    def get_id(self, word: str) -> Optional[int]:
+        return self.__word_ids.get(word)
+
+    def get_word(self, word_id: int) -> str:
+        return self.__words[word_id]
+
+    def get_words(self) -> List[str]:
+        """Returns all the words, the position of a word in the list is its id"""
+        return self.__words
 
 
 class Token:
-    def __init__(self, raw_tokens: List[List[str]]):
-        self.__raw_tokens = raw_tokens
+    """
+    Tokens of a corpus, stored compactly as one flat buffer of word ids along with the offset of every
+    sentence in the buffer, i.e the words of sentence i are token_ids[offsets[i]:offsets[i + 1]].
+    """
+    __slots__ = ('__vocabulary', '__token_ids', '__offsets')
+
+    def __init__(self, raw_tokens: List[List[str]], vocabulary: Vocabulary = None):
+        """
+        :param raw_tokens: Words of every sentence
+        :param vocabulary: Vocabulary used to encode the words. A new vocabulary is created if not given.
+        """
+        self.__vocabulary = Vocabulary() if vocabulary is None else vocabulary
+        self.__token_ids = array('i')
+        self.__offsets = array('q', [0])
+        for sentence in raw_tokens:
+            self.__token_ids.extend(self.__vocabulary.encode(sentence))
+            self.__offsets.append(len(self.__token_ids))
+
+    @classmethod
+    def from_ids(cls, token_ids: array, offsets: array, vocabulary: Vocabulary) -> 'Token':
+        """
+        Creates the tokens directly from the encoded buffers without going through the words
+        :param token_ids: Flat buffer of word ids, of typecode 'i'
+        :param offsets: Offset of every sentence in the token ids followed by the total number of tokens, of typecode
+            'q'
+        :param vocabulary: Vocabulary used to encode the words
+        """
+        token = cls.__new__(cls)
+        token.__vocabulary = vocabulary
+        token.__token_ids = token_ids
+        token.__offsets = offsets
+        return token
+
+    def get_vocabulary(self) -> Vocabulary:
+        return self.__vocabulary
+
+    def get_token_ids(self) -> array:
+        return self.__token_ids
+
+    def get_offsets(self) -> array:
+        return self.__offsets
+
+    def get_sentence_ids(self, sentence_id) -> array:
+        self.__check_sentence_id(sentence_id)
+        return self.__token_ids[self.__offsets[sentence_id]:self.__offsets[sentence_id + 1]]
 
     def get_sentence(self, sentence_id) -> List:
-        if 0 <= sentence_id <= len(self.__raw_tokens) - 1:
-            return self.__raw_tokens[sentence_id]
-        raise Exception(f"Invalid sentence Id. Valid sentence ids are of range [0, {len(self.__raw_tokens) - 1}]")
+        words = self.__vocabulary.get_words()
+        return [words[word_id] for word_id in self.get_sentence_ids(sentence_id)]
 
     def get_sentences(self):
-        for sentence in self.__raw_tokens:
-            yield sentence
+        words, token_ids, offsets = self.__vocabulary.get_words(), self.__token_ids, self.__offsets
+        for idx in range(len(offsets) - 1):
+            yield [words[word_id] for word_id in token_ids[offsets[idx]:offsets[idx + 1]]]
 
     def get_number_of_tokens(self, raw=True) -> Union[List, int]:
         """
@@ -23,15 +122,21 @@ class Token:
         :param raw: If false returns the total number of __tokens
         :return: List of __tokens per sentence (1*n) -> n number of sentences
         """
-        count = list(map(len, self.get_sentences()))
-        return count if raw else sum(count)
+        if not raw:
+            return len(self.__token_ids)
+        offsets = self.__offsets
+        return [offsets[idx + 1] - offsets[idx] for idx in range(len(offsets) - 1)]
 
     def get_avg_token_per_sentence(self) -> float:
-        res = self.get_number_of_tokens()
-        return sum(res) / len(res)
+        return len(self.__token_ids) / self.get_number_of_sentences()
 
     def get_number_of_sentences(self):
-        return len(self.__raw_tokens)
+        return len(self.__offsets) - 1
+
+    def __check_sentence_id(self, sentence_id):
+        if not 0 <= sentence_id <= self.get_number_of_sentences() - 1:
+            raise Exception(f"Invalid sentence Id. Valid sentence ids are of range "
+                            f"[0, {self.get_number_of_sentences() - 1}]")
 
 
 class BaseTokenizer(ABC):
@@ -77,3 +182,158 @@ class NLTKTokenizer(BaseTokenizer):
         sentences = NLTKTokenizer.tokenize_into_sentences(corpus)
         raw_tokens = list(map(NLTKTokenizer.tokenize_into_words, sentences))
         return Token(raw_tokens)
+
+
+# Abbreviations after which a period never ends a sentence, lowercase and without the trailing period
+ABBREVIATIONS = frozenset((
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'rev', 'hon', 'gen', 'col', 'lt', 'capt', 'sgt', 'gov', 'sen',
+    'rep', 'fr', 'mt', 'ft', 'vs', 'etc', 'al', 'approx', 'dept', 'est', 'fig', 'vol', 'inc', 'ltd', 'co', 'corp',
+    'jan', 'feb', 'mar', 'apr', 'jun', 'jul', 'aug', 'sep', 'sept', 'oct', 'nov', 'dec'
+))
+# Abbreviations which are also words (e.g "No. 5" and "said no."), whose period ends a sentence unless a number follows
+NUMBER_ABBREVIATIONS = frozenset(('no', 'nos'))
+NUMBER_PATTERN = re.compile(r'\s*\d')
+
+# Tokens of the regex tokenizer, in the order they are tried. Words keep their inner hyphens, apostrophes and periods
+# (e.g U.S), numbers their separators (1,000.50 or 12:30), and both their slashes and equal signs, which the Treebank
+# tokenizer used by NLTK never splits (e.g 3.50/hr, and/or, //x.com/a and b=1 of https://x.com/a?b=1).
+TOKEN_PATTERN = re.compile(r"""
+    (?P<word>/*\w+(?:[-'.=]\w+|/+\w+|(?<=\d)[,:]\d+)*/*)
+    |(?P<ellipsis>\.\.\.+)
+    |(?P<terminal>[.!?]+)
+    |(?P<dash>--+)
+    |(?P<quote>")
+    |(?P<closing>[)\]}']|'')
+    |(?P<other>[^\w\s])
+""", re.VERBOSE)
+
+# Contractions split by the Treebank tokenizer, e.g don't -> do n't
+CONTRACTION_PATTERN = re.compile(r"(?i)^(\w+)(n't|'s|'m|'re|'ve|'ll|'d)$")
+CONTRACTIONS = {'cannot': 3, 'gimme': 3, 'gonna': 3, 'gotta': 3, 'lemme': 3, 'wanna': 3}
+OPENING_CONTEXT = frozenset(' \t\r\n([{<')
+
+
+class RegexTokenizer(BaseTokenizer):
+    """
+    Tokenizer built on precompiled regexes, which splits the sentences and the words of the whole corpus in a single
+    scan. Sentences end at terminal punctuation followed by a space and a word not starting in lowercase, except
+    after the known abbreviations and the initials, i.e single uppercase letters. The period after a word with inner
+    periods (e.g U.S or p.m) is part of the word, unless it ends the sentence. Words are split like the Treebank
+    tokenizer used by NLTKTokenizer, i.e punctuation, quotes converted to `` and '' and contractions are separate
+    tokens, while slashes and equal signs stay in the words, e.g in URLs and rates like 3.50/hr. Unlike Treebank, a
+    colon is only kept between digits and repeated equal signs are split, e.g host:21/x and a==b.
+    """
+
+    def __init__(self, abbreviations: Iterable[str] = None):
+        """
+        :param abbreviations: Abbreviations after which a period does not end a sentence, lowercase and without the
+            period. By default ABBREVIATIONS is used.
+        """
+        self.__abbreviations: FrozenSet[str] = ABBREVIATIONS if abbreviations is None else frozenset(abbreviations)
+
+    def __repr__(self):
+        if self.__abbreviations == ABBREVIATIONS:
+            return f"""RegexTokenizer()"""
+        return f"""RegexTokenizer(abbreviations={sorted(self.__abbreviations)})"""
+
+    def tokenize_into_words(self, sentence: str) -> List[str]:
+        return [word for words, _ in self.__scan(sentence) for word in words]
+
+    def tokenize_into_sentences(self, corpus: str) -> List[str]:
+        return [corpus[start:end] for _, (start, end) in self.__scan(corpus)]
+
+    def tokenize(self, corpus: str) -> Token:
+        """Tokenizes the given corpus into sentences and words"""
+        return Token([words for words, _ in self.__scan(corpus)])
+
+    def __is_abbreviation(self, word: str, text: str, position: int) -> bool:
+        """
+        Returns whether the period following the word never ends a sentence, i.e after an initial or an abbreviation
+        :param position: Position in the text after the period, abbreviations of numbers must be followed by a number
+        """
+        if len(word) == 1:
+            return word.isupper()
+        word = word.lower()
+        if word in NUMBER_ABBREVIATIONS:
+            return NUMBER_PATTERN.match(text, position) is not None
+        return word in self.__abbreviations
+
+    def __scan(self, text: str) -> Iterator[Tuple[List[str], Tuple[int, int]]]:
+        """
+        Scans the text once, splitting both the sentences and their words
+        :return: Iterator of the words of every sentence along with the span of the sentence in the text
+        """
+        words: List[str] = []
+        start = end = 0
+        # Set after terminal punctuation, the sentence ends before the next token unless it starts in lowercase
+        pending_break = False
+        last_kind = None
+        for match in TOKEN_PATTERN.finditer(text):
+            kind, token = match.lastgroup, match.group()
+            token_start, token_end = match.span()
+            adjacent = token_start == end and bool(words)
+
+            if pending_break:
+                if adjacent and kind in ('quote', 'closing'):
+                    # Closing quotes and brackets belong to the sentence ending before them
+                    words.append("''" if kind == 'quote' else token)
+                    end = token_end
+                    continue
+                pending_break = False
+                if not adjacent and not token[0].islower():
+                    if last_kind == 'abbreviation':
+                        words[-1:] = [words[-1][:-1], '.']
+                    yield words, (start, end)
+                    words, adjacent = [], False
+
+            if not words:
+                start = token_start
+            if kind == 'word':
+                self.__append_word(words, token)
+            elif kind == 'terminal':
+                if token == '.' and adjacent and last_kind == 'word' and (
+                        '.' in words[-1] or self.__is_abbreviation(words[-1], text, token_end)):
+                    # Words with inner periods may still end the sentence, their period is split if they do
+                    pending_break = '.' in words[-1]
+                    words[-1] += '.'
+                    kind = 'abbreviation' if pending_break else 'word'
+                else:
+                    words.append(token)
+                    pending_break = True
+            elif kind == 'quote':
+                words.append('``' if token_start == 0 or text[token_start - 1] in OPENING_CONTEXT else "''")
+            else:
+                words.append(token)
+            last_kind = kind
+            end = token_end
+
+        if words:
+            # The period of an abbreviation ending the text is split, like any final period
+            if last_kind in ('word', 'abbreviation') and words[-1].endswith('.') and len(words[-1]) > 1:
+                words[-1:] = [words[-1][:-1], '.']
+            yield words, (start, end)
+
+    @staticmethod
+    def __append_word(words: List[str], word: str):
+        split = CONTRACTIONS.get(word.lower())
+        if split is not None:
+            words.extend((word[:split], word[split:]))
+            return
+        match = CONTRACTION_PATTERN.match(word) if "'" in word else None
+        if match is None:
+            words.append(word)
+        else:
+            words.extend(match.groups())
+
+
+# Tokenizers selectable by name, e.g TextPreProcessor(tokenizer='regex')
+TOKENIZERS = {'nltk': NLTKTokenizer, 'regex': RegexTokenizer}
+
+
+def get_tokenizer(tokenizer: Union[BaseTokenizer, str, None]) -> Optional[BaseTokenizer]:
+    """Returns the tokenizer, created from TOKENIZERS if given by its name"""
+    if isinstance(tokenizer, str):
+        if tokenizer not in TOKENIZERS:
+            raise Exception(f"Invalid tokenizer '{tokenizer}'. Valid tokenizers are {tuple(TOKENIZERS)}")
+        return TOKENIZERS[tokenizer]()
+    return tokenizer
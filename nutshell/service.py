@@ -0,0 +1,398 @@
+"""
+Asyncio front end of the models. The CPU bound work runs on a managed pool of worker processes or threads, so that
+summarising long corpora never blocks the event loop.
+
+Also provides a minimal local server, either over HTTP or JSON lines on stdin/stdout, to load test the throughput and
+tail latency of the models without any third party service:
+    python -m nutshell.service --port 8080
+    curl -d '{"text": "..."}' localhost:8080/summarise
+
+Requires Python 3.7+, for asyncio.run and the initializers of the executors, unlike the rest of nutshell.
+"""
+import argparse
+import asyncio
+import copy
+import json
+import sys
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from os import cpu_count
+from typing import Any, Dict, Tuple
+
+from nutshell.model import Summarizer
+from nutshell.utils import construct_sentences_from_ranking
+
+if sys.version_info < (3, 7):
+    raise ImportError("nutshell.service requires Python 3.7 or later")
+
+# Model of the worker thread or process
+_worker = threading.local()
+
+
+def _init_worker(model, copy_model: bool):
+    # Models keep per call state, so every worker thread needs its own copy. Worker processes receive their own copy.
+    _worker.model = copy.deepcopy(model) if copy_model else model
+    _worker.model.warmup()
+
+
+def _invoke(method: str, corpus, kwargs: dict):
+    return getattr(_worker.model, method)(corpus, **kwargs)
+
+
+class AsyncSummarizer:
+    EXECUTORS = ('process', 'thread')
+
+    def __init__(self, model=None, workers: int = None, max_pending: int = 64, timeout: float = None,
+                 executor: str = 'process'):
+        """
+        AsyncSummarizer runs the requests of asyncio code on a pool of workers. Requests wait in a bounded queue for a
+        free worker, submitting a request while the queue is full waits for a slot, which applies backpressure to the
+        callers. Identical requests in flight are coalesced into a single one.
+
+        :param model: Model run by the workers, it must provide a warmup method and be picklable for the process
+            executor, e.g Summarizer or KeywordExtractor. Default - Summarizer.
+        :param workers: Number of worker processes or threads. Default - number of cpus.
+        :param max_pending: Maximum number of requests waiting for a worker.
+        :param timeout: Default timeout in seconds of a request, including the time spent waiting for a worker.
+            Default - no timeout.
+        :param executor: 'process' runs the model in worker processes, 'thread' in worker threads which avoids
+            pickling the corpora and the results, but shares the GIL with the event loop.
+        """
+        if executor not in AsyncSummarizer.EXECUTORS:
+            raise Exception(f"Invalid executor '{executor}'. Valid executors are {AsyncSummarizer.EXECUTORS}")
+        self.__model = Summarizer() if model is None else model
+        self.__workers = workers or cpu_count() or 1
+        self.__max_pending = max_pending
+        self.__timeout = timeout
+        self.__executor_type = executor
+
+        self.__executor = None
+        self.__queue: asyncio.Queue = None
+        self.__dispatchers = []
+        self.__in_flight: Dict[Tuple, asyncio.Future] = {}
+        self.__waiters: Counter = Counter()
+        self.__stats = Counter()
+
+    def __repr__(self):
+        return (f"AsyncSummarizer(model={self.__model}, workers={self.__workers}, max_pending={self.__max_pending}, "
+                f"timeout={self.__timeout}, executor='{self.__executor_type}')")
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self):
+        """Starts the workers, which load the resources of the model upfront"""
+        if self.__executor is not None:
+            return
+        if self.__executor_type == 'process':
+            self.__executor = ProcessPoolExecutor(self.__workers, initializer=_init_worker,
+                                                  initargs=(self.__model, False))
+        else:
+            self.__executor = ThreadPoolExecutor(self.__workers, initializer=_init_worker,
+                                                 initargs=(self.__model, True))
+        self.__queue = asyncio.Queue(self.__max_pending)
+        self.__dispatchers = [asyncio.ensure_future(self.__dispatch()) for _ in range(self.__workers)]
+
+    async def close(self):
+        """Cancels the pending requests and stops the workers"""
+        if self.__executor is None:
+            return
+        for dispatcher in self.__dispatchers:
+            dispatcher.cancel()
+        await asyncio.gather(*self.__dispatchers, return_exceptions=True)
+        for future in list(self.__in_flight.values()):
+            future.cancel()
+        executor, self.__executor = self.__executor, None
+        await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Returns the number of requests submitted, coalesced, rejected, completed, failed and timed out so far"""
+        stats = dict(self.__stats)
+        stats['pending'] = 0 if self.__queue is None else self.__queue.qsize()
+        stats['in_flight'] = len(self.__in_flight)
+        return stats
+
+    async def summarise(self, corpus, reduction_ratio=0.70, preserve_order=False, timeout: float = None):
+        """
+        Returns the summarised text, see Summarizer.summarise
+        :param timeout: Timeout in seconds of the request. Default - the timeout of the AsyncSummarizer.
+        :raise asyncio.TimeoutError: If the summary is not ready within the timeout
+        """
+        return await self.request('summarise', corpus, timeout=timeout, reduction_ratio=reduction_ratio,
+                                  preserve_order=preserve_order)
+
+    async def request(self, method: str, corpus, timeout: float = None, **kwargs) -> Any:
+        """
+        Invokes model.method(corpus, **kwargs) on a worker and returns its result. Cancelling the request cancels the
+        work as well, unless a worker already started it or identical requests are still waiting for it.
+        :param method: Name of the model method
+        :param corpus: Text passed to the method
+        :param timeout: Timeout in seconds of the request. Default - the timeout of the AsyncSummarizer.
+        :raise asyncio.TimeoutError: If the result is not ready within the timeout
+        """
+        timeout = self.__timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(self.__request(method, corpus, kwargs), timeout)
+        except asyncio.TimeoutError:
+            self.__stats['timeouts'] += 1
+            raise
+
+    async def __request(self, method: str, corpus, kwargs: dict):
+        return await self.__wait(await self.submit(method, corpus, **kwargs))
+
+    async def submit(self, method: str, corpus, block: bool = True, **kwargs) -> asyncio.Future:
+        """
+        Queues the request and returns the future of its result as soon as it is queued, so that callers can keep
+        submitting while earlier requests run. The result has to be awaited using wait.
+        :param block: If True, waits for a slot while the queue is full, else raises asyncio.QueueFull
+        :return: Future of the result, shared by the identical requests in flight
+        """
+        if self.__executor is None:
+            await self.start()
+        self.__stats['submitted'] += 1
+        key = (method, corpus, tuple(sorted(kwargs.items())))
+        future = self.__in_flight.get(key)
+        if future is not None and not future.done():
+            self.__stats['coalesced'] += 1
+            return future
+
+        future = asyncio.get_running_loop().create_future()
+        self.__in_flight[key] = future
+        done = partial(self.__done, key)
+        future.add_done_callback(done)
+        item = (method, corpus, kwargs, future)
+        try:
+            if block:
+                await self.__queue.put(item)
+            else:
+                self.__queue.put_nowait(item)
+        except BaseException as e:
+            if isinstance(e, asyncio.QueueFull):
+                # Rejected requests are counted as rejected only, not as cancelled
+                self.__stats['rejected'] += 1
+                future.remove_done_callback(done)
+                del self.__in_flight[key]
+            future.cancel()
+            raise
+        return future
+
+    async def wait(self, future: asyncio.Future, timeout: float = None):
+        """
+        Waits for the result of a submitted request. The work is cancelled once all the requests waiting for it are
+        cancelled, unless a worker already started it.
+        :param future: Future returned by submit
+        :param timeout: Timeout in seconds, from now on. Default - the timeout of the AsyncSummarizer.
+        :raise asyncio.TimeoutError: If the result is not ready within the timeout
+        """
+        timeout = self.__timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(self.__wait(future), timeout)
+        except asyncio.TimeoutError:
+            self.__stats['timeouts'] += 1
+            raise
+
+    async def __wait(self, future: asyncio.Future):
+        self.__waiters[future] += 1
+        try:
+            return await asyncio.shield(future)
+        finally:
+            self.__waiters[future] -= 1
+            if self.__waiters[future] == 0:
+                del self.__waiters[future]
+                if not future.done():
+                    future.cancel()
+
+    def __done(self, key: Tuple, future: asyncio.Future):
+        if self.__in_flight.get(key) is future:
+            del self.__in_flight[key]
+        if future.cancelled():
+            self.__stats['cancelled'] += 1
+        elif future.exception() is not None:
+            self.__stats['failed'] += 1
+        else:
+            self.__stats['completed'] += 1
+
+    async def __dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            method, corpus, kwargs, future = await self.__queue.get()
+            try:
+                # Requests cancelled while waiting in the queue are skipped
+                if future.done():
+                    continue
+                try:
+                    result = await loop.run_in_executor(self.__executor, _invoke, method, corpus, kwargs)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+            finally:
+                self.__queue.task_done()
+
+
+def _parse_request(payload: dict) -> Tuple[str, dict, float]:
+    if not isinstance(payload, dict):
+        raise ValueError("Expected the request to be a JSON object")
+    text = payload.get('text')
+    if not isinstance(text, str):
+        raise ValueError("Expected the text to be summarised in the 'text' field")
+    kwargs = {'reduction_ratio': float(payload.get('reduction_ratio', 0.70)),
+              'preserve_order': bool(payload.get('preserve_order', False))}
+    timeout = payload.get('timeout')
+    return text, kwargs, None if timeout is None else float(timeout)
+
+
+async def _submit_request(service: AsyncSummarizer, payload: dict, block: bool):
+    """
+    Submits a summarisation request of the server
+    :return: Future of the summary and the timeout of the request, or the HTTP status and the response on errors
+    """
+    try:
+        text, kwargs, timeout = _parse_request(payload)
+    except (TypeError, ValueError) as e:
+        return 400, {'error': str(e)}
+    try:
+        return await service.submit('summarise', text, block=block, **kwargs), timeout
+    except asyncio.QueueFull:
+        return 503, {'error': 'Too many pending requests'}
+
+
+async def _summary_response(service: AsyncSummarizer, future: asyncio.Future, timeout: float) -> Tuple[int, dict]:
+    """Waits for the summary of a request of the server, returns the HTTP status and the response"""
+    try:
+        ranking = await service.wait(future, timeout)
+    except asyncio.TimeoutError:
+        return 504, {'error': 'Timed out'}
+    except Exception as e:
+        return 500, {'error': repr(e)}
+    return 200, {'summary': construct_sentences_from_ranking(ranking)}
+
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error', 503: 'Service Unavailable',
+           504: 'Gateway Timeout'}
+
+
+async def _handle_http(service: AsyncSummarizer, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """
+    Serves the HTTP/1.1 requests of a connection, POST /summarise with a JSON body and GET /stats. The server rejects
+    requests with 503 instead of waiting while the queue is full.
+    """
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line.strip():
+                break
+            method, path, _ = request_line.decode('latin-1').split(' ', 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+            if method == 'POST' and path == '/summarise':
+                try:
+                    payload = json.loads(body)
+                except ValueError:
+                    status, response = 400, {'error': 'Invalid JSON'}
+                else:
+                    status, response = await _submit_request(service, payload, block=False)
+                    if isinstance(status, asyncio.Future):
+                        status, response = await _summary_response(service, status, response)
+            elif method == 'GET' and path == '/stats':
+                status, response = 200, service.get_stats()
+            else:
+                status, response = 404, {'error': f'Unknown route {method} {path}'}
+
+            data = json.dumps(response).encode('utf-8')
+            writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+                         f"Content-Length: {len(data)}\r\n\r\n".encode('latin-1') + data)
+            await writer.drain()
+            if headers.get('connection', '').lower() == 'close':
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_http(service: AsyncSummarizer, host='127.0.0.1', port=8080):
+    """Serves the summarisation requests over HTTP until cancelled"""
+    async with service:
+        server = await asyncio.start_server(partial(_handle_http, service), host, port)
+        print(f"Serving {service} on http://{host}:{port}", file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+
+async def serve_stdin(service: AsyncSummarizer):
+    """
+    Serves the summarisation requests read as JSON lines from stdin, e.g {"id": 1, "text": "..."}, and writes the
+    responses as JSON lines to stdout in the order of completion. Reading waits while the queue is full.
+    """
+    loop = asyncio.get_running_loop()
+
+    def write(request_id, status, response):
+        sys.stdout.write(json.dumps(dict(id=request_id, status=status, **response)) + '\n')
+        sys.stdout.flush()
+
+    async def respond(request_id, future, timeout):
+        write(request_id, *await _summary_response(service, future, timeout))
+
+    async with service:
+        tasks = set()
+        while True:
+            line = await loop.run_in_executor(None, sys.stdin.readline)
+            if not line:
+                break
+            if not line.strip():
+                continue
+            try:
+                payload = json.loads(line)
+            except ValueError:
+                write(None, 400, {'error': 'Invalid JSON'})
+                continue
+            request_id = payload.get('id') if isinstance(payload, dict) else None
+            # Waits for a slot in the queue before reading the next line
+            status, response = await _submit_request(service, payload, block=True)
+            if isinstance(status, asyncio.Future):
+                task = asyncio.ensure_future(respond(request_id, status, response))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            else:
+                write(request_id, status, response)
+        await asyncio.gather(*tasks)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--stdin', action='store_true',
+                        help='Read the requests as JSON lines from stdin instead of serving HTTP')
+    parser.add_argument('--workers', type=int, default=None, help='Number of workers. Default - number of cpus.')
+    parser.add_argument('--max-pending', type=int, default=64, help='Maximum number of requests waiting for a worker')
+    parser.add_argument('--timeout', type=float, default=None, help='Default timeout of a request in seconds')
+    parser.add_argument('--executor', choices=AsyncSummarizer.EXECUTORS, default='process')
+    args = parser.parse_args(argv)
+
+    service = AsyncSummarizer(workers=args.workers, max_pending=args.max_pending, timeout=args.timeout,
+                              executor=args.executor)
+    try:
+        asyncio.run(serve_stdin(service) if args.stdin else serve_http(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
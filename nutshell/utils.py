@@ -1,5 +1,37 @@
+import codecs
+import gzip
+import json
+import mmap
 import os
-from typing import Tuple, List
+from importlib import import_module
+from typing import Iterable, Iterator, List, Tuple
+
+
+class LazyModule:
+    """
+    Proxy of a module, which is imported only when one of its attributes is accessed for the first time. Keeps the
+    import of nutshell light, heavy dependencies like numpy, scipy and nltk are loaded on first use.
+    """
+
+    def __init__(self, name: str):
+        self.__name = name
+        self.__module = None
+
+    def __repr__(self):
+        return f"LazyModule(name='{self.__name}', loaded={self.__module is not None})"
+
+    def load(self):
+        """Imports the module if not done already and returns it"""
+        if self.__module is None:
+            self.__module = import_module(self.__name)
+        return self.__module
+
+    def __getattr__(self, item):
+        return getattr(self.load(), item)
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
 
 
 def load_corpus(file_path):
@@ -9,6 +41,96 @@ def load_corpus(file_path):
     return corpus
 
 
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def is_gzip(file_path) -> bool:
+    with open(file_path, 'rb') as f:
+        return f.read(2) == GZIP_MAGIC
+
+
+def iter_lines(file_path, encoding='utf-8') -> Iterator[str]:
+    """
+    Iterates the lines of a plain text or gzip file lazily, without their line breaks. Plain text files are memory
+    mapped, so the lines are read straight from the page cache and only the current line is held in memory.
+    """
+    if is_gzip(file_path):
+        with gzip.open(file_path, 'rt', encoding=encoding) as f:
+            for line in f:
+                yield line.rstrip('\r\n')
+        return
+    if os.path.getsize(file_path) == 0:
+        return
+    decoder = codecs.getincrementaldecoder(encoding)()
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for line in iter(mapped.readline, b''):
+            yield decoder.decode(line).rstrip('\r\n')
+
+
+def iter_jsonl(file_path, field='text', encoding='utf-8') -> Iterator[str]:
+    """
+    Iterates the documents of a JSON lines file, plain or gzip, one JSON object per line
+    :param field: Field of the objects holding the text of the document
+    """
+    for number, line in enumerate(iter_lines(file_path, encoding), start=1):
+        if not line.strip():
+            continue
+        try:
+            document = json.loads(line)[field]
+        except (ValueError, KeyError, TypeError) as e:
+            raise Exception(f"Invalid document at line {number} of {file_path}: {e!r}")
+        yield document
+
+
+def iter_paragraphs(file_path, encoding='utf-8', max_chars=2 ** 20) -> Iterator[str]:
+    """
+    Iterates the paragraphs of a text file, plain or gzip, i.e the blocks of lines separated by blank lines
+    :param max_chars: Paragraphs longer than this are split at a line break, which bounds the memory used on files
+        without blank lines
+    """
+    lines, size = [], 0
+    for line in iter_lines(file_path, encoding):
+        if line.strip():
+            lines.append(line)
+            size += len(line) + 1
+        if lines and (not line.strip() or size >= max_chars):
+            yield '\n'.join(lines)
+            lines, size = [], 0
+    if lines:
+        yield '\n'.join(lines)
+
+
+def iter_documents(file_path, file_format=None, field='text', encoding='utf-8') -> Iterator[str]:
+    """
+    Iterates the documents of a file lazily, so that the whole file never has to fit in memory
+    :param file_path: Path of a text or JSON lines file, optionally gzip compressed
+    :param file_format: 'jsonl' for one JSON document per line, 'text' for one document per paragraph. By default it is
+        inferred from the extension, .jsonl and .ndjson being JSON lines.
+    :param field: Field of the JSON documents holding the text
+    """
+    if file_format is None:
+        name = file_path[:-3] if file_path.endswith('.gz') else file_path
+        file_format = 'jsonl' if name.endswith(('.jsonl', '.ndjson')) else 'text'
+    if file_format == 'jsonl':
+        return iter_jsonl(file_path, field, encoding)
+    if file_format == 'text':
+        return iter_paragraphs(file_path, encoding)
+    raise Exception(f"Invalid file format '{file_format}'. Valid formats are ('jsonl', 'text')")
+
+
+def iter_sentences(documents: Iterable[str], tokenizer=None) -> Iterator[str]:
+    """
+    Splits the documents into sentences lazily, e.g to feed Summarizer.summarise_sentences
+    :param documents: Documents, e.g from iter_documents
+    :param tokenizer: Tokenizer splitting the sentences. By default NLTKTokenizer is used.
+    """
+    if tokenizer is None:
+        from nutshell.preprocessing.tokenizer import NLTKTokenizer
+        tokenizer = NLTKTokenizer()
+    for document in documents:
+        yield from tokenizer.tokenize_into_sentences(document)
+
+
 def construct_sentences_from_ranking(ranking: List[Tuple[float, List]]):
     text = []
     for score, sentence in ranking:
@@ -9,7 +9,7 @@ setup(
     packages=find_packages(exclude=['tests', 'tests.*', '.github']),
     install_requires=[
         'numpy',
-        'networkx',
+        'scipy',
         'nltk'
     ],
     url='https://github.com/KrishnanSG/Nutshell',
@@ -26,5 +26,8 @@ setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
     ],
+    entry_points={
+        'console_scripts': ['nutshell=nutshell.cli:main'],
+    },
     python_requires='>=3.6'
 )
@@ -0,0 +1,13 @@
+import os
+
+import pytest
+
+from nutshell.utils import load_corpus
+
+SAMPLE = os.path.join(os.path.dirname(__file__), 'sample.txt')
+
+
+@pytest.fixture(scope='session')
+def corpus() -> str:
+    """Text of the sample article, shared by the tests"""
+    return load_corpus(SAMPLE)
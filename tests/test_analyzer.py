@@ -0,0 +1,32 @@
+import pytest
+
+from nutshell.model import Analyzer, KeywordExtractor, Summarizer
+from nutshell.preprocessing.cleaner import NLTKCleaner
+from nutshell.preprocessing.preprocessor import TextPreProcessor
+from nutshell.preprocessing.tokenizer import RegexTokenizer
+
+
+def test_analyzer_matches_separate_calls(corpus):
+    analyzer = Analyzer(tokenizer=RegexTokenizer())
+    keyword_extractor = KeywordExtractor(TextPreProcessor(tokenizer='regex', cleaner=NLTKCleaner(skip_stemming=True)))
+    summarizer = Summarizer(TextPreProcessor(tokenizer='regex'))
+    assert analyzer.analyse(corpus, reduction_ratio=0.5, count=10) == {
+        'summary': summarizer.summarise(corpus, reduction_ratio=0.5),
+        'keywords': keyword_extractor.extract_keywords(corpus, count=10),
+    }
+    assert analyzer.analyse(corpus, raw=True)['keywords'] == keyword_extractor.extract_keywords(corpus, raw=True)
+
+
+def test_document_is_preprocessed_once(corpus):
+    analyzer = Analyzer(tokenizer=RegexTokenizer())
+    document = analyzer.preprocess(corpus)
+    first = analyzer.analyse(document, reduction_ratio=0.5)
+    cleaned_tokens = document.get_cleaned_tokens(stemmed=True)
+    assert analyzer.analyse(document, reduction_ratio=0.5) == first
+    assert document.get_cleaned_tokens(stemmed=True) is cleaned_tokens
+
+
+def test_tokenizer_by_name(corpus):
+    assert Analyzer(tokenizer='regex').analyse(corpus) == Analyzer(tokenizer=RegexTokenizer()).analyse(corpus)
+    with pytest.raises(Exception, match="Invalid tokenizer 'spacy'"):
+        Analyzer(tokenizer='spacy')
@@ -0,0 +1,106 @@
+import os
+import pickle
+from copy import deepcopy
+
+from nutshell.algorithms.information_retrieval import ClassicalIR, IDFModel, word_hash
+from nutshell.cache import ResultCache
+from nutshell.model import KeywordExtractor, Summarizer
+from nutshell.preprocessing.cleaner import NLTKCleaner
+from nutshell.preprocessing.preprocessor import TextPreProcessor
+
+
+def background_models():
+    """Models of the same numbers of docs and words, which differ only by their document frequencies"""
+    words = [word_hash('model'), word_hash('summaries')]
+    return (IDFModel.from_doc_freqs(dict(zip(words, (1, 50))), 100),
+            IDFModel.from_doc_freqs(dict(zip(words, (50, 1))), 100))
+
+
+def test_equal_sized_background_models_do_not_share_results(corpus):
+    first, second = background_models()
+    assert (first.get_number_of_docs(), len(first)) == (second.get_number_of_docs(), len(second))
+    assert repr(first) != repr(second)
+
+    preprocessor = TextPreProcessor(tokenizer='regex', cleaner=NLTKCleaner(skip_stemming=True))
+    cache = ResultCache()
+    keywords = [KeywordExtractor(preprocessor, ClassicalIR(model), cache=cache).extract_keywords(corpus, raw=True)
+                for model in (first, second)]
+    summaries = [Summarizer(TextPreProcessor(tokenizer='regex'), ir=ClassicalIR(model), cache=cache).summarise(corpus)
+                 for model in (first, second)]
+    assert cache.get_stats()['misses'] == 4
+    assert keywords[0] != keywords[1]
+    assert keywords[1] == KeywordExtractor(preprocessor, ClassicalIR(second)).extract_keywords(corpus, raw=True)
+    assert summaries[1] == Summarizer(TextPreProcessor(tokenizer='regex'), ir=ClassicalIR(second)).summarise(corpus)
+
+
+def test_model_refitted_in_place(tmp_path):
+    first, second = background_models()
+    path, refitted = str(tmp_path / 'background.idf'), str(tmp_path / 'refitted.idf')
+    first.save(path)
+    loaded = IDFModel.load(path)
+    # The refitted model replaces the file, the model loaded before keeps mapping the previous one
+    second.save(refitted)
+    os.replace(refitted, path)
+    reloaded = IDFModel.load(path)
+    assert repr(loaded) != repr(reloaded)
+    assert reloaded.get_digest() == second.get_digest() != first.get_digest() == loaded.get_digest()
+
+
+def test_lru_evicts_the_least_recently_used():
+    cache = ResultCache(max_size=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert (cache.get('b'), cache.get('a'), cache.get('c')) == (None, 1, 3)
+    assert cache.get_stats() == dict(hits=3, disk_hits=0, misses=1, evictions=1, size=2)
+
+
+def test_missing_and_none_results():
+    cache = ResultCache()
+    calls = []
+    for _ in range(2):
+        assert cache.get_or_compute('key', lambda: calls.append('computed')) is None
+    # None is a valid result, computed only once
+    assert calls == ['computed']
+    assert cache.get('other', 'default') == 'default'
+
+
+def test_sqlite_tier_persists_across_instances(tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    ResultCache(path=path).put('key', [(0.5, ['a', 'sentence'])])
+    cache = ResultCache(path=path)
+    assert len(cache) == 0
+    assert cache.get('key') == [(0.5, ['a', 'sentence'])]
+    assert cache.get('key') == [(0.5, ['a', 'sentence'])]
+    assert cache.get_stats() == dict(hits=1, disk_hits=1, misses=0, evictions=0, size=1)
+    # Pickled copies, e.g of the worker processes, share the disk tier only
+    copy = pickle.loads(pickle.dumps(cache))
+    assert (len(copy), copy.get('key')) == (0, [(0.5, ['a', 'sentence'])])
+    cache.clear()
+    assert ResultCache(path=path).get('key') is None
+
+
+def test_results_are_copied(tmp_path):
+    for cache in (ResultCache(), ResultCache(path=str(tmp_path / 'results.sqlite'), max_size=0)):
+        result = [(0.5, ['a', 'sentence'])]
+        cache.put('key', result)
+        result[0][1].append('changed')
+        cached = cache.get('key')
+        cached[0][1].append('changed')
+        assert cache.get('key') == [(0.5, ['a', 'sentence'])]
+    # Deep copies of the models share their cache
+    cache = ResultCache()
+    assert deepcopy(cache) is cache
+
+
+def test_summaries_are_cached(corpus):
+    cache = ResultCache()
+    summarizer = Summarizer(TextPreProcessor(tokenizer='regex'), cache=cache)
+    summary, stats = summarizer.summarise(corpus, with_stats=True)
+    # Copies of a text differing in their layout only share their summary
+    cached, cached_stats = summarizer.summarise('  ' + corpus.replace(' ', '\n'), with_stats=True)
+    assert cached == summary
+    assert (stats.counters['cache_hit'], cached_stats.counters['cache_hit']) == (0, 1)
+    assert summarizer.summarise(corpus, reduction_ratio=0.5) != summary
+    assert cache.get_stats()['misses'] == 2
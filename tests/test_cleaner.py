@@ -0,0 +1,36 @@
+import pytest
+from nltk.stem import LancasterStemmer, SnowballStemmer
+
+from nutshell.preprocessing.cleaner import NLTKCleaner, describe
+from nutshell.preprocessing.tokenizer import RegexTokenizer
+
+
+@pytest.fixture(scope='module')
+def tokens(corpus):
+    # Punctuation, stopwords, mixed case and a sentence made of stopwords only, which is cleaned to no word
+    return RegexTokenizer().tokenize(corpus + ' THE Running men, running! It is what it is. Was it?')
+
+
+@pytest.mark.parametrize('config', [
+    dict(),
+    dict(skip_stemming=True),
+    dict(stemmer=LancasterStemmer()),
+], ids=repr)
+def test_fused_matches_chain(tokens, config):
+    fused = NLTKCleaner(**config).clean(tokens)
+    chain = NLTKCleaner(fused=False, **config).clean(tokens)
+    assert list(map(list, fused.get_sentences())) == list(map(list, chain.get_sentences()))
+    assert fused.get_number_of_sentences() == tokens.get_number_of_sentences()
+    assert fused.get_avg_token_per_sentence() == chain.get_avg_token_per_sentence()
+
+
+def test_repr_describes_the_configuration():
+    reprs = [repr(NLTKCleaner(**config)) for config in (
+        dict(), dict(skip_stemming=True), dict(fused=False), dict(stemmer=LancasterStemmer()),
+        dict(stemmer=LancasterStemmer(strip_prefix_flag=True)), dict(stemmer=SnowballStemmer('english')),
+        dict(stemmer=SnowballStemmer('german')), dict(stemmer=SnowballStemmer('english', ignore_stopwords=True)))]
+    assert len(set(reprs)) == len(reprs)
+    # Stable across instances, so that the cached results are shared by the processes
+    assert repr(NLTKCleaner(stemmer=SnowballStemmer('german'))) == reprs[6]
+    assert describe(SnowballStemmer('german')) == \
+        "nltk.stem.snowball.SnowballStemmer(stemmer=nltk.stem.snowball.GermanStemmer(ignore_stopwords=False))"
@@ -0,0 +1,76 @@
+import io
+import json
+import os
+
+import pytest
+
+from nutshell import cli
+from nutshell.preprocessing.tokenizer import RegexTokenizer
+
+
+def run(*argv) -> int:
+    with pytest.raises(SystemExit) as e:
+        cli.main(['--workers', '1', '--tokenizer', 'regex', '--quiet', *argv])
+    return e.value.code
+
+
+def read_results(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_output_and_checkpoint_are_not_inputs(tmp_path, corpus):
+    (tmp_path / 'article.txt').write_text(corpus, encoding='utf-8')
+    output, checkpoint = tmp_path / 'results.jsonl', tmp_path / 'done.txt'
+    args = (str(tmp_path), '--output', str(output), '--checkpoint', str(checkpoint))
+    assert run(*args) == 0
+    # Rerun with the results and the checkpoint in the input directory, neither is summarised
+    assert run(*args) == 0
+    assert [result['id'] for result in read_results(output)] == [str(tmp_path / 'article.txt')]
+    assert list(cli.expand_inputs([str(tmp_path), os.path.join(str(tmp_path), '*')], exclude=(str(output), None))) \
+        == [str(tmp_path / 'article.txt'), str(checkpoint), str(tmp_path / 'article.txt'), str(checkpoint)]
+
+
+def test_exit_codes(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr('sys.stdin', io.StringIO('{"id": "a", "text": "Ships sail. Boats float."}\n\n'))
+    assert run('-', '--task', 'keywords') == 0
+    assert [json.loads(line) for line in capsys.readouterr().out.splitlines()] == \
+        [{'id': 'a', 'keywords': ['ships', 'sail', 'boats', 'float']}]
+    # Invalid documents are reported in the results, the job fails once all the documents are processed
+    monkeypatch.setattr('sys.stdin', io.StringIO('{"text": 1}\nnot json\n{"text": "Ships sail."}\n'))
+    assert run('--task', 'keywords') == 1
+    results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [result['id'] for result in results] == ['stdin:1', 'stdin:2', 'stdin:3']
+    assert ['error' in result for result in results] == [True, True, False]
+    # Invalid arguments
+    assert run(str(tmp_path / 'missing.txt')) == 2
+    assert "No such file, directory or pattern" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('workers', ['1', '2'])
+def test_checkpoint_resumes_the_job(tmp_path, corpus, workers):
+    documents, output, checkpoint = tmp_path / 'docs.jsonl', tmp_path / 'results.jsonl', tmp_path / 'done.txt'
+    sentences = RegexTokenizer().tokenize_into_sentences(corpus)
+    records = [{'id': f"doc{idx}", 'text': ' '.join(sentences[idx * 4:idx * 4 + 4])} for idx in range(4)]
+    documents.write_text(''.join(json.dumps(record) + '\n' for record in records[:3]) + '{"id": "doc3"}\n',
+                         encoding='utf-8')
+    args = (str(documents), '--task', 'both', '--workers', workers, '--output', str(output),
+            '--checkpoint', str(checkpoint))
+    assert run(*args) == 1
+    first = read_results(output)
+    # The invalid line is identified by its line number
+    assert [result['id'] for result in first] == ['doc0', 'doc1', 'doc2', f"{documents}:4"]
+    assert all({'summary', 'keywords'} <= set(result) for result in first[:3]) and 'error' in first[3]
+    # A run killed while writing the checkpoint leaves a partial line, its document is done again
+    checkpoint.write_text('"doc0"\n"doc1"\n"doc', encoding='utf-8')
+    assert cli.load_checkpoint(str(checkpoint)) == {'doc0', 'doc1'}
+
+    # The completed documents are skipped, the new and the failed ones are processed, the results are appended
+    documents.write_text(''.join(json.dumps(record) + '\n' for record in records), encoding='utf-8')
+    assert run(*args) == 0
+    assert [result['id'] for result in read_results(output)] == \
+        ['doc0', 'doc1', 'doc2', f"{documents}:4", 'doc2', 'doc3']
+    assert read_results(output)[4] == first[2]
+    assert cli.load_checkpoint(str(checkpoint)) == {'doc0', 'doc1', 'doc2', 'doc3'}
+    assert run(*args) == 0
+    assert len(read_results(output)) == 6
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from nutshell.algorithms.information_retrieval import ClassicalIR
+from nutshell.algorithms.ranking import DegreeCentrality, LexRank, TextRank
+from nutshell.algorithms.similarity import BM25Plus, TfIdfCosine
+from nutshell.model import Summarizer
+from nutshell.preprocessing.deduplicator import SentenceDeduplicator
+from nutshell.preprocessing.preprocessor import TextPreProcessor
+
+DEDUPLICATORS = [SentenceDeduplicator(), SentenceDeduplicator(near_duplicates=True)]
+
+
+@pytest.fixture(scope='module')
+def cleaned_tokens(corpus):
+    return TextPreProcessor(tokenizer='regex').preprocess(corpus)[1]
+
+
+@pytest.mark.parametrize('deduplicator', DEDUPLICATORS, ids=repr)
+def test_groups_without_duplicates(cleaned_tokens, deduplicator):
+    groups = deduplicator.deduplicate(cleaned_tokens)
+    n = cleaned_tokens.get_number_of_sentences()
+    assert not groups.has_duplicates()
+    assert groups.get_groups().tolist() == list(range(n))
+    assert groups.get_representatives().tolist() == list(range(n))
+    assert groups.get_multiplicity().tolist() == [1] * n
+    collapsed = groups.collapse(cleaned_tokens)
+    assert list(map(list, collapsed.get_sentences())) == list(map(list, cleaned_tokens.get_sentences()))
+
+
+@pytest.mark.parametrize('deduplicator', DEDUPLICATORS, ids=repr)
+def test_groups_with_duplicates(corpus, deduplicator):
+    # Guards the test above, the sample corpus repeated once is fully grouped
+    _, cleaned_tokens = TextPreProcessor(tokenizer='regex').preprocess(corpus + ' ' + corpus)
+    groups = deduplicator.deduplicate(cleaned_tokens)
+    assert groups.has_duplicates()
+    assert len(groups) <= cleaned_tokens.get_number_of_sentences() // 2
+
+
+@pytest.mark.parametrize('deduplicator', DEDUPLICATORS, ids=repr)
+def test_summary_without_duplicates(corpus, deduplicator):
+    preprocessor = TextPreProcessor(tokenizer='regex')
+    expected = Summarizer(preprocessor).summarise(corpus, reduction_ratio=0.5)
+    assert Summarizer(preprocessor, deduplicator=deduplicator).summarise(corpus, reduction_ratio=0.5) == expected
+    ranking = Summarizer(preprocessor, deduplicator=deduplicator).rank(corpus)
+    assert ranking.select(reduction_ratio=0.5) == expected
+
+
+@pytest.mark.parametrize('ranker, similarity_algo', [
+    (TextRank(), BM25Plus()),
+    (TextRank(), BM25Plus(method='sparse', top_k=3)),
+    (LexRank(), TfIdfCosine()),
+    (DegreeCentrality(), BM25Plus()),
+], ids=repr)
+def test_unit_weights(cleaned_tokens, ranker, similarity_algo):
+    # Sentences without duplicates have a single copy, which must not change their scores
+    idf = ClassicalIR.calculate_idf(cleaned_tokens)
+    matrix = similarity_algo.similarity_matrix(cleaned_tokens, idf)
+    expected = ranker.get_ranking_scores(matrix)
+    scores = ranker.get_ranking_scores(matrix, weights=np.ones(cleaned_tokens.get_number_of_sentences()))
+    assert list(scores) == list(expected)
+    assert list(scores.values()) == pytest.approx(list(expected.values()), rel=1e-9)
@@ -0,0 +1,83 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from nutshell.algorithms.information_retrieval import ClassicalIR, IDFModel
+from nutshell.preprocessing.preprocessor import TextPreProcessor
+
+
+@pytest.fixture(scope='module')
+def preprocessor():
+    return TextPreProcessor(tokenizer='regex')
+
+
+@pytest.fixture(scope='module')
+def paragraphs(corpus):
+    return corpus.split('\n\n')
+
+
+@pytest.fixture(scope='module')
+def model(paragraphs, preprocessor):
+    return IDFModel.fit(paragraphs, preprocessor)
+
+
+def test_fit_counts_every_sentence(paragraphs, preprocessor, model):
+    # A background model fitted over a single text has the document frequencies of its local IDF
+    _, tokens = preprocessor.preprocess(' '.join(paragraphs))
+    index = ClassicalIR.build_index(tokens)
+    words = index.get_vocabulary().get_words()
+    assert model.get_number_of_docs() == tokens.get_number_of_sentences()
+    assert len(model) == len(words)
+    assert model.get_doc_freqs(words).tolist() == [len(index.get_postings_by_id(word_id))
+                                                   for word_id in range(len(words))]
+    assert model.get_doc_freqs(['unseen-word']).tolist() == [0]
+    assert 'unseen-word' not in model and words[0] in model
+
+
+def test_save_load_round_trip(tmp_path, model, paragraphs, preprocessor):
+    path = str(tmp_path / 'background.idf')
+    model.save(path)
+    loaded = IDFModel.load(path)
+    words = preprocessor.preprocess(' '.join(paragraphs))[1].get_vocabulary().get_words()
+    assert (len(loaded), loaded.get_number_of_docs(), loaded.get_digest()) == \
+        (len(model), model.get_number_of_docs(), model.get_digest())
+    assert loaded.get_doc_freqs(words).tolist() == model.get_doc_freqs(words).tolist()
+    # Copies sent to the workers map the same file, the in memory models carry their content
+    for original in (model, loaded):
+        copy = pickle.loads(pickle.dumps(original))
+        assert repr(copy) == repr(original)
+        assert copy.get_doc_freqs(words).tolist() == model.get_doc_freqs(words).tolist()
+
+
+def test_invalid_file(tmp_path):
+    path = tmp_path / 'invalid.idf'
+    path.write_bytes(b'NOTANIDF' + bytes(24))
+    with pytest.raises(Exception, match='Invalid IDF model'):
+        IDFModel.load(str(path))
+
+
+@pytest.mark.parametrize('blend', [0.0, 0.5, 1.0])
+def test_blend(corpus, model, preprocessor, blend):
+    _, tokens = preprocessor.preprocess(corpus.split('\n\n')[0])
+    local = ClassicalIR.calculate_idf(tokens)
+    background = {word: ClassicalIR.calculate_word_idf(model.get_number_of_docs(), freq)
+                  for word, freq in zip(local, model.get_doc_freqs(local).tolist())}
+    idf = ClassicalIR(model, blend).get_idf(tokens)
+    assert list(idf) == list(local)
+    assert idf == pytest.approx({word: blend * background[word] + (1 - blend) * local[word] for word in local},
+                                rel=1e-12)
+    _, word_ids, _ = ClassicalIR.term_frequencies(tokens)
+    doc_freqs = np.bincount(word_ids, minlength=len(tokens.get_vocabulary()))
+    by_id = ClassicalIR(model, blend).get_idf_by_id(tokens, doc_freqs)
+    assert by_id.tolist() == pytest.approx([idf[word] for word in tokens.get_vocabulary().get_words()], rel=1e-12)
+
+
+def test_unseen_words_use_the_local_idf(preprocessor, model):
+    _, tokens = preprocessor.preprocess('Quokkas hop around. Wombats dig burrows. Quokkas smile.')
+    assert ClassicalIR(model, 1.0).get_idf(tokens) == ClassicalIR.calculate_idf(tokens)
+
+
+def test_invalid_blend(model):
+    with pytest.raises(Exception, match='Invalid blend'):
+        ClassicalIR(model, 1.5)
@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ('numpy', 'scipy', 'nltk')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize('statement', [
+    'import nutshell',
+    'from nutshell.model import Analyzer, KeywordExtractor, Summarizer; Summarizer(), KeywordExtractor()',
+    'import nutshell.cache, nutshell.cli, nutshell.document, nutshell.parallel, nutshell.utils',
+])
+def test_heavy_modules_are_loaded_lazily(statement):
+    # A fresh interpreter, the tests of the process already imported the heavy modules
+    probe = f"import sys; {statement}; print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, (ROOT, os.environ.get('PYTHONPATH')))))
+    loaded = subprocess.run([sys.executable, '-c', probe], env=env, cwd=ROOT, check=True, stdout=subprocess.PIPE,
+                            universal_newlines=True).stdout.split()
+    assert loaded == []
@@ -0,0 +1,43 @@
+import pytest
+
+from nutshell.model import IncrementalSummarizer, Summarizer
+from nutshell.preprocessing.preprocessor import TextPreProcessor
+from nutshell.preprocessing.tokenizer import RegexTokenizer
+
+
+@pytest.fixture(scope='module')
+def chunks(corpus):
+    # Appended text starts at a sentence boundary, a few sentences at a time like a live transcript
+    sentences = RegexTokenizer().tokenize_into_sentences(corpus)
+    return [' '.join(sentences[start:start + 3]) for start in range(0, len(sentences), 3)]
+
+
+def expected_summary(text, preserve_order=False):
+    return Summarizer(TextPreProcessor(tokenizer='regex')).summarise(text, reduction_ratio=0.5,
+                                                                      preserve_order=preserve_order)
+
+
+def assert_same_summary(actual, expected):
+    # The ranking is iterative, warm started runs converge to the same scores up to its tolerance
+    assert [words for _, words in actual] == [words for _, words in expected]
+    assert [score for score, _ in actual] == pytest.approx([score for score, _ in expected], rel=1e-4)
+
+
+@pytest.mark.parametrize('preserve_order', [False, True])
+def test_refreshed_summary_matches_full_recompute(chunks, preserve_order):
+    summarizer = IncrementalSummarizer(TextPreProcessor(tokenizer='regex'), refresh_ratio=100)
+    for chunk in chunks:
+        summarizer.append(chunk)
+        # Ranks the stale similarity matrix, so that the ranking of the refreshed one is warm started
+        summarizer.summary()
+    summarizer.refresh()
+    assert_same_summary(summarizer.summary(reduction_ratio=0.5, preserve_order=preserve_order),
+                        expected_summary(' '.join(chunks), preserve_order))
+
+
+def test_every_append_matches_full_recompute(chunks):
+    # Every append refreshes the similarity matrix, so every summary is the one of the text appended so far
+    summarizer = IncrementalSummarizer(TextPreProcessor(tokenizer='regex'), refresh_ratio=1)
+    for idx, chunk in enumerate(chunks, start=1):
+        assert summarizer.append(chunk) == len(RegexTokenizer().tokenize_into_sentences(chunk))
+        assert_same_summary(summarizer.summary(reduction_ratio=0.5), expected_summary(' '.join(chunks[:idx])))
@@ -0,0 +1,32 @@
+import tracemalloc
+
+import pytest
+
+from nutshell.instrumentation import Instrumentation, Recorder
+
+
+@pytest.mark.parametrize('reset_peak', [True, False], ids=['reset_peak', 'clear_traces'])
+def test_peak_memory_per_stage(monkeypatch, reset_peak):
+    if not reset_peak:
+        # Python before 3.9
+        monkeypatch.delattr(tracemalloc, 'reset_peak', raising=False)
+    recorder = Instrumentation(sample_memory=True).start('test')
+    with recorder.stage('allocate'):
+        buffer = bytearray(4 * 2 ** 20)
+    with recorder.stage('noop'):
+        pass
+    del buffer
+    stats = recorder.finish()
+    assert stats.memory['allocate'] > 3 * 2 ** 20
+    assert stats.memory['noop'] < 2 ** 20
+    assert not tracemalloc.is_tracing()
+
+
+def test_stats():
+    recorder = Recorder('test')
+    with recorder.stage('stage'):
+        recorder.count('sentences', 3)
+    stats = recorder.finish()
+    assert stats.pipeline == 'test'
+    assert stats.counters == {'sentences': 3}
+    assert list(stats.timings) == ['stage'] and stats.memory == {}
@@ -0,0 +1,48 @@
+import pytest
+
+from nutshell.algorithms.information_retrieval import ClassicalIR, IDFModel
+from nutshell.model import KeywordExtractor
+from nutshell.preprocessing.cleaner import NLTKCleaner
+from nutshell.preprocessing.preprocessor import TextPreProcessor
+
+
+@pytest.fixture(scope='module')
+def preprocessor():
+    return TextPreProcessor(tokenizer='regex', cleaner=NLTKCleaner(skip_stemming=True))
+
+
+@pytest.fixture(scope='module')
+def background(corpus, preprocessor):
+    return IDFModel.fit(corpus.split('\n\n') + ['The model counts the ships.'], preprocessor)
+
+
+def dict_weights(corpus, preprocessor, ir, order=False):
+    """Cumulative weights computed by the dict based path, i.e calculate_tf, get_idf and cumulative_weight"""
+    _, tokens = preprocessor.preprocess(corpus)
+    index = ClassicalIR.build_index(tokens)
+    return ClassicalIR.cumulative_weight(ClassicalIR.calculate_tf(tokens, index), ir.get_idf(tokens, index),
+                                         order=order)
+
+
+@pytest.mark.parametrize('count', [1, 5, 15, 10 ** 6])
+@pytest.mark.parametrize('blend', [None, 0.5, 1.0])
+def test_keywords_match_dict_path(corpus, preprocessor, background, count, blend):
+    ir = ClassicalIR() if blend is None else ClassicalIR(background, blend)
+    ranked = dict_weights(corpus, preprocessor, ir, order=True)
+    keyword_extractor = KeywordExtractor(preprocessor, ir)
+    assert keyword_extractor.extract_keywords(corpus, count=count) == tuple(word for word, _ in ranked[:count])
+
+
+@pytest.mark.parametrize('blend', [None, 0.5])
+def test_raw_weights_match_dict_path(corpus, preprocessor, background, blend):
+    ir = ClassicalIR() if blend is None else ClassicalIR(background, blend)
+    expected = dict_weights(corpus, preprocessor, ir)
+    raw = KeywordExtractor(preprocessor, ir).extract_keywords(corpus, raw=True)
+    # Words are in the order of their first occurrence in both paths
+    assert list(raw) == list(expected)
+    assert raw == pytest.approx(expected, rel=1e-12)
+
+
+@pytest.mark.parametrize('count', [0, -3])
+def test_no_keywords(corpus, preprocessor, count):
+    assert KeywordExtractor(preprocessor).extract_keywords(corpus, count=count) == ()
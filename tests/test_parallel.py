@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+from nutshell import parallel
+from nutshell.model import KeywordExtractor, Summarizer
+from nutshell.preprocessing.cleaner import NLTKCleaner
+from nutshell.preprocessing.preprocessor import TextPreProcessor
+
+
+class Echo:
+    """Model of the workers, which sleeps on the corpora starting with 'slow' and fails on the ones with 'fail'"""
+
+    def warmup(self):
+        pass
+
+    def run(self, corpus, suffix=''):
+        if corpus.startswith('fail'):
+            raise ValueError(corpus)
+        if corpus.startswith('slow'):
+            time.sleep(0.5)
+        return corpus.upper() + suffix
+
+
+def counted(corpora, consumed: list):
+    for corpus in corpora:
+        consumed.append(corpus)
+        yield corpus
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+@pytest.mark.parametrize('chunksize', [1, 3])
+def test_results(ordered, chunksize):
+    corpora = [f"doc{idx}" for idx in range(20)]
+    results = list(parallel.imap(Echo(), 'run', corpora, dict(suffix='!'), workers=2, chunksize=chunksize,
+                                 ordered=ordered))
+    expected = [(idx, corpus.upper() + '!') for idx, corpus in enumerate(corpora)]
+    assert (results if ordered else sorted(results)) == expected
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_bounded_read_ahead(ordered):
+    consumed = []
+    results = parallel.imap(Echo(), 'run', counted((f"doc{idx}" for idx in range(100)), consumed), {}, workers=2,
+                            chunksize=2, ordered=ordered, max_pending=8)
+    next(results)
+    assert len(consumed) <= 8 + 2
+    assert len(list(results)) == 99
+
+
+def test_slow_corpus_does_not_stall_the_workers():
+    # Fast corpora keep flowing through the free worker while the slow one runs, instead of waiting for it at the end
+    # of every batch of max_pending corpora
+    corpora = ['slow'] + [f"doc{idx}" for idx in range(20)]
+    order = [idx for idx, _ in parallel.imap(Echo(), 'run', corpora, {}, workers=2, chunksize=1, ordered=False,
+                                             max_pending=4)]
+    assert sorted(order) == list(range(len(corpora)))
+    assert order.index(0) > 10
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_errors(ordered):
+    with pytest.raises(ValueError, match='fail'):
+        list(parallel.imap(Echo(), 'run', ['doc', 'fail', 'doc'], {}, workers=2, chunksize=1, ordered=ordered))
+
+
+def test_batch_methods_match_serial_loop(corpus):
+    corpora = [corpus, corpus[:len(corpus) // 2], corpus[len(corpus) // 2:]]
+    summarizer = Summarizer(TextPreProcessor(tokenizer='regex'))
+    assert summarizer.summarise_many(corpora, workers=2) == [summarizer.summarise(text) for text in corpora]
+    keyword_extractor = KeywordExtractor(TextPreProcessor(tokenizer='regex', cleaner=NLTKCleaner(skip_stemming=True)))
+    assert keyword_extractor.extract_keywords_many(corpora, workers=2) == \
+        [keyword_extractor.extract_keywords(text) for text in corpora]
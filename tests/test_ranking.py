@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from nutshell.algorithms.ranking import Ranking
+from nutshell.preprocessing.tokenizer import Token
+from nutshell.utils import construct_sentences_from_ranking
+
+SENTENCES = [['a', 'short', 'one'], ['the', 'longest', 'sentence', 'of', 'the', 'text'], ['tied'], ['also', 'tied'],
+             ['last', 'words']]
+SCORES = [0.1, 0.4, 0.2, 0.2, 0.3]
+
+
+@pytest.fixture
+def ranking():
+    return Ranking(SCORES, Token(SENTENCES))
+
+
+def test_select_by_count(ranking):
+    # Equal scores are ranked by position
+    assert ranking.get_order().tolist() == [1, 4, 2, 3, 0]
+    assert ranking.select(count=3) == [(0.4, SENTENCES[1]), (0.3, SENTENCES[4]), (0.2, SENTENCES[2])]
+    assert ranking.select(count=3, preserve_order=True) == [(0.4, SENTENCES[1]), (0.2, SENTENCES[2]),
+                                                            (0.3, SENTENCES[4])]
+    assert ranking.select(count=10) == ranking.select(reduction_ratio=0)
+    assert ranking.select(count=0) == ranking.select(count=-1) == []
+
+
+@pytest.mark.parametrize('reduction_ratio, count', [(0.0, 5), (0.5, 3), (0.7, 2), (0.9, 1), (1.0, 0)])
+def test_select_by_ratio(ranking, reduction_ratio, count):
+    assert ranking.get_count(reduction_ratio) == count
+    assert ranking.select_positions(reduction_ratio=reduction_ratio).tolist() == ranking.get_order()[:count].tolist()
+    # The tighter of the limits wins
+    assert ranking.get_count(reduction_ratio, count=1) == min(count, 1)
+
+
+@pytest.mark.parametrize('max_chars, expected', [
+    (1000, [1, 4, 2, 3, 0]),
+    (len('the longest sentence of the text'), [1]),
+    (len('the longest sentence of the text') - 1, [4, 2, 3]),
+    (len('last words\ntied'), [4, 2]),
+    (len('tied') - 1, []),
+])
+def test_select_by_char_budget(ranking, max_chars, expected):
+    selected = ranking.select(max_chars=max_chars)
+    assert [SENTENCES.index(sentence) for _, sentence in selected] == expected
+    assert len(construct_sentences_from_ranking(selected)) <= max_chars
+
+
+@pytest.mark.parametrize('max_tokens, count, expected', [
+    (100, None, [1, 4, 2, 3, 0]),
+    (6, None, [1]),
+    (5, None, [4, 2, 3]),
+    (5, 2, [4, 2]),
+    (0, None, []),
+])
+def test_select_by_token_budget(ranking, max_tokens, count, expected):
+    assert ranking.select_positions(count=count, max_tokens=max_tokens).tolist() == expected
+    assert ranking.select_positions(count=count, max_tokens=max_tokens, max_chars=1000).tolist() == expected
+
+
+def test_positions():
+    # Ranked representatives of the duplicates at the positions 0, 2, 5 of the corpus
+    ranking = Ranking({0: 0.2, 1: 0.5, 2: 0.3}, Token(SENTENCES[:3]), positions=np.array([0, 2, 5]))
+    assert ranking.select_positions(count=2).tolist() == [2, 5]
+    assert ranking.select_positions(count=2, preserve_order=True).tolist() == [2, 5]
+    assert ranking.select_positions(reduction_ratio=0).tolist() == [2, 5, 0]
+
+
+def test_invalid(ranking):
+    with pytest.raises(Exception, match='Expected at least one of'):
+        ranking.select()
+    with pytest.raises(Exception, match='expected 5 scores but got 2'):
+        Ranking([0.1, 0.2], Token(SENTENCES))
+    with pytest.raises(Exception, match='expected 5 positions but got 1'):
+        Ranking(SCORES, Token(SENTENCES), positions=np.array([0]))
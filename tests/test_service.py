@@ -0,0 +1,102 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from nutshell.service import AsyncSummarizer, _handle_http
+
+
+class Echo:
+    """Model of the workers, which sleeps on the corpora starting with 'slow' and fails on the ones with 'fail'"""
+
+    def warmup(self):
+        pass
+
+    def summarise(self, corpus, reduction_ratio=0.70, preserve_order=False):
+        if corpus.startswith('fail'):
+            raise ValueError(corpus)
+        if corpus.startswith('slow'):
+            time.sleep(0.3)
+        return [(reduction_ratio, corpus.split())]
+
+
+def service(**kwargs) -> AsyncSummarizer:
+    return AsyncSummarizer(Echo(), **dict(dict(workers=2, executor='thread'), **kwargs))
+
+
+def test_identical_requests_are_coalesced():
+    async def run():
+        async with service() as summarizer:
+            first = await summarizer.submit('summarise', 'slow text', reduction_ratio=0.5)
+            second = await summarizer.submit('summarise', 'slow text', reduction_ratio=0.5)
+            other = await summarizer.submit('summarise', 'slow text', reduction_ratio=0.3)
+            assert first is second and first is not other
+            results = await asyncio.gather(summarizer.wait(first), summarizer.wait(second), summarizer.wait(other))
+            return results, summarizer.get_stats()
+
+    results, stats = asyncio.run(run())
+    assert results == [[(0.5, ['slow', 'text'])]] * 2 + [[(0.3, ['slow', 'text'])]]
+    assert stats == dict(submitted=3, coalesced=1, completed=2, pending=0, in_flight=0)
+
+
+def test_timeout_and_failure():
+    async def run():
+        async with service(timeout=0.05) as summarizer:
+            with pytest.raises(asyncio.TimeoutError):
+                await summarizer.summarise('slow text')
+            with pytest.raises(ValueError, match='fail'):
+                await summarizer.summarise('fail text')
+            # The timeout of the request overrides the default one
+            assert await summarizer.summarise('slow text', timeout=5) == [(0.70, ['slow', 'text'])]
+            return summarizer.get_stats()
+
+    stats = asyncio.run(run())
+    assert (stats['timeouts'], stats['failed'], stats['completed']) == (1, 1, 1)
+
+
+def test_queue_full_is_rejected():
+    async def run():
+        async with service(workers=1, max_pending=1) as summarizer:
+            running = await summarizer.submit('summarise', 'slow first')
+            # Lets the dispatcher take the first request off the queue
+            await asyncio.sleep(0.05)
+            queued = await summarizer.submit('summarise', 'slow second')
+            with pytest.raises(asyncio.QueueFull):
+                await summarizer.submit('summarise', 'slow third', block=False)
+            await asyncio.gather(summarizer.wait(running), summarizer.wait(queued))
+            return summarizer.get_stats()
+
+    stats = asyncio.run(run())
+    assert (stats['submitted'], stats['rejected'], stats['completed']) == (3, 1, 2)
+
+
+async def http_request(port: int, method: str, path: str, body: bytes = b'') -> tuple:
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+                 .encode('latin-1') + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    response = (await reader.read()).split(b'\r\n\r\n', 1)[1]
+    writer.close()
+    return status, json.loads(response)
+
+
+@pytest.mark.parametrize('body, status, response', [
+    (b'{"text": "Ships sail. Boats float."}', 200, {'summary': 'Ships sail. Boats float.'}),
+    (b'{"text": "slow text", "timeout": 0.05}', 504, {'error': 'Timed out'}),
+    (b'not json', 400, {'error': 'Invalid JSON'}),
+    (b'["text"]', 400, {'error': 'Expected the request to be a JSON object'}),
+    (b'{"body": "text"}', 400, {'error': "Expected the text to be summarised in the 'text' field"}),
+    (b'{"text": "text", "reduction_ratio": "half"}', 400, {'error': "could not convert string to float: 'half'"}),
+])
+def test_http(body, status, response):
+    async def run():
+        async with service() as summarizer:
+            server = await asyncio.start_server(lambda r, w: _handle_http(summarizer, r, w), '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                return (await http_request(port, 'POST', '/summarise', body),
+                        await http_request(port, 'GET', '/missing'))
+
+    assert asyncio.run(run()) == ((status, response), (404, {'error': 'Unknown route GET /missing'}))
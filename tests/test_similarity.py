@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from nutshell.algorithms import similarity
+from nutshell.algorithms.information_retrieval import ClassicalIR
+from nutshell.algorithms.similarity import BM25Plus
+from nutshell.preprocessing.preprocessor import TextPreProcessor
+from nutshell.utils import lazy_import
+
+
+@pytest.fixture(scope='module')
+def scored(corpus):
+    """Cleaned tokens of the sample article along with their IDF"""
+    _, tokens = TextPreProcessor(tokenizer='regex').preprocess(corpus)
+    ir = ClassicalIR()
+    return tokens, ir.calculate_idf(tokens, ir.build_index(tokens))
+
+
+@pytest.fixture(scope='module')
+def expected(scored):
+    return BM25Plus(method='loop').similarity_matrix(*scored)
+
+
+@pytest.mark.parametrize('similarity_algo', [
+    BM25Plus(),
+    BM25Plus(block_size=64),
+    BM25Plus(block_size=64, workers=2),
+], ids=repr)
+def test_matrix_matches_loop(scored, expected, similarity_algo):
+    np.testing.assert_allclose(similarity_algo.similarity_matrix(*scored), expected, rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize('block_size', [2 ** 22, 16, 1])
+def test_sparse_matches_loop(scored, expected, block_size):
+    graph = BM25Plus(method='sparse', block_size=block_size).similarity_matrix(*scored)
+    np.testing.assert_allclose(graph.toarray(), expected, rtol=1e-12, atol=1e-12)
+
+
+def test_sparse_top_k_keeps_the_top_scores(scored, expected):
+    graph = BM25Plus(method='sparse', top_k=3).similarity_matrix(*scored)
+    for row, scores in enumerate(expected):
+        kept = graph.indices[graph.indptr[row]:graph.indptr[row + 1]]
+        assert len(kept) == min(3, np.count_nonzero(scores))
+        np.testing.assert_allclose(graph[row].toarray()[0, kept], scores[kept], rtol=1e-12)
+        assert scores[kept].min(initial=np.inf) >= np.delete(scores, kept).max()
+
+
+def test_serial_without_shared_memory(monkeypatch, scored, expected):
+    # Before Python 3.8, multiprocessing.shared_memory can't be imported and no pool is started
+    monkeypatch.setattr(similarity, 'shared_memory', lazy_import('multiprocessing.missing_shared_memory'))
+    monkeypatch.setattr(similarity, 'multiprocessing', None)
+    matrix = BM25Plus(block_size=64, workers=2).similarity_matrix(*scored)
+    np.testing.assert_allclose(matrix, expected, rtol=1e-12, atol=1e-12)
@@ -0,0 +1,70 @@
+import pytest
+
+from nutshell.preprocessing.tokenizer import RegexTokenizer
+
+# Edge cases of benchmarks/tokenizer_parity.py, along with their expected sentences
+EDGE_CASES = [
+    'Mr. Smith and Dr. Jones met at 10 a.m. on Jan. 5th.',
+    'They discussed the U.S. economy, e.g. inflation and jobs.',
+    '"I can\'t believe it," she said.',
+    '"We won\'t stop now!"',
+    "He didn't answer; he couldn't.",
+    'The price rose from $1,000.50 to $2,300 (about 130%) by 12:30 p.m.',
+    'Was it worth it?',
+    'J. R. R. Tolkien wrote books -- many of them.',
+    "It's the students' choice, isn't it?",
+    'Yes, it is.',
+    "She said 'hello' and left.",
+    'The company, Acme Inc., reported gains.',
+    'Prices fell 3.5 percent in Q3.',
+]
+
+
+def test_edge_cases():
+    assert RegexTokenizer().tokenize_into_sentences(' '.join(EDGE_CASES)) == EDGE_CASES
+
+
+@pytest.mark.parametrize('sentences', [
+    ['He scored 5.', 'Then he left.'],
+    ['She said no.', 'The end.'],
+    ['It costs $5.', 'The rest is free.'],
+    ['It was 3 p.m.', 'It was fine.'],
+    ['Send it to mail doe.com.', 'Is it there?'],
+    ['He got an a.', 'The others failed.'],
+])
+def test_periods_ending_sentences(sentences):
+    assert RegexTokenizer().tokenize_into_sentences(' '.join(sentences)) == sentences
+
+
+@pytest.mark.parametrize('sentence', [
+    'See No. 5 on the list.',
+    'J. R. R. Tolkien met Mr. Smith on Jan. 5th.',
+    'The U.S. economy grew by 3 p.m. on Monday.',
+    'She lives on Main St. With her friends.',
+])
+def test_periods_not_ending_sentences(sentence):
+    assert RegexTokenizer().tokenize_into_sentences(sentence) == [sentence]
+
+
+def test_words():
+    tokens = RegexTokenizer().tokenize('We met at 3 p.m. It was fine. See No. 5 with Mr. Smith on Jan.')
+    assert list(map(list, tokens.get_sentences())) == [
+        ['We', 'met', 'at', '3', 'p.m', '.'],
+        ['It', 'was', 'fine', '.'],
+        ['See', 'No.', '5', 'with', 'Mr.', 'Smith', 'on', 'Jan', '.'],
+    ]
+
+
+@pytest.mark.parametrize('sentence, words', [
+    # Slashes and equal signs are not split, like the Treebank tokenizer of NLTK
+    ('See https://x.com/a?b=1 for more.', ['See', 'https', ':', '//x.com/a', '?', 'b=1', 'for', 'more', '.']),
+    ('Read http://example.org/a-b_c/d.html#top today.',
+     ['Read', 'http', ':', '//example.org/a-b_c/d.html', '#', 'top', 'today', '.']),
+    ('It costs 3.50/hr, 24/7 and/or 1/2 off.', ['It', 'costs', '3.50/hr', ',', '24/7', 'and/or', '1/2', 'off', '.']),
+    ('Open /usr/bin/ or x.com/.', ['Open', '/usr/bin/', 'or', 'x.com/', '.']),
+    # Divergences from the Treebank tokenizer, which keeps host:21/x and a==b
+    ('Try ftp://host:21/x with a==b.', ['Try', 'ftp', ':', '//host', ':', '21/x', 'with', 'a', '=', '=', 'b', '.']),
+])
+def test_urls_and_slashes(sentence, words):
+    assert RegexTokenizer().tokenize_into_words(sentence) == words
+    assert RegexTokenizer().tokenize_into_sentences(sentence + ' Next one.') == [sentence, 'Next one.']
@@ -0,0 +1,61 @@
+import gzip
+
+import pytest
+
+from nutshell.utils import iter_documents, iter_jsonl, iter_lines, iter_paragraphs
+
+
+def write(path, text: str, compress=False) -> str:
+    data = text.encode('utf-8')
+    path.write_bytes(gzip.compress(data) if compress else data)
+    return str(path)
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_iter_lines(tmp_path, compress):
+    path = write(tmp_path / 'lines.txt', 'first\r\nsécond ✓\n\nlast', compress)
+    assert list(iter_lines(path)) == ['first', 'sécond ✓', '', 'last']
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_iter_lines_of_empty_file(tmp_path, compress):
+    assert list(iter_lines(write(tmp_path / 'empty.txt', '', compress))) == []
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_iter_jsonl(tmp_path, compress):
+    path = write(tmp_path / 'docs.jsonl', '{"text": "a", "id": 1}\n\n{"body": "b", "text": "c"}\n', compress)
+    assert list(iter_jsonl(path)) == ['a', 'c']
+    with pytest.raises(Exception, match='Invalid document at line 1'):
+        list(iter_jsonl(path, field='body'))
+
+
+def test_iter_jsonl_invalid_json(tmp_path):
+    path = write(tmp_path / 'docs.jsonl', '{"text": "a"}\n{"text": \n')
+    documents = iter_jsonl(path)
+    # Documents are read lazily, the invalid line fails only once reached
+    assert next(documents) == 'a'
+    with pytest.raises(Exception, match='Invalid document at line 2'):
+        next(documents)
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_iter_paragraphs(tmp_path, compress):
+    path = write(tmp_path / 'text.txt', '\nFirst line.\nSecond line.\n\n\n  \nNext paragraph.\n\nLast', compress)
+    assert list(iter_paragraphs(path)) == ['First line.\nSecond line.', 'Next paragraph.', 'Last']
+
+
+def test_iter_paragraphs_split_long_paragraphs(tmp_path):
+    path = write(tmp_path / 'text.txt', '\n'.join(f"line {idx}" for idx in range(5)))
+    assert list(iter_paragraphs(path, max_chars=14)) == ['line 0\nline 1', 'line 2\nline 3', 'line 4']
+
+
+def test_iter_documents(tmp_path):
+    jsonl = write(tmp_path / 'docs.ndjson.gz', '{"text": "a"}\n{"text": "b"}\n', compress=True)
+    text = write(tmp_path / 'docs.txt', 'a\n\nb\n')
+    assert list(iter_documents(jsonl)) == list(iter_documents(text)) == ['a', 'b']
+    # The format given overrides the extension
+    assert list(iter_documents(write(tmp_path / 'docs.log', '{"body": "a"}\n'), file_format='jsonl', field='body')) \
+        == ['a']
+    with pytest.raises(Exception, match="Invalid file format 'csv'"):
+        iter_documents(text, file_format='csv')